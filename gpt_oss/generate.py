@@ -15,7 +15,18 @@ def main(args):
             from gpt_oss.torch.utils import init_distributed
 
             device = init_distributed()
-            generator = TorchGenerator(args.checkpoint, device=device)
+            generator = TorchGenerator(
+                args.checkpoint,
+                device=device,
+                load_budget_bytes=args.load_budget_mb * 1024 * 1024,
+                mxfp4_experts=args.mxfp4_experts,
+                kv_mode=args.kv_mode,
+            )
+            stats = generator.model.load_stats
+            print(
+                f"Loaded in {stats['seconds']:.1f}s, "
+                f"peak RSS {stats['peak_rss_bytes'] / 2**30:.2f} GiB"
+            )
         case "triton":
             from gpt_oss.torch.utils import init_distributed
             from gpt_oss.triton.model import TokenGenerator as TritonGenerator
@@ -56,6 +67,9 @@ def main(args):
         decoded_token = tokenizer.decode([token])
         print(f"Generated token: {repr(decoded_token)}, logprob: {logprob}")
 
+    if args.backend == "speculative":
+        print(f"Speculative decoding stats: {generator.stats.as_dict()}")
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Text generation example")
@@ -113,6 +127,26 @@ if __name__ == "__main__":
         choices=["triton", "torch", "vllm", "speculative"],
         help="Inference backend",
     )
+    parser.add_argument(
+        "--load-budget-mb",
+        metavar="MB",
+        type=int,
+        default=512,
+        help="Transient host memory used while streaming weights (torch backend)",
+    )
+    parser.add_argument(
+        "--mxfp4-experts",
+        action="store_true",
+        help="Keep MoE expert weights packed in MXFP4 (torch backend)",
+    )
+    parser.add_argument(
+        "--kv-mode",
+        type=str,
+        default="full",
+        choices=["full", "int8", "sketch"],
+        help="KV cache storage: int8 with per-head scales, or low-rank sketches "
+        "of old tokens on full-attention layers (torch backend)",
+    )
     args = parser.parse_args()
 
     main(args)
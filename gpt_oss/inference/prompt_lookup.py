@@ -0,0 +1,119 @@
+"""
+Prompt-lookup (n-gram) speculative decoding.
+
+Rewrites and revisions mostly copy spans of their prompt.  Instead of a draft
+model, the continuation of the most recent earlier occurrence of the output's
+last n-gram is proposed as draft tokens and verified by the main model in a
+single forward pass, exactly like :mod:`gpt_oss.inference.speculative`.
+
+The decoding loop is backend-agnostic: it drives a cached model through two
+callbacks, ``forward(tokens) -> logits`` (append ``tokens`` to the KV cache
+and return one row of logits per token) and ``truncate(n)`` (roll the cache
+back to its first ``n`` tokens), plus an optional ``prefill(tokens)`` that
+appends the prompt without computing logits.
+"""
+
+import time
+from typing import Callable
+
+import torch
+
+from gpt_oss.inference.speculative import SpeculativeStats
+
+
+def find_draft(
+    tokens: list[int],
+    max_ngram: int = 3,
+    num_draft_tokens: int = 10,
+) -> list[int]:
+    """Continuation of the latest earlier match of the longest suffix n-gram."""
+    for n in range(min(max_ngram, len(tokens) - 1), 0, -1):
+        suffix = tokens[-n:]
+        # Scan backwards so the most recent (most relevant) match wins.
+        for start in range(len(tokens) - n - 1, -1, -1):
+            if tokens[start] == suffix[0] and tokens[start : start + n] == suffix:
+                draft = tokens[start + n : start + n + num_draft_tokens]
+                if draft:
+                    return draft
+    return []
+
+
+def _accept(
+    logits: torch.Tensor, draft: list[int], temperature: float
+) -> tuple[int, int]:
+    """Verify ``draft`` against ``logits`` (one row per draft position plus a
+    bonus row).  Returns the number of accepted tokens and the next token."""
+    for i, token in enumerate(draft):
+        if temperature == 0.0:
+            predicted = int(torch.argmax(logits[i]))
+            if predicted != token:
+                return i, predicted
+            continue
+        probs = torch.softmax(logits[i].float() / temperature, dim=-1)
+        # The draft is deterministic (q = one-hot), so accept with
+        # probability p(token) and otherwise resample with token excluded.
+        if torch.rand(1).item() < probs[token].item():
+            continue
+        probs[token] = 0.0
+        return i, torch.multinomial(probs / probs.sum(), num_samples=1).item()
+    row = logits[len(draft)]
+    if temperature == 0.0:
+        return len(draft), int(torch.argmax(row))
+    probs = torch.softmax(row.float() / temperature, dim=-1)
+    return len(draft), torch.multinomial(probs, num_samples=1).item()
+
+
+@torch.inference_mode()
+def prompt_lookup_decode(
+    prompt_tokens: list[int],
+    forward: Callable[[list[int]], torch.Tensor],
+    truncate: Callable[[int], None],
+    stop_tokens: list[int],
+    temperature: float = 1.0,
+    max_tokens: int = 0,
+    return_logprobs: bool = False,
+    max_ngram: int = 3,
+    num_draft_tokens: int = 10,
+    stats: SpeculativeStats | None = None,
+    prefill: Callable[[list[int]], object] | None = None,
+):
+    """Generate like ``TokenGenerator.generate`` with n-gram draft tokens.
+
+    ``forward``/``truncate`` operate on an empty KV cache; this function
+    prefills it with the prompt, through ``prefill`` if given (its logits
+    are never read) and ``forward`` otherwise.  Acceptance counts are added
+    to ``stats``.
+    """
+    stats = stats if stats is not None else SpeculativeStats()
+    start_time = time.perf_counter()
+    tokens = list(prompt_tokens)
+    if len(tokens) > 1:
+        (prefill or forward)(tokens[:-1])
+    num_generated_tokens = 0
+    try:
+        while max_tokens == 0 or num_generated_tokens < max_tokens:
+            base = len(tokens) - 1
+            draft = find_draft(tokens, max_ngram, num_draft_tokens)
+            if max_tokens > 0:
+                draft = draft[: max(0, max_tokens - num_generated_tokens - 1)]
+            logits = forward(tokens[-1:] + draft)
+            accepted, next_token = _accept(logits, draft, temperature)
+            truncate(base + 1 + accepted)
+            if draft:
+                stats.rounds += 1
+                stats.drafted += len(draft)
+                stats.accepted += accepted
+
+            for i, new_token in enumerate(draft[:accepted] + [next_token]):
+                tokens.append(new_token)
+                num_generated_tokens += 1
+                stats.generated += 1
+                if return_logprobs:
+                    logprobs = torch.log_softmax(logits[i].float(), dim=-1)
+                    yield new_token, logprobs[new_token].item()
+                else:
+                    yield new_token
+                if new_token in stop_tokens:
+                    return
+    finally:
+        stats.seconds += time.perf_counter() - start_time
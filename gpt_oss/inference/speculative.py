@@ -1,5 +1,61 @@
+import time
+from dataclasses import dataclass, field
+
 import torch
 
+from gpt_oss.torch.model import new_caches
+
+
+@dataclass
+class SpeculativeStats:
+    """Counters for one or more speculative decoding calls."""
+
+    rounds: int = 0
+    drafted: int = 0
+    accepted: int = 0
+    generated: int = 0
+    seconds: float = 0.0
+    gammas: list[int] = field(default_factory=list)
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepted / self.drafted if self.drafted else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.generated / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "drafted": self.drafted,
+            "accepted": self.accepted,
+            "generated": self.generated,
+            "acceptance_rate": self.acceptance_rate,
+            "tokens_per_second": self.tokens_per_second,
+            "mean_gamma": sum(self.gammas) / len(self.gammas) if self.gammas else 0.0,
+        }
+
+
+def _probs(logits: torch.Tensor, temperature: float) -> torch.Tensor:
+    if temperature == 0.0:
+        return torch.nn.functional.one_hot(
+            torch.argmax(logits, dim=-1), logits.shape[-1]
+        ).float()
+    return torch.softmax(logits.float() / temperature, dim=-1)
+
+
+def _sample(probs: torch.Tensor) -> int:
+    return torch.multinomial(probs, num_samples=1).item()
+
+
+def _extend(model, caches, tokens: list[int], logits_positions: slice):
+    """Feed ``tokens`` through ``model`` on top of ``caches``."""
+    device = model.embedding.weight.device
+    x = torch.as_tensor([tokens], dtype=torch.int32, device=device)
+    return model(x, caches=caches, logits_positions=logits_positions)[0]
+
+
 @torch.inference_mode()
 def speculative_decode(
     prompt_tokens: list[int],
@@ -10,73 +66,112 @@ def speculative_decode(
     stop_tokens: list[int],
     temperature: float = 1.0,
     return_logprobs: bool = False,
+    adaptive_gamma: bool = True,
+    max_gamma: int = 16,
+    stats: SpeculativeStats | None = None,
 ):
     """
     Performs speculative decoding using a main model and a draft model.
+
+    Both models keep per-layer KV caches holding every committed token except
+    the last one.  Each round the draft model proposes ``gamma`` tokens one
+    at a time, recording its distributions; the main model then scores all of
+    them in a single cached forward.  Draft tokens are accepted with
+    probability ``min(1, p / q)``, the first rejection is resampled from
+    ``max(p - q, 0)`` and a full acceptance earns a bonus token, so the output
+    follows the main model's distribution.  Both caches are then truncated
+    back to the accepted length.
+
+    With ``adaptive_gamma`` the draft length grows after fully accepted
+    rounds and shrinks when less than half of a round is accepted.  Progress
+    is accumulated into ``stats`` when given.
     """
+    stats = stats if stats is not None else SpeculativeStats()
+    start_time = time.perf_counter()
+    capacity = len(prompt_tokens) + (max_tokens or 256) + max_gamma + 1
+    main_caches = new_caches(main_model, 1, capacity)
+    draft_caches = new_caches(draft_model, 1, capacity)
+
+    # Committed tokens; the caches hold all but the last one.
     tokens = list(prompt_tokens)
+    if len(tokens) > 1:
+        _extend(main_model, main_caches, tokens[:-1], slice(0, 0))
+        _extend(draft_model, draft_caches, tokens[:-1], slice(0, 0))
     num_generated_tokens = 0
 
-    while max_tokens == 0 or num_generated_tokens < max_tokens:
-        # 1. Draft model generates a sequence of gamma tokens
-        draft_tokens = list(tokens)
-        for _ in range(gamma):
-            logits = draft_model(
-                torch.as_tensor(draft_tokens, dtype=torch.int32, device=main_model.embedding.weight.device)
-            )[-1]
-            if temperature == 0.0:
-                next_token = torch.argmax(logits, dim=-1).item()
-            else:
-                probs = torch.softmax(logits / temperature, dim=-1)
-                next_token = torch.multinomial(probs, num_samples=1).item()
-            draft_tokens.append(next_token)
-
-        # 2. Main model verifies the draft tokens in parallel
-        main_logits = main_model(
-            torch.as_tensor(draft_tokens, dtype=torch.int32, device=main_model.embedding.weight.device)
-        )
-
-        accepted_tokens = 0
-        last_token = -1
-        for i in range(gamma):
-            main_prob = torch.softmax(main_logits[len(tokens) + i - 1] / temperature, dim=-1)
-            draft_prob = torch.softmax(
-                draft_model(
-                    torch.as_tensor(draft_tokens[:len(tokens) + i], dtype=torch.int32, device=main_model.embedding.weight.device)
-                )[-1] / temperature,
-                dim=-1,
-            )
+    try:
+        while max_tokens == 0 or num_generated_tokens < max_tokens:
+            base = len(tokens) - 1  # cached length of the main model
 
-            p = main_prob[draft_tokens[len(tokens) + i]]
-            q = draft_prob[draft_tokens[len(tokens) + i]]
+            # 1. Draft gamma tokens, feeding whatever the draft cache lacks.
+            draft_len = draft_caches[0].offset
+            feed = tokens[draft_len:]
+            draft_tokens, draft_probs = [], []
+            for _ in range(gamma):
+                logits = _extend(draft_model, draft_caches, feed, slice(-1, None))
+                probs = _probs(logits[-1], temperature)
+                next_token = _sample(probs)
+                draft_tokens.append(next_token)
+                draft_probs.append(probs)
+                feed = [next_token]
 
-            if torch.rand(1).item() < (p / q):
-                # Accept token
-                accepted_tokens += 1
-            else:
-                # Reject token and sample a new one from the corrected distribution
-                new_dist = (main_prob - draft_prob).clamp(min=0)
-                new_dist /= new_dist.sum()
-                last_token = torch.multinomial(new_dist, num_samples=1).item()
-                break
-
-        newly_added_tokens = draft_tokens[len(tokens):len(tokens) + accepted_tokens]
-        if last_token != -1:
-            newly_added_tokens.append(last_token)
-
-        for new_token in newly_added_tokens:
-            if max_tokens > 0 and num_generated_tokens >= max_tokens:
-                break
-
-            tokens.append(new_token)
-            num_generated_tokens += 1
-
-            if return_logprobs:
-                logprobs = torch.log_softmax(main_logits[len(tokens) - 2], dim=-1)
-                selected_logprobs = logprobs[new_token].item()
-                yield new_token, selected_logprobs
+            # 2. Verify all draft tokens (plus a bonus position) in one pass.
+            main_logits = _extend(
+                main_model, main_caches, tokens[-1:] + draft_tokens, slice(None)
+            )
+            accepted = 0
+            new_tokens = []
+            for i, token in enumerate(draft_tokens):
+                p = _probs(main_logits[i], temperature)
+                q = draft_probs[i]
+                if temperature == 0.0:
+                    ok = bool(p[token] == 1.0)
+                else:
+                    ok = torch.rand(1).item() < (p[token] / q[token]).item()
+                if not ok:
+                    if temperature == 0.0:
+                        new_tokens.append(int(torch.argmax(p)))
+                    else:
+                        residual = (p - q).clamp(min=0)
+                        new_tokens.append(_sample(residual / residual.sum()))
+                    break
+                accepted += 1
+                new_tokens.append(token)
             else:
-                yield new_token
+                new_tokens.append(_sample(_probs(main_logits[gamma], temperature)))
+
+            # 3. Roll both caches back to the committed prefix.
+            for cache in main_caches:
+                cache.truncate(base + 1 + accepted)
+            keep = min(draft_caches[0].offset, base + 1 + accepted)
+            for cache in draft_caches:
+                cache.truncate(keep)
+
+            stats.rounds += 1
+            stats.drafted += gamma
+            stats.accepted += accepted
+            stats.gammas.append(gamma)
+            if adaptive_gamma:
+                if accepted == gamma:
+                    gamma = min(gamma + 1, max_gamma)
+                elif accepted < gamma / 2:
+                    gamma = max(gamma - 1, 1)
+
+            for i, new_token in enumerate(new_tokens):
+                if max_tokens > 0 and num_generated_tokens >= max_tokens:
+                    return
+
+                tokens.append(new_token)
+                num_generated_tokens += 1
+                stats.generated += 1
+
+                if return_logprobs:
+                    logprobs = torch.log_softmax(main_logits[i].float(), dim=-1)
+                    yield new_token, logprobs[new_token].item()
+                else:
+                    yield new_token
 
-            if new_token in stop_tokens:
-                return
+                if new_token in stop_tokens:
+                    return
+    finally:
+        stats.seconds += time.perf_counter() - start_time
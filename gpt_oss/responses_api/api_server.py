@@ -39,6 +39,7 @@ from .events import (
     ResponseWebSearchCallInProgress,
     ResponseWebSearchCallSearching,
 )
+from .scheduler import BatchScheduler
 from .types import (
     Error,
     FunctionCallItem,
@@ -77,8 +78,14 @@ def is_not_builtin_tool(recipient: str) -> bool:
 
 
 def create_api_server(
-    infer_next_token: Callable[[list[int], float], int], encoding: HarmonyEncoding
+    infer_next_token: Optional[Callable[[list[int], float], int]],
+    encoding: HarmonyEncoding,
+    scheduler: Optional[BatchScheduler] = None,
 ) -> FastAPI:
+    """Build the app.  With a ``scheduler`` every stream gets its own cache slot
+    and concurrent streams take turns in shared decode steps; otherwise all
+    requests share the single ``infer_next_token`` cursor."""
+    assert infer_next_token is not None or scheduler is not None
     app = FastAPI()
     responses_store: dict[str, tuple[ResponsesRequest, ResponseObject]] = {}
 
@@ -338,6 +345,7 @@ def create_api_server(
             self.browser_tool = browser_tool
             self.use_browser_tool = browser_tool is not None
             self.browser_call_ids: list[str] = []
+            self.session = None
 
         def _send_event(self, event: ResponseEvent):
             event.sequence_number = self.sequence_number
@@ -347,7 +355,31 @@ def create_api_server(
             else:
                 return event
 
+        async def _next_token(self) -> int:
+            if scheduler is None:
+                return infer_next_token(
+                    self.tokens,
+                    temperature=self.temperature,
+                    new_request=self.new_request,
+                )
+            return await scheduler.next_token(
+                self.session,
+                self.tokens,
+                temperature=self.temperature,
+                new_request=self.new_request,
+            )
+
         async def run(self):
+            if scheduler is not None:
+                self.session = await scheduler.open_session()
+            try:
+                async for event in self._run():
+                    yield event
+            finally:
+                if scheduler is not None:
+                    scheduler.close_session(self.session)
+
+        async def _run(self):
             browser_tool = self.browser_tool
             self.new_request = True
             initial_response = generate_response(
@@ -389,11 +421,7 @@ def create_api_server(
                 if self.request is not None and await self.request.is_disconnected():
                     print("Client disconnected, stopping token generation.")
                     break
-                next_tok = infer_next_token(
-                    self.tokens,
-                    temperature=self.temperature,
-                    new_request=self.new_request,
-                )
+                next_tok = await self._next_token()
                 self.new_request = False
                 self.tokens.append(next_tok)
                 try:
@@ -785,6 +813,10 @@ def create_api_server(
                     )
                 )
 
+    @app.get("/v1/metrics")
+    async def metrics():
+        return scheduler.metrics() if scheduler is not None else {}
+
     @app.post("/v1/responses", response_model=ResponseObject)
     async def generate(body: ResponsesRequest, request: Request):
         print("request received")
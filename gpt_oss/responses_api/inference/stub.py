@@ -140,3 +140,19 @@ def stub_infer_next_token(
 
 def setup_model(_checkpoint: str) -> Callable[[list[int], float], int]:
     return stub_infer_next_token
+
+
+def setup_batched_model(_checkpoint: str, max_sessions: int = 4):
+    """Batched stub: one fake-token queue per cache slot, one delay per step."""
+    queues = [fake_tokens.copy() for _ in range(max_sessions)]
+
+    def infer_next_tokens(slots, tokens, temperatures, new_requests):
+        out = []
+        for slot in slots:
+            out.append(queues[slot].pop(0))
+            if len(queues[slot]) == 0:
+                queues[slot] = fake_tokens.copy()
+        time.sleep(0.1)
+        return out
+
+    return infer_next_tokens
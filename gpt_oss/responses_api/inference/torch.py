@@ -0,0 +1,39 @@
+"""
+Reference torch backend (:class:`gpt_oss.torch.model.TokenGenerator`).  With
+``--max-sessions`` every decode step runs all active sessions in one batched
+forward, so a new request joins the running batch instead of waiting for it.
+"""
+
+import os
+from typing import Callable
+
+import torch
+
+from gpt_oss.torch.model import TokenGenerator
+
+rank = int(
+    os.environ.get("RANK", 0)
+)  # set this env var to another value to run on other GPUs
+
+
+def load_generator(checkpoint: str) -> TokenGenerator:
+    print(f"[{rank}] loading model...")
+    torch.set_grad_enabled(False)
+    if torch.cuda.is_available():
+        torch.cuda.set_device(rank)
+        device = torch.device(f"cuda:{rank}")
+    else:
+        device = torch.device("cpu")
+    generator = TokenGenerator(checkpoint, device=device)
+    print(f"[{rank}] loaded")
+    return generator
+
+
+def setup_model(checkpoint: str) -> Callable[[list[int], float, bool], int]:
+    return load_generator(checkpoint).infer_next_token
+
+
+def setup_batched_model(checkpoint: str, max_sessions: int = 4):
+    """One row of a shared set of KV caches per session slot, decoded
+    together (see :meth:`TokenGenerator.slot_backend`)."""
+    return load_generator(checkpoint).slot_backend(max_sessions)
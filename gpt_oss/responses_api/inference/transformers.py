@@ -1,9 +1,11 @@
 """
 NOTE: this is not the most efficient way to use transformers. It's a simple implementation that infers
-one token at a time to mimic the behavior of the Triton implementation.
+one token at a time to mimic the behavior of the Triton implementation, reusing the KV cache for the
+longest common prefix between calls.
 """
 
 import os
+import threading
 from typing import Callable, List, Optional
 
 import torch
@@ -37,30 +39,102 @@ def load_model(checkpoint: str, device: Optional[str] = None):
     return model
 
 
+def lcp(cache: List[int], inp: List[int]) -> List[int]:
+    i = 0
+    max_len = min(len(cache), len(inp))
+    while i < max_len and cache[i] == inp[i]:
+        i += 1
+    return cache[:i]
+
+
+def sample_next_token(
+    logits: torch.Tensor, temperature: float = DEFAULT_TEMPERATURE
+) -> int:
+    if temperature == 0.0:
+        return torch.argmax(logits, dim=-1).item()
+    probs = torch.softmax(logits.float() * (1.0 / temperature), dim=-1)
+    return torch.multinomial(probs, num_samples=1).item()
+
+
+class KVSession:
+    """Persistent past-key-values for one decode stream.
+
+    Mirrors the ``lcp`` logic of the triton backend: every call keeps the
+    longest common prefix with the tokens already in the cache, crops the
+    cache to it and runs the model over the new suffix only.  Continuing a
+    conversation after a tool call, or drawing another sample from the same
+    prompt, therefore costs one forward over the tokens that changed rather
+    than a full re-prefill.
+    """
+
+    def __init__(self, model: PreTrainedModel):
+        self.model = model
+        self.tokens_so_far: List[int] = []
+        self.past_key_values = None
+        self.forwarded_tokens = 0  # tokens actually run through the model
+
+    def reset(self) -> None:
+        self.tokens_so_far = []
+        self.past_key_values = None
+
+    def _crop(self, length: int) -> None:
+        if length == 0 or self.past_key_values is None:
+            self.reset()
+            return
+        if not hasattr(self.past_key_values, "crop"):
+            # Legacy tuple caches cannot be truncated in place.
+            self.reset()
+            return
+        self.past_key_values.crop(length)
+        self.tokens_so_far = self.tokens_so_far[:length]
+
+    @torch.inference_mode()
+    def next_logits(self, tokens: List[int]) -> torch.Tensor:
+        keep = len(lcp(self.tokens_so_far, tokens))
+        # At least one token must be fed to obtain logits for the last position.
+        keep = min(keep, len(tokens) - 1)
+        if keep < len(self.tokens_so_far):
+            self._crop(keep)
+        keep = len(self.tokens_so_far)
+        new_tokens = tokens[keep:]
+        input_ids = torch.tensor(
+            [new_tokens], dtype=torch.int64, device=self.model.device
+        )
+        out = self.model(
+            input_ids=input_ids,
+            past_key_values=self.past_key_values,
+            use_cache=True,
+        )
+        self.past_key_values = out.past_key_values
+        self.tokens_so_far = list(tokens)
+        self.forwarded_tokens += len(new_tokens)
+        return out.logits[0, -1, :]
+
+
 def get_infer_next_token(model: PreTrainedModel):
     """
     Return a callable with the same shape as the original triton implementation:
       infer_next_token(tokens: List[int], temperature: float, new_request: bool) -> int
 
     Implementation detail:
-      - We issue a single-token generation with using model.generate
-      - generate handles sampling (temperature=0 => greedy, otherwise, sampling).
+      - A single :class:`KVSession` keeps past key/values between calls, so
+        each call only runs the model over tokens not already cached.
+      - temperature=0 => greedy, otherwise multinomial sampling.
     """
 
+    session = KVSession(model)
+    lock = threading.Lock()
+
     def infer_next_token(
         tokens: List[int],
         temperature: float = DEFAULT_TEMPERATURE,
-        new_request: bool = False,  # kept for interface compatibility; unused here
+        new_request: bool = False,  # kept for interface compatibility; the LCP decides reuse
     ) -> int:
-        tokens = torch.tensor([tokens], dtype=torch.int64, device=model.device)
-        output = model.generate(
-            tokens,
-            max_new_tokens=1,
-            do_sample=temperature != 0,
-            temperature=temperature,
-        )
-        return output[0, -1].tolist()
+        with lock:
+            logits = session.next_logits(tokens)
+            return sample_next_token(logits, temperature=temperature)
 
+    infer_next_token.session = session
     return infer_next_token
 
 
@@ -70,3 +144,14 @@ def setup_model(
     model = load_model(checkpoint, device=device)
     infer_next_token = get_infer_next_token(model)
     return infer_next_token
+
+
+def setup_batched_model(
+    checkpoint: str, max_sessions: int = 4, device: Optional[str] = None
+):
+    """One :class:`KVSession` per session slot, sharing the weights.  Slots are
+    decoded one at a time."""
+    from gpt_oss.responses_api.scheduler import per_slot_backend
+
+    model = load_model(checkpoint, device=device)
+    return per_slot_backend(lambda: get_infer_next_token(model), max_sessions)
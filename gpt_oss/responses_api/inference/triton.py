@@ -1,14 +1,23 @@
+import math
 import os
 from typing import Callable
 
 os.environ["PYTORCH_CUDA_ALLOC_CONF"] = "expandable_segments:True"
 import torch
 
-from gpt_oss.triton.model import Cache, Transformer
+from gpt_oss.triton.cache import KV_BLOCK_SIZE, BlockPool, PagedCache
+from gpt_oss.triton.model import Transformer
+from gpt_oss.triton.prefix_cache import PrefixCache, cache_blocks, restore
 
 DEFAULT_TEMPERATURE = 0.0
 CONTEXT = 16_384
 CONCURRENT_SESSIONS = 1
+# Device memory for KV blocks of prefixes shared across requests and sessions;
+# the block pool is grown by this much.
+PREFIX_CACHE_BYTES = int(os.environ.get("PREFIX_CACHE_BYTES", 4 << 30))
+# KV cache tokens per layer shared by all sessions (default: one full context
+# per session); lower it to admit more sessions than fit at full length.
+KV_CACHE_TOKENS = int(os.environ.get("KV_CACHE_TOKENS", 0))
 
 rank = int(
     os.environ.get("RANK", 0)
@@ -29,10 +38,38 @@ def load_model(checkpoint: str):
     return model, device
 
 
-def get_infer_next_token(model, device):
+def new_block_pool(model, device, max_sessions: int) -> BlockPool:
+    config = model.config
+    tokens = KV_CACHE_TOKENS or CONTEXT * max_sessions
+    # bf16 keys and values of one block
+    block_bytes = 2 * KV_BLOCK_SIZE * config.num_key_value_heads * config.head_dim * 2
+    return BlockPool(
+        len(model.block) * math.ceil(tokens / KV_BLOCK_SIZE)
+        + PREFIX_CACHE_BYTES // block_bytes
+        + 1,
+        KV_BLOCK_SIZE,
+        config.num_key_value_heads,
+        config.head_dim,
+        device=device,
+    )
+
+
+def get_infer_next_token(
+    model,
+    device,
+    prefix_cache: PrefixCache | None = None,
+    pool: BlockPool | None = None,
+):
+    if pool is None:
+        pool = (
+            prefix_cache.pool
+            if prefix_cache is not None
+            else new_block_pool(model, device, CONCURRENT_SESSIONS)
+        )
+    # Prefixes are shared by reference to their blocks.
+    assert prefix_cache is None or prefix_cache.pool is pool
     caches = [
-        Cache(CONCURRENT_SESSIONS, CONTEXT, model.config.num_key_value_heads)
-        for _ in range(len(model.block))
+        PagedCache(pool, CONCURRENT_SESSIONS, CONTEXT) for _ in range(len(model.block))
     ]
     # offsets = torch.zeros(CONCURRENT_SESSIONS, dtype=torch.int32, device=device) # TBD
     input_token = torch.zeros(
@@ -69,6 +106,18 @@ def get_infer_next_token(model, device):
     ) -> int:
         nonlocal tokens_so_far
         tokens_so_far = lcp(tokens_so_far, tokens)
+        # At least one token must be fed to obtain logits for the last position.
+        tokens_so_far = tokens_so_far[: len(tokens) - 1]
+        if prefix_cache is not None and len(tokens_so_far) < len(tokens) - 1:
+            # Another request (or session) may already have computed more of
+            # this prompt, e.g. the shared system and developer messages.
+            match = prefix_cache.match(tokens[:-1])
+            try:
+                if match.length > len(tokens_so_far):
+                    restore(caches, prefix_cache.gather(match), match.length)
+                    tokens_so_far = tokens[: match.length]
+            finally:
+                prefix_cache.release(match)
         for cache in caches:
             cache.truncate(len(tokens_so_far))
         all_tokens = tokens  # for pdb
@@ -84,7 +133,12 @@ def get_infer_next_token(model, device):
             breakpoint()
 
         input_token[-1] = tokens[-1]
+        for cache in caches:
+            cache.reserve(1)
         graph.replay()
+        if prefix_cache is not None and len(tokens) > 1:
+            prefix_cache.insert(all_tokens, cache_blocks(caches))
+        tokens_so_far = list(all_tokens)
 
         # decide next token on rank‑0
         next_tok = sample_next_token(logits, temperature=temperature)
@@ -96,5 +150,21 @@ def get_infer_next_token(model, device):
 
 def setup_model(checkpoint: str) -> Callable[[list[int], float], int]:
     model, device = load_model(checkpoint)
-    infer_next_token = get_infer_next_token(model, device)
+    pool = new_block_pool(model, device, CONCURRENT_SESSIONS)
+    infer_next_token = get_infer_next_token(
+        model, device, PrefixCache(pool, PREFIX_CACHE_BYTES)
+    )
     return infer_next_token
+
+
+def setup_batched_model(checkpoint: str, max_sessions: int = CONCURRENT_SESSIONS):
+    """One set of caches (and CUDA graph) per session slot, sharing the weights,
+    a KV block pool and a prefix cache.  Slots are decoded one at a time."""
+    from gpt_oss.responses_api.scheduler import per_slot_backend
+
+    model, device = load_model(checkpoint)
+    pool = new_block_pool(model, device, max_sessions)
+    prefix_cache = PrefixCache(pool, PREFIX_CACHE_BYTES)
+    return per_slot_backend(
+        lambda: get_infer_next_token(model, device, prefix_cache, pool), max_sessions
+    )
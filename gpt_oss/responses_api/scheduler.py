@@ -0,0 +1,218 @@
+"""
+Continuous-batching request scheduler for the Responses API server.
+
+``create_api_server`` used to call one ``infer_next_token`` closure from every
+request handler, so concurrent streams shared (and kept resetting) a single
+decode cursor.  The scheduler instead gives every stream its own cache slot
+and runs decode *steps*: each step gathers the pending next-token request of
+every active stream and hands them to a batched backend in one call.  New
+streams join the running batch at the next step; at most
+``max_prefills_per_step`` newly admitted streams are added per step so a
+burst of long prompts does not stall streams that are already decoding.
+
+A batched backend has the signature::
+
+    infer_next_tokens(slots, tokens, temperatures, new_requests) -> list[int]
+
+where ``slots[i]`` identifies the cache slot of request ``i``.  A backend
+that decodes the requests of a step in one forward pass gets batched
+throughput; the torch backend does (``TokenGenerator.slot_backend``).
+:func:`per_slot_backend` builds one from any per-session ``infer_next_token``
+factory, but runs the slots of a step one after another: streams keep their
+own caches and take turns fairly, while throughput stays that of a single
+stream.  The triton and transformers backends use it.
+"""
+
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+InferNextTokens = Callable[
+    [list[int], list[list[int]], list[float], list[bool]], list[int]
+]
+
+
+def per_slot_backend(
+    make_infer_next_token: Callable[[], Callable[..., int]], max_sessions: int
+) -> InferNextTokens:
+    """Give each slot its own single-stream ``infer_next_token`` (and cache).
+
+    The requests of a step are decoded sequentially, not as one batch.
+    """
+    slots = [make_infer_next_token() for _ in range(max_sessions)]
+
+    def infer_next_tokens(slot_ids, tokens, temperatures, new_requests):
+        return [
+            slots[s](t, temperature=temp, new_request=new)
+            for s, t, temp, new in zip(slot_ids, tokens, temperatures, new_requests)
+        ]
+
+    return infer_next_tokens
+
+
+@dataclass
+class Session:
+    id: int
+    slot: Optional[int] = None
+    opened_at: float = field(default_factory=time.monotonic)
+    first_token_at: Optional[float] = None
+    prefilled: bool = False
+
+
+@dataclass
+class _Pending:
+    session: Session
+    tokens: list[int]
+    temperature: float
+    new_request: bool
+    future: asyncio.Future
+
+
+class BatchScheduler:
+    def __init__(
+        self,
+        infer_next_tokens: InferNextTokens,
+        max_sessions: int,
+        max_prefills_per_step: int = 1,
+    ):
+        self.infer_next_tokens = infer_next_tokens
+        self.max_sessions = max_sessions
+        self.max_prefills_per_step = max(1, max_prefills_per_step)
+        self._free_slots = list(range(max_sessions))
+        self._waiting: list[tuple[Session, asyncio.Future]] = []
+        self._pending: list[_Pending] = []
+        self._ids = itertools.count()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        # metrics
+        self.steps = 0
+        self.tokens_generated = 0
+        self.ttft: list[float] = []
+        self.batch_sizes: list[int] = []
+
+    # ---- session lifecycle -------------------------------------------
+    async def open_session(self) -> Session:
+        """Reserve a cache slot, waiting in the queue while all are busy."""
+        session = Session(id=next(self._ids))
+        if self._free_slots:
+            session.slot = self._free_slots.pop(0)
+            return session
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append((session, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Leave the queue, or pass on a slot granted just before.
+            self.close_session(session)
+            raise
+        return session
+
+    def close_session(self, session: Session) -> None:
+        if session.slot is None:
+            self._waiting = [(s, f) for s, f in self._waiting if s is not session]
+            return
+        slot, session.slot = session.slot, None
+        while self._waiting:
+            nxt, future = self._waiting.pop(0)
+            if not future.done():  # skip waiters that were cancelled
+                nxt.slot = slot
+                future.set_result(None)
+                return
+        self._free_slots.append(slot)
+
+    # ---- decoding ----------------------------------------------------
+    async def next_token(
+        self,
+        session: Session,
+        tokens: list[int],
+        temperature: float,
+        new_request: bool = False,
+    ) -> int:
+        assert session.slot is not None, "session has no cache slot"
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(
+            _Pending(session, list(tokens), temperature, new_request, future)
+        )
+        self._ensure_loop()
+        self._wakeup.set()
+        token = await future
+        if session.first_token_at is None:
+            session.first_token_at = time.monotonic()
+            self.ttft.append(session.first_token_at - session.opened_at)
+        return token
+
+    def _ensure_loop(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.get_running_loop().create_task(self._run())
+
+    def _take_step(self) -> list[_Pending]:
+        """Every decoding stream plus a bounded number of new prefills."""
+        step, deferred, prefills = [], [], 0
+        for req in self._pending:
+            if req.session.prefilled:
+                step.append(req)
+            elif prefills < self.max_prefills_per_step:
+                step.append(req)
+                prefills += 1
+            else:
+                deferred.append(req)
+        self._pending = deferred
+        return step
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            # let streams that just received a token enqueue their next request
+            await asyncio.sleep(0)
+            step = self._take_step()
+            if not step:
+                continue
+            try:
+                out = await loop.run_in_executor(
+                    None,
+                    self.infer_next_tokens,
+                    [r.session.slot for r in step],
+                    [r.tokens for r in step],
+                    [r.temperature for r in step],
+                    [r.new_request or not r.session.prefilled for r in step],
+                )
+            except Exception as e:
+                for r in step:
+                    if not r.future.done():
+                        r.future.set_exception(e)
+                continue
+            self.steps += 1
+            self.batch_sizes.append(len(step))
+            self.tokens_generated += len(step)
+            for r, tok in zip(step, out):
+                r.session.prefilled = True
+                if not r.future.done():
+                    r.future.set_result(tok)
+
+    # ---- metrics -----------------------------------------------------
+    def metrics(self) -> dict:
+        ttft = sorted(self.ttft)
+        return {
+            "queue_depth": len(self._waiting),
+            "pending_requests": len(self._pending),
+            "active_sessions": self.max_sessions - len(self._free_slots),
+            "max_sessions": self.max_sessions,
+            "steps": self.steps,
+            "tokens_generated": self.tokens_generated,
+            "mean_batch_size": (
+                sum(self.batch_sizes) / len(self.batch_sizes)
+                if self.batch_sizes
+                else 0.0
+            ),
+            "ttft_mean_s": sum(ttft) / len(ttft) if ttft else None,
+            "ttft_p50_s": ttft[len(ttft) // 2] if ttft else None,
+            "ttft_max_s": ttft[-1] if ttft else None,
+        }
@@ -1,6 +1,7 @@
 # torchrun --nproc-per-node=4 serve.py
 
 import argparse
+import importlib
 
 import uvicorn
 from openai_harmony import HarmonyEncodingName, load_harmony_encoding
@@ -32,6 +33,17 @@ if __name__ == "__main__":
         # default to metal on macOS, triton on other platforms
         default="metal" if __import__("platform").system() == "Darwin" else "triton",
     )
+    parser.add_argument(
+        "--max-sessions",
+        metavar="N",
+        type=int,
+        default=1,
+        help=(
+            "Concurrent sessions, each with its own cache slot; the torch "
+            "backend decodes the slots of a step in one batch, the triton and "
+            "transformers backends one after another"
+        ),
+    )
     args = parser.parse_args()
 
     if args.inference_backend == "triton":
@@ -46,10 +58,27 @@ if __name__ == "__main__":
         from .inference.vllm import setup_model
     elif args.inference_backend == "transformers":
         from .inference.transformers import setup_model
+    elif args.inference_backend == "torch":
+        from .inference.torch import setup_model
     else:
         raise ValueError(f"Invalid inference backend: {args.inference_backend}")
 
     encoding = load_harmony_encoding(HarmonyEncodingName.HARMONY_GPT_OSS)
 
-    infer_next_token = setup_model(args.checkpoint)
-    uvicorn.run(create_api_server(infer_next_token, encoding), port=args.port)
+    if args.max_sessions > 1:
+        from .scheduler import BatchScheduler
+
+        backend = importlib.import_module(setup_model.__module__)
+        if not hasattr(backend, "setup_batched_model"):
+            raise ValueError(
+                f"{args.inference_backend} backend does not support --max-sessions"
+            )
+        scheduler = BatchScheduler(
+            backend.setup_batched_model(args.checkpoint, args.max_sessions),
+            max_sessions=args.max_sessions,
+        )
+        app = create_api_server(None, encoding, scheduler=scheduler)
+    else:
+        infer_next_token = setup_model(args.checkpoint)
+        app = create_api_server(infer_next_token, encoding)
+    uvicorn.run(app, port=args.port)
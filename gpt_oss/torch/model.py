@@ -1,12 +1,20 @@
+import copy
+import functools
 import json
 import math
 import os
+import time
 from dataclasses import dataclass
 
 import torch
 import torch.distributed as dist
 
-from gpt_oss.torch.weights import Checkpoint
+from gpt_oss.torch.weights import (
+    DEFAULT_LOAD_BUDGET_BYTES,
+    Checkpoint,
+    dequantize_mxfp4,
+    peak_rss_bytes,
+)
 
 
 @dataclass
@@ -81,6 +89,25 @@ class RotaryEmbedding(torch.nn.Module):
         self.ntk_alpha = ntk_alpha
         self.ntk_beta = ntk_beta
         self.device = device
+        # cos/sin for positions [0, len(self.cos)), grown geometrically on
+        # demand so every layer (and decode step) just slices it.
+        self.cos = self.sin = None
+        self.concentration = self.inv_freq = None
+
+    @staticmethod
+    def for_config(
+        config: ModelConfig, device: torch.device | None = None
+    ) -> "RotaryEmbedding":
+        return RotaryEmbedding(
+            config.head_dim,
+            config.rope_theta,
+            torch.float32,
+            initial_context_length=config.initial_context_length,
+            scaling_factor=config.rope_scaling_factor,
+            ntk_alpha=config.rope_ntk_alpha,
+            ntk_beta=config.rope_ntk_beta,
+            device=device,
+        )
 
     def _compute_concentration_and_inv_freq(self) -> torch.Tensor:
         """See YaRN paper: https://arxiv.org/abs/2309.00071"""
@@ -122,29 +149,54 @@ class RotaryEmbedding(torch.nn.Module):
 
         return concentration, inv_freq
 
-    def _compute_cos_sin(self, num_tokens: int):
-        concentration, inv_freq = self._compute_concentration_and_inv_freq()
-        t = torch.arange(num_tokens, dtype=torch.float32, device=self.device)
-        freqs = torch.einsum("i,j->ij", t, inv_freq)
-        cos = freqs.cos() * concentration
-        sin = freqs.sin() * concentration
-        return cos, sin
+    def _grow(self, num_positions: int) -> None:
+        if self.inv_freq is None:
+            self.concentration, self.inv_freq = (
+                self._compute_concentration_and_inv_freq()
+            )
+        capacity = 256 if self.cos is None else len(self.cos)
+        while capacity < num_positions:
+            capacity *= 2
+        t = torch.arange(capacity, dtype=torch.float32, device=self.inv_freq.device)
+        freqs = torch.einsum("i,j->ij", t, self.inv_freq)
+        self.cos = freqs.cos() * self.concentration
+        self.sin = freqs.sin() * self.concentration
+
+    def _compute_cos_sin(self, start: int, num_tokens: int):
+        """cos/sin for positions ``[start, start + num_tokens)``."""
+        if self.cos is None or len(self.cos) < start + num_tokens:
+            self._grow(start + num_tokens)
+        end = start + num_tokens
+        return self.cos[start:end], self.sin[start:end]
 
     def forward(
         self,
         query: torch.Tensor,
         key: torch.Tensor,
+        positions: torch.Tensor | None = None,
+        start: int = 0,
     ) -> tuple[torch.Tensor, torch.Tensor]:
-        num_tokens = query.shape[0]
-        cos, sin = self._compute_cos_sin(num_tokens)
+        if self.inv_freq is not None and self.inv_freq.device != query.device:
+            # The model was moved after the table was built.
+            self.inv_freq = self.inv_freq.to(query.device)
+            self.cos, self.sin = self.cos.to(query.device), self.sin.to(query.device)
+        if positions is None:
+            num_tokens = query.shape[0]
+            cos, sin = self._compute_cos_sin(start, num_tokens)
+            lead_shape = (num_tokens,)
+        else:
+            # Explicit (possibly batched) positions, e.g. when decoding with a cache.
+            cos, sin = self._compute_cos_sin(0, int(positions.max()) + 1)
+            cos, sin = cos[positions], sin[positions]
+            lead_shape = tuple(positions.shape)
 
         query_shape = query.shape
-        query = query.view(num_tokens, -1, self.head_dim)
+        query = query.view(*lead_shape, -1, self.head_dim)
         query = _apply_rotary_emb(query, cos, sin)
         query = query.reshape(query_shape)
 
         key_shape = key.shape
-        key = key.view(num_tokens, -1, self.head_dim)
+        key = key.view(*lead_shape, -1, self.head_dim)
         key = _apply_rotary_emb(key, cos, sin)
         key = key.reshape(key_shape)
         return query, key
@@ -173,12 +225,418 @@ def sdpa(Q, K, V, S, sm_scale, sliding_window=0):
     return attn.reshape(n_tokens, -1)
 
 
+def _grow(t: torch.Tensor, needed: int) -> torch.Tensor:
+    """Pad dim 1 of ``t`` geometrically until it holds ``needed`` slots."""
+    capacity = max(t.shape[1], 1)
+    if needed <= t.shape[1]:
+        return t
+    while capacity < needed:
+        capacity *= 2
+    pad = (0, 0) * (t.dim() - 2) + (0, capacity - t.shape[1])
+    return torch.nn.functional.pad(t, pad)
+
+
+class Cache:
+    """Per-layer key/value cache for a batch of sequences decoded in lockstep.
+
+    Prompts are left-padded to a common length, so every row shares a single
+    write cursor (``offset``); ``valid`` marks the slots that hold real tokens
+    and ``lengths`` counts them per row (which is also the next RoPE position).
+    Storage grows geometrically, and truncation only moves the cursor.
+    """
+
+    # Per-slot tensors, indexed ``(batch, slot, ...)``.
+    _slot_fields = ("k", "v", "valid")
+    _kv_fields = ("k", "v")
+
+    def __init__(
+        self,
+        batch_size: int,
+        n_kv_heads: int,
+        d_head: int = 64,
+        capacity: int = 256,
+        device: torch.device | None = None,
+        dtype: torch.dtype = torch.bfloat16,
+    ):
+        shape = (batch_size, capacity, n_kv_heads, d_head)
+        self.k = torch.zeros(shape, dtype=dtype, device=device)
+        self.v = torch.zeros(shape, dtype=dtype, device=device)
+        self.valid = torch.zeros(
+            (batch_size, capacity), dtype=torch.bool, device=device
+        )
+        self.lengths = torch.zeros(batch_size, dtype=torch.long, device=device)
+        self.offset = 0
+
+    @property
+    def batch_size(self) -> int:
+        return self.valid.shape[0]
+
+    def kv_bytes(self) -> int:
+        """Bytes of key/value storage holding the cached slots."""
+        return sum(
+            getattr(self, name)[:, : self.offset].nbytes for name in self._kv_fields
+        )
+
+    def reset(self):
+        self.truncate(0)
+
+    def truncate(self, n_ctx: int):
+        """Drop every slot from ``n_ctx`` on (O(1): only the cursor moves)."""
+        assert 0 <= n_ctx <= self.offset
+        self.offset = n_ctx
+        self.lengths = self.valid[:, :n_ctx].sum(dim=1)
+
+    def truncate_row(self, row: int, n_tokens: int):
+        """Keep the first ``n_tokens`` tokens of ``row`` only.  The write cursor
+        is shared, so the slots of the dropped tokens stay behind as padding."""
+        valid = self.valid[row, : self.offset]
+        valid &= token_positions(valid[None])[0] <= n_tokens
+        self.lengths[row] = valid.sum()
+
+    def compact(self):
+        """Drop the padding between tokens: every row's tokens are moved, in
+        order, to the end of a buffer as long as the longest row (a copy)."""
+        if self.offset == 0:
+            return
+        n_ctx = int(self.lengths.max())
+        # A stable sort puts each row's padding slots first and keeps its
+        # tokens in order; a row shorter than n_ctx keeps padding on the left.
+        order = torch.sort(self.valid[:, : self.offset].long(), dim=1, stable=True)
+        index = order.indices[:, self.offset - n_ctx :]
+        for name in self._slot_fields:
+            t = getattr(self, name)[:, : self.offset]
+            idx = index.reshape(*index.shape, *[1] * (t.dim() - 2))
+            setattr(self, name, t.gather(1, idx.expand(-1, -1, *t.shape[2:])))
+        self.offset = n_ctx
+
+    def repeat_interleave(self, n: int):
+        """Repeat each cache entry n times along the batch dimension.
+
+        Only the filled slots are copied; storage grows again on write.
+        """
+        for name in self._slot_fields:
+            filled = getattr(self, name)[:, : self.offset]
+            setattr(self, name, filled.repeat_interleave(n, dim=0))
+        self.lengths = self.lengths.repeat_interleave(n, dim=0)
+
+    def fork(self, n: int = 1) -> "Cache":
+        """A new cache repeating each row ``n`` times; ``self`` is unchanged.
+
+        The copy holds the filled slots only, so a forked prefix costs
+        :meth:`kv_bytes` per row rather than the parent's whole capacity.
+        """
+        other = copy.copy(self)
+        other.repeat_interleave(n)
+        return other
+
+    def _reserve(self, n_new: int):
+        for name in self._slot_fields:
+            setattr(self, name, _grow(getattr(self, name), self.offset + n_new))
+
+    def _write(self, start: int, k: torch.Tensor, v: torch.Tensor):
+        self.k[:, start : start + k.shape[1]] = k
+        self.v[:, start : start + v.shape[1]] = v
+
+    def _read(self, end: int) -> tuple[torch.Tensor, torch.Tensor]:
+        return self.k[:, :end], self.v[:, :end]
+
+    def positions(self, valid: torch.Tensor) -> torch.Tensor:
+        """RoPE positions for the next ``valid.shape[1]`` slots of every row."""
+        pos = self.lengths[:, None] + torch.cumsum(valid.long(), dim=1) - 1
+        return pos.clamp(min=0)
+
+    def extend(self, k: torch.Tensor, v: torch.Tensor, valid: torch.Tensor):
+        batch_size, n_ctx, *_rest = k.shape
+        assert batch_size == self.batch_size
+        self._reserve(n_ctx)
+        end = self.offset + n_ctx
+        self._write(self.offset, k, v)
+        self.valid[:, self.offset : end] = valid
+        self.lengths = self.lengths + valid.sum(dim=1)
+        self.offset = end
+        return *self._read(end), self.valid[:, :end]
+
+
+def quantize_int8(x: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+    """Symmetric int8 with one float32 scale per vector along the last dim."""
+    scale = x.abs().amax(dim=-1).float().clamp(min=1e-8) / 127.0
+    q = torch.round(x.float() / scale[..., None]).clamp(-127, 127)
+    return q.to(torch.int8), scale
+
+
+def dequantize_int8(q: torch.Tensor, scale: torch.Tensor, dtype: torch.dtype):
+    return (q.float() * scale[..., None]).to(dtype)
+
+
+class QuantizedCache(Cache):
+    """:class:`Cache` storing keys/values as int8 with one scale per token and
+    head; attention reads dequantize them on the fly."""
+
+    _slot_fields = ("k", "v", "k_scale", "v_scale", "valid")
+    _kv_fields = ("k", "v", "k_scale", "v_scale")
+
+    def __init__(
+        self,
+        batch_size: int,
+        n_kv_heads: int,
+        d_head: int = 64,
+        capacity: int = 256,
+        device: torch.device | None = None,
+        dtype: torch.dtype = torch.bfloat16,
+    ):
+        super().__init__(batch_size, n_kv_heads, d_head, capacity, device, torch.int8)
+        self.dtype = dtype
+        shape = (batch_size, capacity, n_kv_heads)
+        self.k_scale = torch.zeros(shape, dtype=torch.float32, device=device)
+        self.v_scale = torch.zeros(shape, dtype=torch.float32, device=device)
+
+    def _write(self, start, k, v):
+        end = start + k.shape[1]
+        self.k[:, start:end], self.k_scale[:, start:end] = quantize_int8(k)
+        self.v[:, start:end], self.v_scale[:, start:end] = quantize_int8(v)
+
+    def _read(self, end):
+        return (
+            dequantize_int8(self.k[:, :end], self.k_scale[:, :end], self.dtype),
+            dequantize_int8(self.v[:, :end], self.v_scale[:, :end], self.dtype),
+        )
+
+
+def _sketch(x: torch.Tensor, rank: int) -> tuple[torch.Tensor, torch.Tensor]:
+    """Rank-``rank`` truncated SVD of ``(batch, n, heads, d)`` rows per head:
+    ``x ~= einsum("bnhr,bhrd->bnhd", u, sv)``."""
+    U, S, Vh = torch.linalg.svd(x.float().transpose(1, 2), full_matrices=False)
+    u = U[..., :rank].transpose(1, 2)
+    sv = S[..., :rank, None] * Vh[..., :rank, :]
+    return u.to(x.dtype).contiguous(), sv.to(x.dtype)
+
+
+def _unsketch(u: torch.Tensor, sv: torch.Tensor) -> torch.Tensor:
+    return torch.einsum("bnhr,bhrd->bnhd", u, sv)
+
+
+class SketchedCache(Cache):
+    """:class:`Cache` that keeps the latest ``recent`` slots exact and folds
+    older ones, ``chunk`` slots at a time, into per-head rank-``rank``
+    truncated SVDs (``chunk * rank + rank * d_head`` values per head instead
+    of ``chunk * d_head``).  Meant for full-attention layers; sliding-window
+    layers never look that far back.
+
+    ``k``/``v`` hold only the exact slots, starting at slot ``sketched``.
+    """
+
+    _slot_fields = ("valid",)
+
+    def __init__(
+        self,
+        batch_size: int,
+        n_kv_heads: int,
+        d_head: int = 64,
+        capacity: int = 256,
+        device: torch.device | None = None,
+        dtype: torch.dtype = torch.bfloat16,
+        rank: int = 16,
+        recent: int = 256,
+        chunk: int = 128,
+    ):
+        super().__init__(batch_size, n_kv_heads, d_head, capacity, device, dtype)
+        assert 0 < rank <= min(chunk, d_head)
+        self.rank, self.recent, self.chunk = rank, recent, chunk
+        self.sketched = 0
+        # one (k_u, k_sv, v_u, v_sv) per compressed chunk
+        self.segments: list[tuple[torch.Tensor, ...]] = []
+
+    def kv_bytes(self) -> int:
+        exact = self.offset - self.sketched
+        return (
+            self.k[:, :exact].nbytes
+            + self.v[:, :exact].nbytes
+            + sum(t.nbytes for segment in self.segments for t in segment)
+        )
+
+    def truncate(self, n_ctx: int):
+        if n_ctx < self.sketched:
+            # Re-materialise the kept part of a partially dropped chunk.
+            keep, tail = divmod(n_ctx, self.chunk)
+            k_u, k_sv, v_u, v_sv = self.segments[keep]
+            self.k = _unsketch(k_u[:, :tail], k_sv)
+            self.v = _unsketch(v_u[:, :tail], v_sv)
+            self.segments = self.segments[:keep]
+            self.sketched = keep * self.chunk
+        super().truncate(n_ctx)
+
+    def repeat_interleave(self, n: int):
+        super().repeat_interleave(n)
+        exact = self.offset - self.sketched
+        self.k = self.k[:, :exact].repeat_interleave(n, dim=0)
+        self.v = self.v[:, :exact].repeat_interleave(n, dim=0)
+        self.segments = [
+            tuple(t.repeat_interleave(n, dim=0) for t in segment)
+            for segment in self.segments
+        ]
+
+    def compact(self):
+        raise NotImplementedError("sketched slots cannot be moved")
+
+    def _reserve(self, n_new: int):
+        super()._reserve(n_new)
+        needed = self.offset - self.sketched + n_new
+        self.k, self.v = _grow(self.k, needed), _grow(self.v, needed)
+
+    def _write(self, start, k, v):
+        super()._write(start - self.sketched, k, v)
+
+    def _read(self, end):
+        exact = end - self.sketched
+        keys = [_unsketch(k_u, k_sv) for k_u, k_sv, _, _ in self.segments]
+        values = [_unsketch(v_u, v_sv) for _, _, v_u, v_sv in self.segments]
+        return (
+            torch.cat(keys + [self.k[:, :exact]], dim=1),
+            torch.cat(values + [self.v[:, :exact]], dim=1),
+        )
+
+    def extend(self, k, v, valid):
+        out = super().extend(k, v, valid)
+        while self.offset - self.sketched >= self.recent + self.chunk:
+            old_k, old_v = self.k[:, : self.chunk], self.v[:, : self.chunk]
+            self.segments.append(
+                (*_sketch(old_k, self.rank), *_sketch(old_v, self.rank))
+            )
+            self.k = self.k[:, self.chunk :].clone()
+            self.v = self.v[:, self.chunk :].clone()
+            self.sketched += self.chunk
+        return out
+
+
+def token_positions(valid: torch.Tensor) -> torch.Tensor:
+    """Number of real tokens up to and including each slot of every row.
+
+    Differences of these are token distances even when a row holds padding
+    between its tokens, which happens when rows decode as independent
+    streams that do not all feed a token at every step.
+    """
+    return valid.long().cumsum(dim=1)
+
+
+def sdpa_cached(Q, K, V, S, sm_scale, sliding_window, q_start, key_valid):
+    """Batched attention of new queries against a :class:`Cache`.
+
+    Q is ``(batch, n_q, n_heads, q_mult, d_head)`` for the slots starting at
+    ``q_start``; K/V are ``(batch, n_kv, n_heads, d_head)`` and cover every
+    slot up to and including the queries.  A row may hold padding between
+    its tokens (see :func:`token_positions`), so the sliding window counts
+    tokens rather than slots.
+    """
+    batch_size, n_q, n_heads, q_mult, d_head = Q.shape
+    n_kv = K.shape[1]
+    q_slot = torch.arange(q_start, q_start + n_q, device=Q.device)
+    k_slot = torch.arange(n_kv, device=Q.device)
+    visible = k_slot[None, :] <= q_slot[:, None]
+    visible = visible[None, :, :] & key_valid[:, None, :]
+    if sliding_window > 0:
+        pos = token_positions(key_valid)
+        q_pos = pos[:, q_start : q_start + n_q]
+        visible &= q_pos[:, :, None] - pos[:, None, :] < sliding_window
+    mask = torch.zeros(visible.shape, dtype=Q.dtype, device=Q.device)
+    mask.masked_fill_(~visible, -float("inf"))
+    QK = torch.einsum("bqhmd,bkhd->bhmqk", Q, K)
+    QK *= sm_scale
+    QK += mask[:, None, None, :, :]
+    S = S.reshape(1, n_heads, q_mult, 1, 1).expand(batch_size, -1, -1, n_q, -1)
+    QK = torch.cat([QK, S.to(QK.dtype)], dim=-1)
+    W = torch.softmax(QK, dim=-1)
+    W = W[..., :-1]
+    attn = torch.einsum("bhmqk,bkhd->bqhmd", W, V)
+    return attn.reshape(batch_size, n_q, -1)
+
+
+def sdpa_blockwise(
+    Q,
+    K,
+    V,
+    S,
+    sm_scale,
+    sliding_window=0,
+    q_start=0,
+    key_valid=None,
+    block_size=128,
+):
+    """Tiled attention with an online softmax; numerically equivalent to
+    :func:`sdpa` (unbatched inputs) and :func:`sdpa_cached` (batched inputs
+    with ``q_start``/``key_valid``).
+
+    Queries are processed ``block_size`` at a time against only the key
+    blocks they can see: the causal prefix for full-attention layers and the
+    ``sliding_window`` band otherwise.  The sink logit seeds the running
+    max/denominator, so peak memory is O(block_size**2) per head instead of
+    O(n_tokens**2), and sliding-window layers do O(n * window) work.
+    """
+    unbatched = Q.dim() == 4
+    if unbatched:
+        Q, K, V = Q[None], K[None], V[None]
+    batch_size, n_q, n_heads, q_mult, d_head = Q.shape
+    n_kv = K.shape[1]
+    Qf = Q.float().permute(0, 2, 3, 1, 4)  # (batch, heads, q_mult, n_q, d_head)
+    Kf, Vf = K.float(), V.float()
+    sink = S.float().reshape(1, n_heads, q_mult, 1)
+    out = torch.empty_like(Qf)
+    pos = None
+    if sliding_window > 0 and key_valid is not None:
+        pos = token_positions(key_valid)
+    for q0 in range(0, n_q, block_size):
+        q1 = min(q0 + block_size, n_q)
+        q_slot = torch.arange(q_start + q0, q_start + q1, device=Q.device)
+        q = Qf[:, :, :, q0:q1]
+        m = sink.expand(batch_size, -1, -1, q1 - q0).clone()
+        denom = torch.ones_like(m)
+        acc = torch.zeros_like(q)
+        k_lo = 0
+        if pos is not None:
+            # First slot any row of the block can still see.
+            q_pos = pos[:, q_start + q0 : q_start + q1]
+            first = q_pos[:, :1] - sliding_window + 1
+            k_lo = int(torch.searchsorted(pos, first).min())
+        elif sliding_window > 0:
+            k_lo = max(0, q_start + q0 - sliding_window + 1)
+        k_hi = min(n_kv, q_start + q1)
+        for k0 in range(k_lo, k_hi, block_size):
+            k1 = min(k0 + block_size, k_hi)
+            k_slot = torch.arange(k0, k1, device=Q.device)
+            visible = k_slot[None, :] <= q_slot[:, None]
+            if sliding_window > 0 and pos is None:
+                visible &= q_slot[:, None] - k_slot[None, :] < sliding_window
+            visible = visible[None]
+            if key_valid is not None:
+                visible = visible & key_valid[:, None, k0:k1]
+            if pos is not None:
+                visible = visible & (
+                    q_pos[:, :, None] - pos[:, None, k0:k1] < sliding_window
+                )
+            qk = torch.einsum("bhmqd,bkhd->bhmqk", q, Kf[:, k0:k1]) * sm_scale
+            qk.masked_fill_(~visible[:, None, None], -float("inf"))
+            m_new = torch.maximum(m, qk.amax(dim=-1))
+            alpha = torch.exp(m - m_new)
+            p = torch.exp(qk - m_new[..., None])
+            denom = denom * alpha + p.sum(dim=-1)
+            acc = acc * alpha[..., None] + torch.einsum(
+                "bhmqk,bkhd->bhmqd", p, Vf[:, k0:k1]
+            )
+            m = m_new
+        out[:, :, :, q0:q1] = acc / denom[..., None]
+    attn = out.permute(0, 3, 1, 2, 4).reshape(batch_size, n_q, -1).to(Q.dtype)
+    return attn[0] if unbatched else attn
+
+
 class AttentionBlock(torch.nn.Module):
+    # Prompts longer than this use the tiled O(n * block) attention path.
+    BLOCKWISE_MIN_TOKENS = 256
+
     def __init__(
         self,
         config: ModelConfig,
         layer_idx: int = 0,
         device: torch.device | None = None,
+        rope: RotaryEmbedding | None = None,
     ):
         super().__init__()
         self.head_dim = config.head_dim
@@ -203,44 +661,72 @@ class AttentionBlock(torch.nn.Module):
             dtype=torch.bfloat16,
         )
         self.sm_scale = 1 / math.sqrt(config.head_dim)
-        self.rope = RotaryEmbedding(
-            config.head_dim,
-            config.rope_theta,
-            torch.float32,
-            initial_context_length=config.initial_context_length,
-            scaling_factor=config.rope_scaling_factor,
-            ntk_alpha=config.rope_ntk_alpha,
-            ntk_beta=config.rope_ntk_beta,
-            device=device,
+        self.attention_block_size = 128
+        self.blockwise_min_tokens = self.BLOCKWISE_MIN_TOKENS
+        self.rope = (
+            rope if rope is not None else RotaryEmbedding.for_config(config, device)
         )
 
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
+    def forward(
+        self,
+        x: torch.Tensor,
+        cache: Cache | None = None,
+        valid: torch.Tensor | None = None,
+    ) -> torch.Tensor:
         t = self.norm(x)
         qkv = self.qkv(t)
-        q = qkv[:, : self.num_attention_heads * self.head_dim].contiguous()
-        k = qkv[
-            :,
-            self.num_attention_heads
-            * self.head_dim : (self.num_attention_heads + self.num_key_value_heads)
-            * self.head_dim,
-        ].contiguous()
-        v = qkv[
-            :,
-            (self.num_attention_heads + self.num_key_value_heads)
-            * self.head_dim : (self.num_attention_heads + 2 * self.num_key_value_heads)
-            * self.head_dim,
-        ].contiguous()
+        q_dim = self.num_attention_heads * self.head_dim
+        kv_dim = self.num_key_value_heads * self.head_dim
+        q = qkv[..., :q_dim].contiguous()
+        k = qkv[..., q_dim : q_dim + kv_dim].contiguous()
+        v = qkv[..., q_dim + kv_dim : q_dim + 2 * kv_dim].contiguous()
 
+        lead_shape = qkv.shape[:-1]
         q = q.view(
-            -1,
+            *lead_shape,
             self.num_key_value_heads,
             self.num_attention_heads // self.num_key_value_heads,
             self.head_dim,
         )
-        k = k.view(-1, self.num_key_value_heads, self.head_dim)
-        v = v.view(-1, self.num_key_value_heads, self.head_dim)
-        q, k = self.rope(q, k)
-        t = sdpa(q, k, v, self.sinks, self.sm_scale, self.sliding_window)
+        k = k.view(*lead_shape, self.num_key_value_heads, self.head_dim)
+        v = v.view(*lead_shape, self.num_key_value_heads, self.head_dim)
+        blockwise = lead_shape[-1] >= self.blockwise_min_tokens
+        if cache is None:
+            q, k = self.rope(q, k)
+            if blockwise:
+                t = sdpa_blockwise(
+                    q,
+                    k,
+                    v,
+                    self.sinks,
+                    self.sm_scale,
+                    self.sliding_window,
+                    block_size=self.attention_block_size,
+                )
+            else:
+                t = sdpa(q, k, v, self.sinks, self.sm_scale, self.sliding_window)
+        else:
+            # x is (batch, n_tokens, hidden); valid masks left padding
+            if valid is None:
+                valid = torch.ones(lead_shape, dtype=torch.bool, device=x.device)
+            q, k = self.rope(q, k, positions=cache.positions(valid))
+            q_start = cache.offset
+            k, v, key_valid = cache.extend(k, v, valid)
+            attention = (
+                functools.partial(sdpa_blockwise, block_size=self.attention_block_size)
+                if blockwise
+                else sdpa_cached
+            )
+            t = attention(
+                q,
+                k,
+                v,
+                self.sinks,
+                self.sm_scale,
+                self.sliding_window,
+                q_start,
+                key_valid,
+            )
         t = self.out(t)
         t = x + t
         return t
@@ -256,47 +742,114 @@ def swiglu(x, alpha: float = 1.702, limit: float = 7.0):
     return out_glu * (x_linear + 1)
 
 
+class MXFP4Weight(torch.nn.Module):
+    """Expert weights of shape (num_experts, rows, cols) kept as packed MXFP4.
+
+    ``blocks`` holds two FP4 values per byte in groups of 32 columns and
+    ``scales`` one biased exponent per group, about a quarter of the memory of
+    the bf16 tensor.  ``col_offset`` is where column 0 starts inside the first
+    group when a tensor-parallel shard does not begin on a group boundary.
+    """
+
+    def __init__(
+        self,
+        num_experts: int,
+        rows: int,
+        cols: int,
+        col_offset: int = 0,
+        device: torch.device | None = None,
+    ):
+        super().__init__()
+        self.shape = (num_experts, rows, cols)
+        self.col_offset = col_offset
+        groups = -(-(col_offset + cols) // 32)
+        self.register_buffer(
+            "blocks",
+            torch.zeros(
+                num_experts, rows, groups, 16, dtype=torch.uint8, device=device
+            ),
+        )
+        self.register_buffer(
+            "scales",
+            torch.zeros(num_experts, rows, groups, dtype=torch.uint8, device=device),
+        )
+
+    def dequantize(self, expert: int, dtype: torch.dtype = torch.bfloat16):
+        """Decode the (rows, cols) matrix of a single expert."""
+        w = dequantize_mxfp4(self.blocks[expert], self.scales[expert], dtype)
+        return w[:, self.col_offset : self.col_offset + self.shape[2]]
+
+
 class MLPBlock(torch.nn.Module):
+    # From this many tokens on, dispatch by expert instead of gathering the
+    # selected expert weights per token.  On CPU the grouped path wins even
+    # for a single token (see scripts/bench_moe_dispatch.py); on accelerators
+    # the sync-free einsum path is kept for decode.
+    GROUPED_DISPATCH_MIN_TOKENS = 16
+
     def __init__(
         self,
         config: ModelConfig,
         device: torch.device | None = None,
+        mxfp4_experts: bool = False,
     ):
         super().__init__()
         self.num_experts = config.num_experts
         self.experts_per_token = config.experts_per_token
         self.swiglu_limit = config.swiglu_limit
         self.world_size = dist.get_world_size() if dist.is_initialized() else 1
+        self.mxfp4_experts = mxfp4_experts
+        on_cpu = device is None or torch.device(device).type == "cpu"
+        self.grouped_dispatch_min_tokens = (
+            1 if on_cpu else self.GROUPED_DISPATCH_MIN_TOKENS
+        )
         self.norm = RMSNorm(config.hidden_size, device=device)
         self.gate = torch.nn.Linear(
             config.hidden_size, config.num_experts, device=device, dtype=torch.bfloat16
         )
         assert config.intermediate_size % self.world_size == 0
-        self.mlp1_weight = torch.nn.Parameter(
-            torch.empty(
-                (
-                    config.num_experts,
-                    config.intermediate_size * 2 // self.world_size,
-                    config.hidden_size,
-                ),
+        per_rank_intermediate_size = config.intermediate_size // self.world_size
+        if mxfp4_experts:
+            rank = dist.get_rank() if dist.is_initialized() else 0
+            self.mlp1_weight = MXFP4Weight(
+                config.num_experts,
+                per_rank_intermediate_size * 2,
+                config.hidden_size,
                 device=device,
-                dtype=torch.bfloat16,
             )
-        )
-        self.mlp1_bias = torch.nn.Parameter(
-            torch.empty(
-                (config.num_experts, config.intermediate_size * 2 // self.world_size),
+            self.mlp2_weight = MXFP4Weight(
+                config.num_experts,
+                config.hidden_size,
+                per_rank_intermediate_size,
+                col_offset=rank * per_rank_intermediate_size % 32,
                 device=device,
-                dtype=torch.bfloat16,
             )
-        )
-        self.mlp2_weight = torch.nn.Parameter(
+        else:
+            self.mlp1_weight = torch.nn.Parameter(
+                torch.empty(
+                    (
+                        config.num_experts,
+                        per_rank_intermediate_size * 2,
+                        config.hidden_size,
+                    ),
+                    device=device,
+                    dtype=torch.bfloat16,
+                )
+            )
+            self.mlp2_weight = torch.nn.Parameter(
+                torch.empty(
+                    (
+                        config.num_experts,
+                        config.hidden_size,
+                        per_rank_intermediate_size,
+                    ),
+                    device=device,
+                    dtype=torch.bfloat16,
+                )
+            )
+        self.mlp1_bias = torch.nn.Parameter(
             torch.empty(
-                (
-                    config.num_experts,
-                    config.hidden_size,
-                    config.intermediate_size // self.world_size,
-                ),
+                (config.num_experts, per_rank_intermediate_size * 2),
                 device=device,
                 dtype=torch.bfloat16,
             )
@@ -310,12 +863,21 @@ class MLPBlock(torch.nn.Module):
         )
 
     def forward(self, x: torch.Tensor) -> torch.Tensor:
+        # Experts are applied per token; flatten any batch dimensions.
+        shape = x.shape
+        x = x.reshape(-1, shape[-1])
         t = self.norm(x)
         g = self.gate(t)
         experts = torch.topk(g, k=self.experts_per_token, dim=-1, sorted=True)
         expert_weights = torch.nn.functional.softmax(experts.values, dim=1)
         expert_indices = experts.indices
 
+        # Packed experts are always decoded per expert; dense ones switch to
+        # the grouped path once per-token weight copies get large (prefill).
+        if self.mxfp4_experts or x.shape[0] >= self.grouped_dispatch_min_tokens:
+            t = self._grouped_experts(t, expert_indices, expert_weights)
+            return (x + t).reshape(shape)
+
         # MLP #1
         mlp1_weight = self.mlp1_weight[expert_indices, ...]
         mlp1_bias = self.mlp1_bias[expert_indices, ...]
@@ -333,7 +895,51 @@ class MLPBlock(torch.nn.Module):
         # Weighted sum of experts
         t = torch.einsum("bec,be->bc", t, expert_weights)
 
-        return x + t
+        return (x + t).reshape(shape)
+
+    def _expert_weights(self, expert: int) -> tuple[torch.Tensor, torch.Tensor]:
+        if self.mxfp4_experts:
+            return self.mlp1_weight.dequantize(expert), self.mlp2_weight.dequantize(
+                expert
+            )
+        return self.mlp1_weight[expert], self.mlp2_weight[expert]
+
+    def _grouped_experts(
+        self,
+        t: torch.Tensor,
+        expert_indices: torch.Tensor,
+        expert_weights: torch.Tensor,
+    ) -> torch.Tensor:
+        """Sort (token, expert) pairs by expert and run each active expert once.
+
+        Each expert's weights are fetched (and, for MXFP4, decoded) once for
+        all tokens routed to it instead of being gathered per token.
+        """
+        k = self.experts_per_token
+        flat = expert_indices.reshape(-1)
+        order = torch.argsort(flat, stable=True)
+        counts = torch.bincount(flat, minlength=self.num_experts).tolist()
+        tokens = order // k
+        weights = expert_weights.reshape(-1)[order]
+
+        out = torch.zeros(t.shape[0], t.shape[1], dtype=torch.float32, device=t.device)
+        start = 0
+        for expert, count in enumerate(counts):
+            if count == 0:
+                continue
+            rows = tokens[start : start + count]
+            w = weights[start : start + count, None]
+            start += count
+            mlp1_weight, mlp2_weight = self._expert_weights(expert)
+            h = t[rows] @ mlp1_weight.T + self.mlp1_bias[expert]
+            h = swiglu(h, limit=self.swiglu_limit)
+            out.index_add_(0, rows, (h @ mlp2_weight.T).float() * w)
+        if self.world_size > 1:
+            dist.all_reduce(out, op=dist.ReduceOp.SUM)
+        bias = torch.einsum(
+            "bec,be->bc", self.mlp2_bias[expert_indices].float(), expert_weights.float()
+        )
+        return (out + bias).to(t.dtype)
 
 
 class TransformerBlock(torch.nn.Module):
@@ -342,14 +948,21 @@ class TransformerBlock(torch.nn.Module):
         config: ModelConfig,
         layer_idx: int,
         device: torch.device | None = None,
+        mxfp4_experts: bool = False,
+        rope: RotaryEmbedding | None = None,
     ):
         super().__init__()
         self.layer_idx = layer_idx
-        self.attn = AttentionBlock(config, layer_idx, device)
-        self.mlp = MLPBlock(config, device)
+        self.attn = AttentionBlock(config, layer_idx, device, rope=rope)
+        self.mlp = MLPBlock(config, device, mxfp4_experts=mxfp4_experts)
 
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
-        x = self.attn(x)
+    def forward(
+        self,
+        x: torch.Tensor,
+        cache: Cache | None = None,
+        valid: torch.Tensor | None = None,
+    ) -> torch.Tensor:
+        x = self.attn(x, cache=cache, valid=valid)
         x = self.mlp(x)
         return x
 
@@ -359,14 +972,18 @@ class Transformer(torch.nn.Module):
         self,
         config: ModelConfig,
         device: torch.device | None = None,
+        mxfp4_experts: bool = False,
     ):
         super().__init__()
+        self.config = config
         self.embedding = torch.nn.Embedding(
             config.vocab_size, config.hidden_size, device=device, dtype=torch.bfloat16
         )
+        # One rotary table shared by every layer.
+        rope = RotaryEmbedding.for_config(config, device)
         self.block = torch.nn.ModuleList(
             [
-                TransformerBlock(config, layer_idx, device)
+                TransformerBlock(config, layer_idx, device, mxfp4_experts, rope)
                 for layer_idx in range(config.num_hidden_layers)
             ]
         )
@@ -379,20 +996,53 @@ class Transformer(torch.nn.Module):
             dtype=torch.bfloat16,
         )
 
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
+    def forward(
+        self,
+        x: torch.Tensor,
+        caches: list[Cache] | None = None,
+        valid: torch.Tensor | None = None,
+        logits_positions: slice | torch.Tensor | None = None,
+    ) -> torch.Tensor:
+        """Return logits for ``x``.
+
+        Without ``caches`` ``x`` is a 1-D token sequence attended from
+        position 0.  With one :class:`Cache` per layer ``x`` is
+        ``(batch, n_tokens)`` and continues the cached sequences; ``valid``
+        marks real (non-padding) tokens.
+
+        ``logits_positions`` selects the sequence positions to unembed (e.g.
+        ``slice(-1, None)`` for the next-token logits only); the vocab-wide
+        projection of every other position is skipped.
+        """
         x = self.embedding(x)
-        for block in self.block:
-            x = block(x)
+        caches = caches or [None] * len(self.block)
+        for block, cache in zip(self.block, caches):
+            x = block(x, cache=cache, valid=valid)
+        if logits_positions is not None:
+            x = x[..., logits_positions, :]
         x = self.norm(x)
         x = self.unembedding(x)
         return x
 
     @staticmethod
     def from_checkpoint(
-        path: str, device: str | torch.device = "cuda"
+        path: str,
+        device: str | torch.device = "cuda",
+        load_budget_bytes: int = DEFAULT_LOAD_BUDGET_BYTES,
+        mxfp4_experts: bool = False,
     ) -> "Transformer":
+        """Load ``path`` into a freshly allocated model.
+
+        Each parameter is streamed straight into its preallocated storage,
+        reading only this rank's shard of the MoE weights (sliced in MXFP4
+        form, before dequantization) and using at most ``load_budget_bytes``
+        of transient host memory per step.  Load time and peak RSS are
+        recorded in ``model.load_stats``.  With ``mxfp4_experts`` the MoE
+        weights are kept packed and decoded per expert at run time.
+        """
         if not isinstance(device, torch.device):
             device = torch.device(device)
+        start = time.perf_counter()
 
         config_path = os.path.join(path, "config.json")
         with open(config_path, "r") as f:
@@ -402,6 +1052,7 @@ class Transformer(torch.nn.Module):
         model = Transformer(
             config=config,
             device=device,
+            mxfp4_experts=mxfp4_experts,
         )
         model.eval()
 
@@ -410,44 +1061,221 @@ class Transformer(torch.nn.Module):
         world_size = dist.get_world_size() if dist.is_initialized() else 1
         per_rank_intermediate_size = config.intermediate_size // world_size
 
-        checkpoint = Checkpoint(path, device)
-
-        for name, param in model.named_parameters():
-            loaded_tensor = checkpoint.get(name)
-
-            # Note: it would be more efficient to do sharding before upcasting from MXFP4,
-            # but for simplicity we do it after.
+        def shard_of(name: str):
             if "mlp1" in name:  # both weight and bias
-                loaded_tensor = loaded_tensor[
-                    :,
-                    my_rank
-                    * 2
-                    * per_rank_intermediate_size : (my_rank + 1)
-                    * 2
-                    * per_rank_intermediate_size,
-                    ...,
-                ]
-            elif "mlp2_weight" in name:  # only weight
-                loaded_tensor = loaded_tensor[
-                    ...,
-                    my_rank
-                    * per_rank_intermediate_size : (my_rank + 1)
-                    * per_rank_intermediate_size,
-                ]
-            try:
-                param.data.copy_(loaded_tensor)
-            except:
-                print(f"{name=} {param.data.shape=} {loaded_tensor.shape=}")
-                raise
+                return (
+                    1,
+                    my_rank * 2 * per_rank_intermediate_size,
+                    (my_rank + 1) * 2 * per_rank_intermediate_size,
+                )
+            if "mlp2_weight" in name:  # only weight
+                return (
+                    2,
+                    my_rank * per_rank_intermediate_size,
+                    (my_rank + 1) * per_rank_intermediate_size,
+                )
+            return None
+
+        with Checkpoint(path, device, budget_bytes=load_budget_bytes) as checkpoint:
+            for name, param in model.named_parameters():
+                with torch.no_grad():
+                    checkpoint.load_into(name, param.data, shard_of(name))
+            for name, module in model.named_modules():
+                if isinstance(module, MXFP4Weight):
+                    col_offset = checkpoint.load_packed_into(
+                        name, module.blocks, module.scales, shard_of(name)
+                    )
+                    assert col_offset == module.col_offset
 
+            model.load_stats = {
+                "seconds": time.perf_counter() - start,
+                "peak_rss_bytes": peak_rss_bytes(),
+                "peak_chunk_bytes": checkpoint.peak_chunk_bytes,
+                "budget_bytes": load_budget_bytes,
+            }
         return model
 
 
+# Key/value storage: model dtype, int8 with per-head scales, or low-rank
+# sketches of old tokens on full-attention layers (see ``SketchedCache``).
+KV_MODES = ("full", "int8", "sketch")
+
+
+def new_caches(
+    model: Transformer,
+    batch_size: int,
+    capacity: int = 256,
+    kv_mode: str = "full",
+    **sketch_options,
+) -> list[Cache]:
+    """One empty cache per layer of ``model``, stored as ``kv_mode``."""
+    if kv_mode not in KV_MODES:
+        raise ValueError(f"unknown kv_mode {kv_mode!r}; expected one of {KV_MODES}")
+    config = model.config
+    weight = model.embedding.weight
+    caches = []
+    for block in model.block:
+        cls, options = Cache, {}
+        if kv_mode == "int8":
+            cls = QuantizedCache
+        elif kv_mode == "sketch" and block.attn.sliding_window == 0:
+            cls, options = SketchedCache, sketch_options
+        caches.append(
+            cls(
+                batch_size,
+                config.num_key_value_heads,
+                config.head_dim,
+                capacity=capacity,
+                device=weight.device,
+                dtype=weight.dtype,
+                **options,
+            )
+        )
+    return caches
+
+
+# Pass as ``Transformer.forward(logits_positions=...)`` for next-token logits.
+LAST_POSITION = slice(-1, None)
+
+
+def lcp(cache: list[int], inp: list[int]) -> list[int]:
+    i = 0
+    max_len = min(len(cache), len(inp))
+    while i < max_len and cache[i] == inp[i]:
+        i += 1
+    return cache[:i]
+
+
+def sample_tokens(logits: torch.Tensor, temperatures: torch.Tensor) -> torch.Tensor:
+    """Sample one token per row; rows with temperature 0 are greedy."""
+    greedy = torch.argmax(logits, dim=-1)
+    hot = temperatures > 0
+    if not bool(hot.any()):
+        return greedy
+    scaled = logits[hot].float() / temperatures[hot, None]
+    sampled = torch.multinomial(torch.softmax(scaled, dim=-1), num_samples=1)
+    return greedy.masked_scatter(hot, sampled[:, 0])
+
+
+@dataclass
+class KVPrefix:
+    """A prefilled prompt: single-row caches holding all of ``tokens`` but the
+    last, ready to be forked into decode branches."""
+
+    tokens: list[int]
+    caches: list[Cache]
+    reused: int = 0  # leading tokens taken over from the parent prefix
+
+
 class TokenGenerator:
     @torch.inference_mode()
-    def __init__(self, checkpoint: str, device: torch.device):
+    def __init__(
+        self,
+        checkpoint: str,
+        device: torch.device,
+        model: Transformer | None = None,
+        load_budget_bytes: int = DEFAULT_LOAD_BUDGET_BYTES,
+        mxfp4_experts: bool = False,
+        kv_mode: str = "full",
+    ):
         self.device = device
-        self.model = Transformer.from_checkpoint(checkpoint, device=self.device)
+        self.kv_mode = kv_mode
+        if model is None:
+            model = Transformer.from_checkpoint(
+                checkpoint,
+                device=self.device,
+                load_budget_bytes=load_budget_bytes,
+                mxfp4_experts=mxfp4_experts,
+            )
+        self.model = model
+        # single-stream session used by ``infer_next_token``
+        self._stream_caches: list[Cache] | None = None
+        self._stream_tokens: list[int] = []
+        # prompt tokens run through ``prefill`` (forked decoding)
+        self.tokens_prefilled = 0
+
+    def new_caches(self, batch_size: int, capacity: int = 256) -> list[Cache]:
+        return new_caches(self.model, batch_size, capacity, kv_mode=self.kv_mode)
+
+    @staticmethod
+    def new_speculative_stats():
+        """Counters to pass as ``generate(..., stats=...)``."""
+        from gpt_oss.inference.speculative import SpeculativeStats
+
+        return SpeculativeStats()
+
+    @torch.inference_mode()
+    def infer_next_token(
+        self,
+        tokens: list[int],
+        temperature: float = 0.0,
+        new_request: bool = False,
+    ) -> int:
+        """Same interface as the responses API backends: sample the token after
+        ``tokens``, reusing the cache for the longest common prefix with the
+        previous call."""
+        if self._stream_caches is None:
+            self._stream_caches = self.new_caches(1, capacity=len(tokens) + 256)
+        keep = min(len(lcp(self._stream_tokens, tokens)), len(tokens) - 1)
+        for cache in self._stream_caches:
+            cache.truncate(keep)
+        x = torch.as_tensor([tokens[keep:]], dtype=torch.int32, device=self.device)
+        logits = self.model(
+            x, caches=self._stream_caches, logits_positions=LAST_POSITION
+        )[:, -1]
+        self._stream_tokens = list(tokens)
+        t = torch.tensor([temperature], device=logits.device)
+        return sample_tokens(logits, t).item()
+
+    def slot_backend(self, max_sessions: int, compact_ratio: float = 2.0):
+        """``infer_next_tokens(slots, tokens, temperatures, new_requests)`` for
+        :class:`~gpt_oss.responses_api.scheduler.BatchScheduler` that decodes
+        every request of a step in one forward.
+
+        Each slot is one row of a shared set of caches.  A row keeps the
+        longest common prefix with the tokens it was last given and is fed
+        the rest, left-padded to the longest feed of the step, so a stream
+        that joins mid-decode is prefilled in the same forward that decodes
+        the others; rows without a request get padding only.  Padding left
+        between a row's tokens is masked out and does not count towards the
+        sliding window.  Once the caches hold ``compact_ratio`` times as many
+        slots as the longest row, they are compacted.
+        """
+        if self.kv_mode == "sketch":
+            raise ValueError("sketched caches cannot be compacted")
+        caches = self.new_caches(max_sessions)
+        rows: list[list[int]] = [[] for _ in range(max_sessions)]
+
+        @torch.inference_mode()
+        def infer_next_tokens(slots, tokens, temperatures, new_requests):
+            feeds = []
+            for slot, toks in zip(slots, tokens):
+                keep = min(len(lcp(rows[slot], toks)), len(toks) - 1)
+                if keep < len(rows[slot]):
+                    for cache in caches:
+                        cache.truncate_row(slot, keep)
+                feeds.append(toks[keep:])
+                rows[slot] = list(toks)
+            if caches[0].offset > compact_ratio * max(map(len, rows)):
+                for cache in caches:
+                    cache.compact()
+            n_new = max(map(len, feeds))
+            x = torch.zeros((max_sessions, n_new), dtype=torch.int32)
+            valid = torch.zeros((max_sessions, n_new), dtype=torch.bool)
+            for slot, feed in zip(slots, feeds):
+                x[slot, n_new - len(feed) :] = torch.as_tensor(feed)
+                valid[slot, n_new - len(feed) :] = True
+            logits = self.model(
+                x.to(self.device),
+                caches=caches,
+                valid=valid.to(self.device),
+                logits_positions=LAST_POSITION,
+            )[slots, -1]
+            t = torch.tensor(temperatures, device=logits.device)
+            return sample_tokens(logits, t).tolist()
+
+        infer_next_tokens.caches = caches
+        return infer_next_tokens
 
     @torch.inference_mode()
     def generate(
@@ -457,23 +1285,55 @@ class TokenGenerator:
         temperature: float = 1.0,
         max_tokens: int = 0,
         return_logprobs: bool = False,
+        prompt_lookup: bool = False,
+        stats=None,
     ):
-        tokens = list(prompt_tokens)
+        """Stream tokens after ``prompt_tokens``.
+
+        With ``prompt_lookup`` continuations of n-grams already present in the
+        context are proposed as draft tokens and verified in one forward (see
+        :mod:`gpt_oss.inference.prompt_lookup`); acceptance counts go to the
+        optional ``SpeculativeStats`` in ``stats``.
+        """
+        caches = self.new_caches(1, capacity=len(prompt_tokens) + (max_tokens or 256))
+        if prompt_lookup:
+            from gpt_oss.inference.prompt_lookup import prompt_lookup_decode
+
+            def forward(tokens: list[int]) -> torch.Tensor:
+                x = torch.as_tensor([tokens], dtype=torch.int32, device=self.device)
+                return self.model(x, caches=caches)[0]
+
+            def prefill(tokens: list[int]) -> None:
+                x = torch.as_tensor([tokens], dtype=torch.int32, device=self.device)
+                self.model(x, caches=caches, logits_positions=slice(0, 0))
+
+            def truncate(n_ctx: int) -> None:
+                for cache in caches:
+                    cache.truncate(n_ctx)
+
+            yield from prompt_lookup_decode(
+                prompt_tokens,
+                forward,
+                truncate,
+                stop_tokens,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                return_logprobs=return_logprobs,
+                stats=stats,
+                prefill=prefill,
+            )
+            return
+        x = torch.as_tensor([prompt_tokens], dtype=torch.int32, device=self.device)
+        temperatures = torch.tensor([temperature], device=self.device)
         num_generated_tokens = 0
         while max_tokens == 0 or num_generated_tokens < max_tokens:
-            logits = self.model(
-                torch.as_tensor(tokens, dtype=torch.int32, device=self.device)
-            )[-1]
-            if temperature == 0.0:
-                predicted_token = torch.argmax(logits, dim=-1).item()
-            else:
-                probs = torch.softmax(logits * (1.0 / temperature), dim=-1)
-                predicted_token = torch.multinomial(probs, num_samples=1).item()
-            tokens.append(predicted_token)
+            logits = self.model(x, caches=caches, logits_positions=LAST_POSITION)
+            logits = logits[:, -1]
+            predicted_token = sample_tokens(logits, temperatures).item()
             num_generated_tokens += 1
 
             if return_logprobs:
-                logprobs = torch.log_softmax(logits, dim=-1)
+                logprobs = torch.log_softmax(logits[0], dim=-1)
                 selected_logprobs = logprobs[predicted_token].item()
                 yield predicted_token, selected_logprobs
             else:
@@ -481,3 +1341,131 @@ class TokenGenerator:
 
             if predicted_token in stop_tokens:
                 break
+            x = torch.as_tensor(
+                [[predicted_token]], dtype=torch.int32, device=self.device
+            )
+
+    @torch.inference_mode()
+    def generate_batch(
+        self,
+        prompts: list[list[int]],
+        stop_tokens: list[int],
+        temperature: float | list[float] = 1.0,
+        max_tokens: int | list[int] = 0,
+    ) -> list[list[int]]:
+        """Decode several sequences in lockstep with per-layer KV caches.
+
+        Prompts are left-padded to a common length and prefilled together;
+        every step then feeds one token per row.  ``temperature`` and
+        ``max_tokens`` may be given per sequence (``0`` means no limit); a
+        row stops at its first stop token and is kept as padding until every
+        row has finished.
+        """
+        batch_size = len(prompts)
+        if isinstance(temperature, (int, float)):
+            temperature = [float(temperature)] * batch_size
+        if isinstance(max_tokens, int):
+            max_tokens = [max_tokens] * batch_size
+        assert len(temperature) == len(max_tokens) == batch_size
+
+        prompt_len = max(len(p) for p in prompts)
+        x = torch.zeros((batch_size, prompt_len), dtype=torch.int32)
+        valid = torch.zeros((batch_size, prompt_len), dtype=torch.bool)
+        for row, prompt in enumerate(prompts):
+            x[row, prompt_len - len(prompt) :] = torch.as_tensor(prompt)
+            valid[row, prompt_len - len(prompt) :] = True
+        x, valid = x.to(self.device), valid.to(self.device)
+
+        caches = self.new_caches(
+            batch_size, capacity=prompt_len + (max(max_tokens) or 256)
+        )
+        return self._decode_lockstep(
+            caches, x, valid, stop_tokens, temperature, max_tokens
+        )
+
+    @torch.inference_mode()
+    def prefill(self, tokens: list[int], parent: KVPrefix | None = None) -> KVPrefix:
+        """Run ``tokens`` (all but the last) into fresh single-row caches.
+
+        With ``parent`` the caches start as a copy of the parent's, truncated
+        to the common prefix, so a prompt that extends the parent's (a tree
+        search child) only prefills its new tokens.
+        """
+        keep = 0
+        if parent is not None:
+            keep = min(
+                len(lcp(parent.tokens, tokens)), len(parent.tokens) - 1, len(tokens) - 1
+            )
+            caches = [cache.fork() for cache in parent.caches]
+            for cache in caches:
+                cache.truncate(keep)
+        else:
+            caches = self.new_caches(1, capacity=len(tokens) + 256)
+        if len(tokens) - 1 > keep:
+            x = torch.as_tensor(
+                [tokens[keep:-1]], dtype=torch.int32, device=self.device
+            )
+            self.model(x, caches=caches, logits_positions=slice(0, 0))
+            self.tokens_prefilled += x.shape[1]
+        return KVPrefix(list(tokens), caches, reused=keep)
+
+    @torch.inference_mode()
+    def generate_forked(
+        self,
+        prefix: KVPrefix,
+        n: int,
+        stop_tokens: list[int],
+        temperature: float | list[float] = 1.0,
+        max_tokens: int | list[int] = 0,
+    ) -> list[list[int]]:
+        """Decode ``n`` branches after a prefilled prompt in lockstep.
+
+        The branches start from copies of the prefix caches, so the prompt is
+        prefilled once whatever ``n`` is and ``prefix`` can be forked again.
+        Arguments are as for :meth:`generate_batch`.
+        """
+        if isinstance(temperature, (int, float)):
+            temperature = [float(temperature)] * n
+        if isinstance(max_tokens, int):
+            max_tokens = [max_tokens] * n
+        caches = [cache.fork(n) for cache in prefix.caches]
+        x = torch.full((n, 1), prefix.tokens[-1], dtype=torch.int32, device=self.device)
+        valid = torch.ones((n, 1), dtype=torch.bool, device=self.device)
+        return self._decode_lockstep(
+            caches, x, valid, stop_tokens, temperature, max_tokens
+        )
+
+    def _decode_lockstep(
+        self,
+        caches: list[Cache],
+        x: torch.Tensor,
+        valid: torch.Tensor,
+        stop_tokens: list[int],
+        temperature: list[float],
+        max_tokens: list[int],
+    ) -> list[list[int]]:
+        """Feed ``x`` and then one sampled token per row until all rows stop."""
+        batch_size = x.shape[0]
+        temperatures = torch.tensor(temperature, device=self.device)
+        limits = torch.tensor(
+            [m if m > 0 else -1 for m in max_tokens], device=self.device
+        )
+        stop = torch.tensor(sorted(set(stop_tokens)), device=self.device)
+
+        outputs: list[list[int]] = [[] for _ in range(batch_size)]
+        done = torch.zeros(batch_size, dtype=torch.bool, device=self.device)
+        produced = torch.zeros(batch_size, dtype=torch.long, device=self.device)
+        while not bool(done.all()):
+            logits = self.model(
+                x, caches=caches, valid=valid, logits_positions=LAST_POSITION
+            )[:, -1]
+            next_tokens = sample_tokens(logits, temperatures)
+            active = ~done
+            for row in torch.nonzero(active).flatten().tolist():
+                outputs[row].append(int(next_tokens[row]))
+            produced += active.long()
+            done |= active & torch.isin(next_tokens, stop)
+            done |= produced == limits
+            x = next_tokens[:, None].to(torch.int32)
+            valid = ~done[:, None]
+        return outputs
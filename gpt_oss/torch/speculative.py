@@ -1,15 +1,28 @@
 import torch
 
-from gpt_oss.inference.speculative import speculative_decode
+from gpt_oss.inference.speculative import SpeculativeStats, speculative_decode
 from gpt_oss.torch.model import Transformer
 
 
 class SpeculativeTokenGenerator:
     @torch.inference_mode()
-    def __init__(self, main_checkpoint: str, draft_checkpoint: str, device: torch.device):
+    def __init__(
+        self,
+        main_checkpoint: str,
+        draft_checkpoint: str,
+        device: torch.device,
+        main_model: Transformer | None = None,
+        draft_model: Transformer | None = None,
+    ):
         self.device = device
-        self.main_model = Transformer.from_checkpoint(main_checkpoint, device=self.device)
-        self.draft_model = Transformer.from_checkpoint(draft_checkpoint, device=self.device)
+        self.main_model = main_model or Transformer.from_checkpoint(
+            main_checkpoint, device=self.device
+        )
+        self.draft_model = draft_model or Transformer.from_checkpoint(
+            draft_checkpoint, device=self.device
+        )
+        # Statistics of the most recent ``generate`` call.
+        self.stats = SpeculativeStats()
 
     @torch.inference_mode()
     def generate(
@@ -20,7 +33,9 @@ class SpeculativeTokenGenerator:
         max_tokens: int = 0,
         gamma: int = 4,
         return_logprobs: bool = False,
+        adaptive_gamma: bool = True,
     ):
+        self.stats = SpeculativeStats()
         yield from speculative_decode(
             prompt_tokens=prompt_tokens,
             main_model=self.main_model,
@@ -30,4 +45,6 @@ class SpeculativeTokenGenerator:
             stop_tokens=stop_tokens,
             temperature=temperature,
             return_logprobs=return_logprobs,
+            adaptive_gamma=adaptive_gamma,
+            stats=self.stats,
         )
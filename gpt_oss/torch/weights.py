@@ -47,14 +47,48 @@ PARAM_NAME_MAP = (
 )
 
 
+# Bytes per element of the safetensors dtypes found in gpt-oss checkpoints.
+DTYPE_SIZES = {"BOOL": 1, "U8": 1, "I8": 1, "BF16": 2, "F16": 2, "F32": 4, "I32": 4}
+
+# Transient host memory a single load step may use by default.
+DEFAULT_LOAD_BUDGET_BYTES = 512 * 1024 * 1024
+
+# (dim, start, stop): the slice of a logical (dequantized) tensor to load.
+Shard = tuple[int, int, int]
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far."""
+    import resource
+
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
 class Checkpoint:
-    def __init__(self, path: str, device: torch.device):
+    """Reads (possibly sharded) tensors out of a directory of safetensors files.
+
+    The files are opened once and kept open; tensors are read through
+    ``get_slice`` in row chunks so that at most ``budget_bytes`` of transient
+    host memory (raw chunk plus its dequantized copy) is in flight at a time.
+    MXFP4 tensors are sliced at block granularity *before* being dequantized.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        device: torch.device,
+        budget_bytes: int = DEFAULT_LOAD_BUDGET_BYTES,
+    ):
         device_str = (
             device.type
             if device.index is None
             else device.type + ":" + str(device.index)
         )
         self.device_str = device_str
+        self.budget_bytes = budget_bytes
+        # Largest transient buffer used by a single load step.
+        self.peak_chunk_bytes = 0
 
         # Read from all files ending with .safetensors in the checkpoint directory
         safetensor_files = [
@@ -62,15 +96,27 @@ class Checkpoint:
             for fname in os.listdir(path)
             if fname.endswith(".safetensors")
         ]
-        # Build a mapping from tensor name to (file, key)
+        # Build a mapping from tensor name to (file, key), keeping the files
+        # open (memory-mapped) for the lifetime of the checkpoint.
+        self._files = {}
         tensor_name_to_file = {}
         for safetensor_file in safetensor_files:
-            with safe_open(safetensor_file, framework="pt", device=device_str) as f:
-                for key in f.keys():
-                    tensor_name_to_file[key] = safetensor_file
+            f = safe_open(safetensor_file, framework="pt", device="cpu")
+            self._files[safetensor_file] = f
+            for key in f.keys():
+                tensor_name_to_file[key] = safetensor_file
 
         self.tensor_name_to_file = tensor_name_to_file
 
+    def close(self) -> None:
+        self._files.clear()
+
+    def __enter__(self) -> "Checkpoint":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
     def get(self, name: str) -> torch.Tensor:
         match PARAM_NAME_MAP.get(name, name):
             case (blocks_name, scales_name):
@@ -82,65 +128,159 @@ class Checkpoint:
                 # MoE biases and other weights
                 return self._get_tensor(tensor_name)
 
-    def _get_tensor(self, name: str) -> str:
-        assert (
-            name in self.tensor_name_to_file
-        ), f"Tensor {name} not found in checkpoint."
-        with safe_open(
-            self.tensor_name_to_file[name], framework="pt", device=self.device_str
-        ) as f:
-            return f.get_tensor(name)
+    def shape(self, name: str) -> list[int]:
+        """Logical (dequantized) shape of ``name``."""
+        match PARAM_NAME_MAP.get(name, name):
+            case (blocks_name, _):
+                *prefix, G, B = self._slice(blocks_name).get_shape()
+                return [*prefix, G * B * 2]
+            case tensor_name:
+                return list(self._slice(tensor_name).get_shape())
 
-    def _get_mxfp4_tensor(
+    def load_into(self, name: str, out: torch.Tensor, shard: Shard | None = None):
+        """Stream ``name`` (or its ``shard``) into the preallocated ``out``."""
+        match PARAM_NAME_MAP.get(name, name):
+            case (blocks_name, scales_name):
+                self._load_mxfp4_into(blocks_name, scales_name, out, shard)
+            case tensor_name:
+                self._load_tensor_into(tensor_name, out, shard)
+
+    def load_packed_into(
         self,
-        blocks_name: str,
-        scales_name: str,
-        *,
-        dtype: torch.dtype = torch.bfloat16,
-        rows_per_chunk: int = 16384 * 512,
-    ) -> torch.Tensor:
-        assert (
-            blocks_name in self.tensor_name_to_file
-        ), f"Blocks tensor {blocks_name} not found in checkpoint."
-        assert (
-            scales_name in self.tensor_name_to_file
-        ), f"Scales tensor {scales_name} not found in checkpoint."
+        name: str,
+        blocks_out: torch.Tensor,
+        scales_out: torch.Tensor,
+        shard: Shard | None = None,
+    ) -> int:
+        """Copy the packed MXFP4 blocks and scales of ``name`` without decoding.
 
-        blocks = self._get_tensor(blocks_name)
-        scales = self._get_tensor(scales_name).to(torch.int32) - 127
+        A shard of the last (column) dimension is widened to whole blocks; the
+        column offset of the shard inside the first block is returned.
+        """
+        blocks_name, scales_name = PARAM_NAME_MAP[name]
+        blocks_slice = self._slice(blocks_name)
+        scales_slice = self._slice(scales_name)
+        *prefix_shape, G, B = blocks_slice.get_shape()
+        ranges = _shard_ranges([*prefix_shape, G * B * 2], shard)
+        c0, c1 = ranges[-1]
+        g0, g1 = c0 // (2 * B), -(-c1 // (2 * B))
+        block_ranges = [*ranges[:-1], (g0, g1)]
+        assert list(scales_out.shape) == [
+            b - a for a, b in block_ranges
+        ], f"{name}: {scales_out.shape=} does not match shard {block_ranges}"
+        for src, dst, nbytes in self._chunks(block_ranges, B + 1):
+            self._track(nbytes)
+            blocks_out[dst].copy_(blocks_slice[(*src, slice(None))])
+            scales_out[dst].copy_(scales_slice[src])
+        return c0 - g0 * 2 * B
 
+    def _slice(self, name: str):
         assert (
-            blocks.shape[:-1] == scales.shape
-        ), f"{blocks.shape=} does not match {scales.shape=}"
-
-        lut = torch.tensor(FP4_VALUES, dtype=dtype, device=blocks.device)
+            name in self.tensor_name_to_file
+        ), f"Tensor {name} not found in checkpoint."
+        return self._files[self.tensor_name_to_file[name]].get_slice(name)
 
-        *prefix_shape, G, B = blocks.shape
-        rows_total = math.prod(prefix_shape) * G
+    def _get_tensor(self, name: str) -> torch.Tensor:
+        assert (
+            name in self.tensor_name_to_file
+        ), f"Tensor {name} not found in checkpoint."
+        tensor = self._files[self.tensor_name_to_file[name]].get_tensor(name)
+        return tensor.to(self.device_str)
 
-        blocks = blocks.reshape(rows_total, B)
-        scales = scales.reshape(rows_total, 1)
+    def _chunks(self, ranges: list[tuple[int, int]], elem_bytes: int):
+        """Split ``ranges`` into (source index, ``out`` index, bytes) steps.
 
-        out = torch.empty(rows_total, B * 2, dtype=dtype, device=blocks.device)
+        Steps cover whole rows of the first dimension when they fit in the
+        budget and fall back to slices of the second dimension otherwise.
+        """
+        sizes = [b - a for a, b in ranges]
+        row_bytes = elem_bytes * math.prod(sizes[1:])
+        (lo, hi), rest = ranges[0], [slice(a, b) for a, b in ranges[1:]]
+        if row_bytes <= self.budget_bytes or len(ranges) < 2:
+            step = max(1, self.budget_bytes // max(1, row_bytes))
+            for r0 in range(lo, hi, step):
+                r1 = min(r0 + step, hi)
+                src = (slice(r0, r1), *rest)
+                yield src, slice(r0 - lo, r1 - lo), (r1 - r0) * row_bytes
+            return
+        sub_bytes = row_bytes // max(1, sizes[1])
+        step = max(1, self.budget_bytes // max(1, sub_bytes))
+        (lo1, hi1), rest = ranges[1], rest[1:]
+        for r in range(lo, hi):
+            for c0 in range(lo1, hi1, step):
+                c1 = min(c0 + step, hi1)
+                src = (slice(r, r + 1), slice(c0, c1), *rest)
+                dst = (slice(r - lo, r - lo + 1), slice(c0 - lo1, c1 - lo1))
+                yield src, dst, (c1 - c0) * sub_bytes
 
-        for r0 in range(0, rows_total, rows_per_chunk):
-            r1 = min(r0 + rows_per_chunk, rows_total)
+    def _track(self, nbytes: int) -> None:
+        self.peak_chunk_bytes = max(self.peak_chunk_bytes, nbytes)
 
-            blk = blocks[r0:r1]
-            exp = scales[r0:r1]
+    def _load_tensor_into(
+        self, name: str, out: torch.Tensor, shard: Shard | None
+    ) -> None:
+        tensor_slice = self._slice(name)
+        shape = tensor_slice.get_shape()
+        ranges = _shard_ranges(shape, shard)
+        assert list(out.shape) == [
+            b - a for a, b in ranges
+        ], f"{name}: {out.shape=} does not match shard {ranges}"
+        if not shape:
+            out.copy_(tensor_slice[:])
+            return
+        elem = DTYPE_SIZES.get(tensor_slice.get_dtype(), 4)
+        for src, dst, nbytes in self._chunks(ranges, elem):
+            chunk = tensor_slice[src]
+            self._track(nbytes)
+            out[dst].copy_(chunk)
 
-            # nibble indices -> int64
-            idx_lo = (blk & 0x0F).to(torch.long)
-            idx_hi = (blk >> 4).to(torch.long)
+    def _load_mxfp4_into(
+        self,
+        blocks_name: str,
+        scales_name: str,
+        out: torch.Tensor,
+        shard: Shard | None,
+    ) -> None:
+        blocks_slice = self._slice(blocks_name)
+        scales_slice = self._slice(scales_name)
+        *prefix_shape, G, B = blocks_slice.get_shape()
+        assert scales_slice.get_shape() == [
+            *prefix_shape,
+            G,
+        ], f"{blocks_slice.get_shape()=} does not match {scales_slice.get_shape()=}"
 
-            sub = out[r0:r1]
-            sub[:, 0::2] = lut[idx_lo]
-            sub[:, 1::2] = lut[idx_hi]
+        ranges = _shard_ranges([*prefix_shape, G * B * 2], shard)
+        assert list(out.shape) == [
+            b - a for a, b in ranges
+        ], f"{blocks_name}: {out.shape=} does not match shard {ranges}"
+        # Columns are stored in blocks of 2 * B values; read whole blocks and
+        # trim the ragged edges after dequantizing.
+        c0, c1 = ranges[-1]
+        g0, g1 = c0 // (2 * B), -(-c1 // (2 * B))
+        trim = c0 - g0 * 2 * B
+        block_ranges = [*ranges[:-1], (g0, g1)]
 
-            torch.ldexp(sub, exp, out=sub)
-            del idx_lo, idx_hi, blk, exp
+        # packed bytes + scale + dequantized values + nibble indices per group
+        group_bytes = B + 1 + 2 * B * (out.element_size() + 4)
+        for src, dst, nbytes in self._chunks(block_ranges, group_bytes):
+            blk = blocks_slice[(*src, slice(None))].to(out.device)
+            exp = scales_slice[src].to(out.device)
+            values = dequantize_mxfp4(blk, exp, out.dtype)
+            self._track(nbytes)
+            out[dst].copy_(values[..., trim : trim + c1 - c0])
+            del blk, exp, values
 
-        return out.reshape(*prefix_shape, G, B * 2).view(*prefix_shape, G * B * 2)
+    def _get_mxfp4_tensor(
+        self,
+        blocks_name: str,
+        scales_name: str,
+        *,
+        dtype: torch.dtype = torch.bfloat16,
+    ) -> torch.Tensor:
+        *prefix_shape, G, B = self._slice(blocks_name).get_shape()
+        out = torch.empty(*prefix_shape, G * B * 2, dtype=dtype, device=self.device_str)
+        self._load_mxfp4_into(blocks_name, scales_name, out, None)
+        return out
 
     def _get_mxfp4_tensor_copy(
         self, blocks_name: str, scales_name: str, dtype: torch.dtype = torch.bfloat16
@@ -167,3 +307,24 @@ class Checkpoint:
         )
         loaded_tensor = loaded_tensor.view(*loaded_tensor.shape[:-2], -1)
         return loaded_tensor
+
+
+def _shard_ranges(shape: list[int], shard: Shard | None) -> list[tuple[int, int]]:
+    ranges = [(0, n) for n in shape]
+    if shard is not None:
+        dim, start, stop = shard
+        ranges[dim] = (start, stop)
+    return ranges
+
+
+def dequantize_mxfp4(
+    blocks: torch.Tensor, scales: torch.Tensor, dtype: torch.dtype = torch.bfloat16
+) -> torch.Tensor:
+    """(..., G, B) packed nibbles and (..., G) biased exponents -> (..., G * B * 2)."""
+    *prefix_shape, G, B = blocks.shape
+    lut = torch.tensor(FP4_VALUES, dtype=dtype, device=blocks.device)
+    out = torch.empty(*prefix_shape, G, B * 2, dtype=dtype, device=blocks.device)
+    out[..., 0::2] = lut[(blocks & 0x0F).to(torch.int32)]
+    out[..., 1::2] = lut[(blocks >> 4).to(torch.int32)]
+    torch.ldexp(out, scales.to(torch.int32).unsqueeze(-1) - 127, out=out)
+    return out.view(*prefix_shape, G * B * 2)
@@ -241,6 +241,168 @@ class _attention(torch.autograd.Function):
 attention = _attention.apply
 
 
+@triton.jit
+def _paged_attn_fwd(
+    Q,
+    K,
+    V,
+    Block_table,
+    Sinks,
+    sm_scale,
+    Out,  #
+    Start_q,
+    stride_qz,
+    stride_qm,
+    stride_qh,
+    stride_qk,  #
+    stride_kb,
+    stride_kn,
+    stride_kh,
+    stride_kk,  #
+    stride_vb,
+    stride_vn,
+    stride_vh,
+    stride_vk,  #
+    stride_tz,
+    stride_tb,  #
+    stride_oz,
+    stride_om,
+    stride_oh,
+    stride_ok,  #
+    H,
+    N_Q_CTX,
+    N_KV_CTX,
+    REPEAT_KV: tl.constexpr,  #
+    HEAD_DIM: tl.constexpr,  #
+    PAGE_SIZE: tl.constexpr,  #
+    BLOCK_M: tl.constexpr,  #
+    BLOCK_N: tl.constexpr,  #
+    BANDWIDTH: tl.constexpr,
+):
+    start_q = tl.load(Start_q).to(tl.int32)
+    start_m = tl.program_id(0)
+    off_hz = tl.program_id(1)
+    off_z = off_hz // H
+    off_h = off_hz % H
+    off_kv_h = off_h // REPEAT_KV
+
+    offs_m = start_m * BLOCK_M + tl.arange(0, BLOCK_M)
+    offs_n = tl.arange(0, BLOCK_N)
+    offs_d = tl.arange(0, HEAD_DIM)
+    pos_q = start_q + offs_m
+
+    q_ptrs = (
+        Q
+        + off_z.to(tl.int64) * stride_qz
+        + off_h * stride_qh
+        + offs_m[:, None] * stride_qm
+        + offs_d[None, :] * stride_qk
+    )
+    q = tl.load(q_ptrs, mask=offs_m[:, None] < N_Q_CTX, other=0.0)
+    table = Block_table + off_z.to(tl.int64) * stride_tz
+
+    sink = tl.load(Sinks + off_h).to(tl.float32)
+    m_i = tl.zeros([BLOCK_M], dtype=tl.float32) + sink
+    l_i = tl.zeros([BLOCK_M], dtype=tl.float32)
+    acc = tl.zeros([BLOCK_M, HEAD_DIM], dtype=tl.float32)
+
+    if BANDWIDTH:
+        lo = tl.maximum(0, start_q + start_m * BLOCK_M - BANDWIDTH + 1)
+        lo = lo // BLOCK_N * BLOCK_N
+    else:
+        lo = 0
+    hi = tl.minimum(start_q + (start_m + 1) * BLOCK_M, N_KV_CTX)
+
+    for start_n in range(lo, hi, BLOCK_N):
+        # Keys and values are gathered from their pool blocks row by row.
+        pos_k = start_n + offs_n
+        in_table = pos_k < N_KV_CTX
+        block = tl.load(table + (pos_k // PAGE_SIZE) * stride_tb, mask=in_table)
+        row = block.to(tl.int64) * stride_kb + (pos_k % PAGE_SIZE) * stride_kn
+        k_ptrs = K + off_kv_h * stride_kh + row[None, :] + offs_d[:, None] * stride_kk
+        k = tl.load(k_ptrs, mask=in_table[None, :], other=0.0)
+        qk = tl.dot(q, k, allow_tf32=False)
+
+        mask = pos_k[None, :] > pos_q[:, None]
+        if BANDWIDTH:
+            mask = mask | (pos_k[None, :] < pos_q[:, None] - BANDWIDTH + 1)
+        qk = qk * sm_scale + tl.where(mask, -1.0e6, 0.0)
+        m_ij = tl.maximum(m_i, tl.max(qk, 1))
+        p = tl.math.exp(qk - m_ij[:, None])
+        alpha = tl.math.exp(m_i - m_ij)
+        acc = acc * alpha[:, None]
+
+        row = block.to(tl.int64) * stride_vb + (pos_k % PAGE_SIZE) * stride_vn
+        v_ptrs = V + off_kv_h * stride_vh + row[:, None] + offs_d[None, :] * stride_vk
+        v = tl.load(v_ptrs, mask=in_table[:, None], other=0.0).to(tl.float32)
+        acc = tl.dot(p, v, acc, allow_tf32=False)
+
+        l_i = l_i * alpha + tl.sum(p, 1)
+        m_i = m_ij
+
+    acc = acc / (l_i + tl.math.exp(sink - m_i))[:, None]
+    o_ptrs = (
+        Out
+        + off_z.to(tl.int64) * stride_oz
+        + off_h * stride_oh
+        + offs_m[:, None] * stride_om
+        + offs_d[None, :] * stride_ok
+    )
+    tl.store(o_ptrs, acc.to(Out.type.element_ty), mask=offs_m[:, None] < N_Q_CTX)
+
+
+def paged_attention(
+    q: torch.Tensor,
+    key_blocks: torch.Tensor,
+    value_blocks: torch.Tensor,
+    block_table: torch.LongTensor,
+    sinks: torch.Tensor,
+    sm_scale: float,
+    bandwidth: int | None,
+    start_q: torch.LongTensor,
+) -> torch.Tensor:
+    """``attention`` reading keys and values straight from pool blocks.
+
+    Arguments are those of :func:`paged_attention_ref`; nothing is gathered
+    or copied, so a decode step only touches the blocks it attends to.
+    """
+    assert len(start_q) == 1
+    bs, n_ctx, n_kv_heads, repeat_kv, head_dim = q.shape
+    assert head_dim in {16, 32, 64, 128, 256}
+    n_heads = n_kv_heads * repeat_kv
+    q = q.reshape(bs, n_ctx, n_heads, head_dim)
+    o = torch.empty_like(q)
+    page_size = key_blocks.shape[1]
+    BLOCK_M = 16 if n_ctx <= 16 else 64
+    BLOCK_N = 64
+    grid = (triton.cdiv(n_ctx, BLOCK_M), bs * n_heads, 1)
+    _paged_attn_fwd[grid](
+        q,
+        key_blocks,
+        value_blocks,
+        block_table,
+        sinks,
+        sm_scale,
+        o,  #
+        start_q,
+        *q.stride(),
+        *key_blocks.stride(),
+        *value_blocks.stride(),
+        *block_table.stride(),
+        *o.stride(),
+        n_heads,
+        n_ctx,
+        block_table.shape[1] * page_size,
+        REPEAT_KV=repeat_kv,
+        HEAD_DIM=head_dim,
+        PAGE_SIZE=page_size,
+        BLOCK_M=BLOCK_M,
+        BLOCK_N=BLOCK_N,
+        BANDWIDTH=bandwidth,
+    )
+    return o.view(bs, n_ctx, n_heads * head_dim)
+
+
 def attention_ref(
     query: torch.Tensor,
     key: torch.Tensor,
@@ -286,6 +448,27 @@ def attention_ref(
     return output
 
 
+def paged_attention_ref(
+    query: torch.Tensor,
+    key_blocks: torch.Tensor,
+    value_blocks: torch.Tensor,
+    block_table: torch.LongTensor,
+    sinks: torch.Tensor,
+    sm_scale: float = 0.125,
+    sliding_window: int | None = None,
+    start_q: torch.LongTensor = 0,
+):
+    """``attention_ref`` over keys and values stored in pool blocks.
+
+    ``key_blocks``/``value_blocks`` are ``(num_blocks, block_size,
+    num_key_value_heads, head_dim)``; position ``p`` of sequence ``b`` lives
+    in block ``block_table[b, p // block_size]``.
+    """
+    key = key_blocks[block_table].flatten(1, 2)
+    value = value_blocks[block_table].flatten(1, 2)
+    return attention_ref(query, key, value, sinks, sm_scale, sliding_window, start_q)
+
+
 @pytest.mark.parametrize("batch_size", [1, 2])
 @pytest.mark.parametrize("num_queries", [1, 128])
 @pytest.mark.parametrize("num_keys", [128, 32])
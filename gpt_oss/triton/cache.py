@@ -0,0 +1,306 @@
+"""
+Key/value caches for the triton model.
+
+:class:`Cache` preallocates ``(batch, n_ctx, n_kv_heads, d_head)`` rows per
+layer.  :class:`PagedCache` has the same interface but stores rows in
+fixed-size blocks taken from a :class:`BlockPool` shared by every sequence
+and layer, so memory follows the tokens actually cached.  Each sequence maps
+its positions to blocks through a block table; forked sequences share blocks
+until one of them writes to a shared block (copy-on-write), and truncation
+only hands whole blocks back to the pool.  The model attends to the blocks
+in place with :func:`~gpt_oss.triton.attention.paged_attention`.
+"""
+
+import math
+
+import torch
+
+# Unallocated block-table entries point here.  The block is never handed out,
+# so stray writes (e.g. while capturing a CUDA graph) cannot corrupt a
+# sequence, and positions that map to it are always masked as "future".
+NULL_BLOCK = 0
+KV_BLOCK_SIZE = 128
+
+
+def _capturing() -> bool:
+    return torch.cuda.is_available() and torch.cuda.is_current_stream_capturing()
+
+
+class Cache:
+    def __init__(
+        self,
+        batch_size,
+        n_ctx,
+        n_kv_heads,
+        d_head=64,
+        device: torch.device | None = None,
+    ):
+        self.k = torch.zeros(
+            (batch_size, n_ctx, n_kv_heads, d_head), dtype=torch.bfloat16, device=device
+        )
+        self.v = torch.zeros(
+            (batch_size, n_ctx, n_kv_heads, d_head), dtype=torch.bfloat16, device=device
+        )
+        self.offset = torch.zeros((1,), dtype=torch.long, device=device)
+
+    @property
+    def batch_size(self) -> int:
+        return self.k.shape[0]
+
+    def reset(self):
+        self.k.zero_()
+        self.v.zero_()
+        self.offset.zero_()
+
+    def repeat_interleave(self, n):
+        """Repeat each cache entry n times along the batch dimension."""
+        self.k = self.k.repeat_interleave(n, dim=0)
+        self.v = self.v.repeat_interleave(n, dim=0)
+
+    def fork(self, n=1):
+        """A new cache repeating each row n times; ``self`` is unchanged."""
+        other = Cache.__new__(Cache)
+        other.k = self.k.repeat_interleave(n, dim=0)
+        other.v = self.v.repeat_interleave(n, dim=0)
+        other.offset = self.offset.clone()
+        return other
+
+    def truncate(self, n_ctx):
+        """Truncate the cache to the first n_ctx tokens."""
+        batch_size, _, n_kv_heads, d_head = self.k.shape
+        assert batch_size == self.v.shape[0]
+        assert n_ctx <= self.k.shape[1]
+        self.k[:, n_ctx:, :, :].zero_()
+        self.v[:, n_ctx:, :, :].zero_()
+        self.offset.fill_(n_ctx)
+        return self.k, self.v
+
+    def reserve(self, n_ctx):
+        """Nothing to allocate: every row is preallocated."""
+
+    def rows(self, start, stop):
+        """Keys and values of positions ``start:stop`` of every sequence."""
+        return self.k[:, start:stop], self.v[:, start:stop]
+
+    def extend(self, k, v):
+        batch_size, n_ctx, *_rest = k.shape
+        assert batch_size == self.k.shape[0]
+        indices = (
+            torch.arange(0, n_ctx, device=k.device, dtype=torch.long) + self.offset
+        )
+        self.k.index_copy_(1, indices, k)
+        self.v.index_copy_(1, indices, v)
+        self.offset.add_(n_ctx)
+        return self.k, self.v
+
+
+class BlockPool:
+    """Fixed-size key/value blocks with reference counts."""
+
+    def __init__(
+        self,
+        num_blocks: int,
+        block_size: int,
+        n_kv_heads: int,
+        d_head: int = 64,
+        device: torch.device | None = None,
+        dtype: torch.dtype = torch.bfloat16,
+    ):
+        shape = (num_blocks, block_size, n_kv_heads, d_head)
+        self.k = torch.zeros(shape, dtype=dtype, device=device)
+        self.v = torch.zeros(shape, dtype=dtype, device=device)
+        self.block_size = block_size
+        self.refs = [0] * num_blocks
+        self.refs[NULL_BLOCK] = 1
+        self._free = [b for b in range(num_blocks - 1, -1, -1) if b != NULL_BLOCK]
+
+    @property
+    def device(self) -> torch.device:
+        return self.k.device
+
+    @property
+    def num_free(self) -> int:
+        return len(self._free)
+
+    def allocate(self) -> int:
+        if not self._free:
+            raise RuntimeError("KV cache block pool is exhausted")
+        block = self._free.pop()
+        self.refs[block] = 1
+        return block
+
+    def incref(self, block: int) -> None:
+        self.refs[block] += 1
+
+    def decref(self, block: int) -> None:
+        self.refs[block] -= 1
+        if self.refs[block] == 0:
+            self._free.append(block)
+
+    def copy(self, block: int) -> int:
+        """A private copy of a shared block (drops one reference to it)."""
+        new = self.allocate()
+        self.k[new] = self.k[block]
+        self.v[new] = self.v[block]
+        self.decref(block)
+        return new
+
+    def metrics(self) -> dict:
+        num_blocks = len(self.refs) - 1
+        return {
+            "num_blocks": num_blocks,
+            "free_blocks": self.num_free,
+            "shared_blocks": sum(r > 1 for r in self.refs[1:]),
+            "utilization": 1.0 - self.num_free / num_blocks if num_blocks else 0.0,
+        }
+
+
+class PagedCache:
+    """Drop-in replacement for :class:`Cache` backed by a :class:`BlockPool`.
+
+    Sequences are decoded in lockstep, so they share one write cursor
+    (``offset`` on the device, ``length`` on the host).  ``extend`` stays
+    free of host logic while a CUDA graph is captured; before replaying such
+    a graph, call ``reserve(n)`` for the ``n`` tokens it will write.
+    """
+
+    def __init__(self, pool: BlockPool, batch_size: int, n_ctx: int):
+        self.pool = pool
+        self.block_size = pool.block_size
+        max_blocks = math.ceil(n_ctx / self.block_size)
+        self.tables: list[list[int]] = [[] for _ in range(batch_size)]
+        self.block_table = torch.full(
+            (batch_size, max_blocks), NULL_BLOCK, dtype=torch.long, device=pool.device
+        )
+        self.offset = torch.zeros((1,), dtype=torch.long, device=pool.device)
+        self.length = 0
+
+    @property
+    def batch_size(self) -> int:
+        return len(self.tables)
+
+    @property
+    def num_blocks(self) -> int:
+        return sum(len(table) for table in self.tables)
+
+    def _set_blocks(self, updates: list[tuple[int, int, int]]) -> None:
+        if updates:
+            rows, cols, blocks = zip(*updates)
+            self.block_table[list(rows), list(cols)] = torch.tensor(
+                blocks, dtype=torch.long, device=self.block_table.device
+            )
+
+    def reset(self):
+        self.truncate(0)
+
+    def truncate(self, n_ctx):
+        """Keep the first n_ctx tokens; only whole blocks past them are freed."""
+        assert 0 <= n_ctx <= self.block_table.shape[1] * self.block_size
+        keep = math.ceil(n_ctx / self.block_size)
+        for table in self.tables:
+            for block in table[keep:]:
+                self.pool.decref(block)
+            del table[keep:]
+        self.block_table[:, keep:] = NULL_BLOCK
+        self.offset.fill_(n_ctx)
+        self.length = n_ctx
+
+    def repeat_interleave(self, n):
+        """Repeat each sequence n times; the copies share blocks until written."""
+        tables = []
+        for table in self.tables:
+            for _ in range(n - 1):
+                for block in table:
+                    self.pool.incref(block)
+            tables.extend(list(table) for _ in range(n))
+        self.tables = tables
+        self.block_table = self.block_table.repeat_interleave(n, dim=0)
+
+    def fork(self, n=1):
+        """A new cache repeating each sequence n times without copying any
+        block: ``self`` and the forks share blocks until one writes to them."""
+        other = PagedCache.__new__(PagedCache)
+        other.pool, other.block_size = self.pool, self.block_size
+        other.tables = [list(table) for table in self.tables]
+        other.block_table = self.block_table.clone()
+        other.offset = self.offset.clone()
+        other.length = self.length
+        for table in other.tables:
+            for block in table:
+                self.pool.incref(block)
+        other.repeat_interleave(n)
+        return other
+
+    def share(self, blocks: list[int], n_ctx: int) -> None:
+        """Start every sequence over from ``blocks`` holding its first
+        ``n_ctx`` positions.  The blocks are shared, not copied; writing to
+        one copies it first (see :meth:`reserve`)."""
+        assert len(blocks) == math.ceil(n_ctx / self.block_size)
+        self.truncate(0)
+        updates = []
+        for row, table in enumerate(self.tables):
+            for col, block in enumerate(blocks):
+                self.pool.incref(block)
+                table.append(block)
+                updates.append((row, col, block))
+        self._set_blocks(updates)
+        self.offset.fill_(n_ctx)
+        self.length = n_ctx
+
+    def reserve(self, n_ctx):
+        """Allocate (or privately copy) the blocks the next n_ctx tokens land in."""
+        first = self.length // self.block_size
+        last = (self.length + n_ctx - 1) // self.block_size
+        assert last < self.block_table.shape[1], "context length exceeded"
+        updates = []
+        for row, table in enumerate(self.tables):
+            for b in range(first, last + 1):
+                while len(table) <= b:
+                    table.append(self.pool.allocate())
+                    updates.append((row, len(table) - 1, table[-1]))
+                if self.pool.refs[table[b]] > 1:
+                    table[b] = self.pool.copy(table[b])
+                    updates.append((row, b, table[b]))
+        self._set_blocks(updates)
+        self.length += n_ctx
+
+    def _slots(self, positions: torch.Tensor) -> torch.Tensor:
+        """Flat pool rows of ``positions`` for every sequence."""
+        blocks = self.block_table[:, positions // self.block_size]
+        return blocks * self.block_size + positions % self.block_size
+
+    def rows(self, start, stop):
+        positions = torch.arange(start, stop, device=self.block_table.device)
+        slots = self._slots(positions)
+        return self._flat(self.pool.k)[slots], self._flat(self.pool.v)[slots]
+
+    @staticmethod
+    def _flat(x: torch.Tensor) -> torch.Tensor:
+        return x.view(-1, *x.shape[2:])
+
+    def append(self, k, v):
+        """Write the next ``n_ctx`` positions into their pool blocks."""
+        batch_size, n_ctx, *_rest = k.shape
+        assert batch_size == self.batch_size
+        if not _capturing():
+            self.reserve(n_ctx)
+        positions = self.offset + torch.arange(n_ctx, device=k.device)
+        slots = self._slots(positions).flatten()
+        self._flat(self.pool.k).index_copy_(0, slots, k.flatten(0, 1))
+        self._flat(self.pool.v).index_copy_(0, slots, v.flatten(0, 1))
+        self.offset.add_(n_ctx)
+
+    def extend(self, k, v):
+        """``append``, then gather every cached row like ``Cache.extend``.
+
+        The model calls ``append`` and attends through the block table with
+        ``paged_attention``; this copy is for callers that need contiguous
+        keys and values.  A captured graph needs static shapes, so it sees
+        the whole table.
+        """
+        capturing = _capturing()
+        self.append(k, v)
+        n_keys = self.block_table.shape[1] * self.block_size
+        if not capturing:
+            n_keys = math.ceil(self.length / self.block_size) * self.block_size
+        return self.rows(0, n_keys)
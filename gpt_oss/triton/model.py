@@ -7,7 +7,8 @@ from torch.profiler import record_function
 
 from gpt_oss.torch.model import ModelConfig, RMSNorm
 from gpt_oss.torch.weights import Checkpoint
-from gpt_oss.triton.attention import attention, attention_ref
+from gpt_oss.triton.attention import attention, attention_ref, paged_attention
+from gpt_oss.triton.cache import KV_BLOCK_SIZE, BlockPool, Cache, PagedCache
 from gpt_oss.triton.moe import moe, quantize_mx4
 
 
@@ -120,55 +121,6 @@ class RotaryEmbedding(torch.nn.Module):
         return query, key
 
 
-class Cache:
-    def __init__(
-        self,
-        batch_size,
-        n_ctx,
-        n_kv_heads,
-        d_head=64,
-        device: torch.device | None = None,
-    ):
-        self.k = torch.zeros(
-            (batch_size, n_ctx, n_kv_heads, d_head), dtype=torch.bfloat16, device=device
-        )
-        self.v = torch.zeros(
-            (batch_size, n_ctx, n_kv_heads, d_head), dtype=torch.bfloat16, device=device
-        )
-        self.offset = torch.zeros((1,), dtype=torch.long, device=device)
-
-    def reset(self):
-        self.k.zero_()
-        self.v.zero_()
-        self.offset.zero_()
-
-    def repeat_interleave(self, n):
-        """Repeat each cache entry n times along the batch dimension."""
-        self.k = self.k.repeat_interleave(n, dim=0)
-        self.v = self.v.repeat_interleave(n, dim=0)
-
-    def truncate(self, n_ctx):
-        """Truncate the cache to the first n_ctx tokens."""
-        batch_size, _, n_kv_heads, d_head = self.k.shape
-        assert batch_size == self.v.shape[0]
-        assert n_ctx <= self.k.shape[1]
-        self.k[:, n_ctx:, :, :].zero_()
-        self.v[:, n_ctx:, :, :].zero_()
-        self.offset.fill_(n_ctx)
-        return self.k, self.v
-
-    def extend(self, k, v):
-        batch_size, n_ctx, *_rest = k.shape
-        assert batch_size == self.k.shape[0]
-        indices = (
-            torch.arange(0, n_ctx, device=k.device, dtype=torch.long) + self.offset
-        )
-        self.k.index_copy_(1, indices, k)
-        self.v.index_copy_(1, indices, v)
-        self.offset.add_(n_ctx)
-        return self.k, self.v
-
-
 class AttentionBlock(torch.nn.Module):
     def __init__(
         self,
@@ -212,7 +164,9 @@ class AttentionBlock(torch.nn.Module):
         )
 
     @record_function("attn")
-    def forward(self, x: torch.Tensor, cache: Cache | None = None) -> torch.Tensor:
+    def forward(
+        self, x: torch.Tensor, cache: Cache | PagedCache | None = None
+    ) -> torch.Tensor:
         batch_size, n_ctx, dim = x.shape
 
         t = self.norm(x)
@@ -233,7 +187,10 @@ class AttentionBlock(torch.nn.Module):
         if cache is not None:
             offset = cache.offset.clone()
             q, k = self.rope(q, k, offset=offset)
-            k, v = cache.extend(k, v)
+            if isinstance(cache, PagedCache):
+                cache.append(k, v)
+            else:
+                k, v = cache.extend(k, v)
         else:
             offset = torch.zeros((1,), dtype=torch.long, device=x.device)
             q, k = self.rope(q, k, offset=offset)
@@ -246,7 +203,19 @@ class AttentionBlock(torch.nn.Module):
             self.head_dim,
         )
         with record_function("attn_kernel"):
-            if n_ctx == 1:
+            if isinstance(cache, PagedCache):
+                # Keys and values stay in the pool; no per-step gather.
+                t = paged_attention(
+                    q,
+                    cache.pool.k,
+                    cache.pool.v,
+                    cache.block_table,
+                    self.sinks,
+                    self.sm_scale,
+                    self.sliding_window,
+                    offset,
+                )
+            elif n_ctx == 1:
                 t = attention_ref(
                     q,
                     k,
@@ -396,7 +365,9 @@ class TransformerBlock(torch.nn.Module):
         self.attn = AttentionBlock(config, layer_idx, device)
         self.mlp = MLPBlock(config, layer_idx, device)
 
-    def forward(self, x: torch.Tensor, cache: Cache | None = None) -> torch.Tensor:
+    def forward(
+        self, x: torch.Tensor, cache: Cache | PagedCache | None = None
+    ) -> torch.Tensor:
         x = self.attn(x, cache=cache)
         x = self.mlp(x)
         return x
@@ -429,7 +400,7 @@ class Transformer(torch.nn.Module):
         )
 
     def forward(
-        self, x: torch.Tensor, caches: list[Cache] | None = None
+        self, x: torch.Tensor, caches: list[Cache | PagedCache] | None = None
     ) -> torch.Tensor:
         caches = caches or [None] * len(self.block)
         with record_function("embedding"):
@@ -499,9 +470,16 @@ class TokenGenerator:
     def __init__(self, checkpoint: str, context: int, device: torch.device):
         self.device = device
         self.model = Transformer.from_checkpoint(checkpoint, device=self.device)
+        config = self.model.config
+        self.pool = BlockPool(
+            len(self.model.block) * math.ceil(context / KV_BLOCK_SIZE) + 1,
+            KV_BLOCK_SIZE,
+            config.num_key_value_heads,
+            config.head_dim,
+            device=self.device,
+        )
         self.caches = [
-            Cache(1, context, self.model.config.num_key_value_heads, device=self.device)
-            for _ in range(len(self.model.block))
+            PagedCache(self.pool, 1, context) for _ in range(len(self.model.block))
         ]
         self.input_token = torch.zeros(1, dtype=torch.int32, device=self.device)
         # warmup
@@ -519,10 +497,36 @@ class TokenGenerator:
         temperature: float = 1.0,
         max_tokens: int = 0,
         return_logprobs: bool = False,
+        prompt_lookup: bool = False,
+        stats=None,
     ):
         stop_tokens = stop_tokens or []
         for cache in self.caches:
             cache.reset()
+        if prompt_lookup:
+            # Draft tokens come from n-gram matches in the context; they are
+            # verified with a multi-token forward outside the CUDA graph.
+            from gpt_oss.inference.prompt_lookup import prompt_lookup_decode
+
+            def forward(tokens: list[int]) -> torch.Tensor:
+                x = torch.as_tensor(tokens, dtype=torch.int32, device=self.device)
+                return self.model(x[None, :], caches=self.caches)[0]
+
+            def truncate(n_ctx: int) -> None:
+                for cache in self.caches:
+                    cache.truncate(n_ctx)
+
+            yield from prompt_lookup_decode(
+                list(prompt_tokens),
+                forward,
+                truncate,
+                stop_tokens,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                return_logprobs=return_logprobs,
+                stats=stats,
+            )
+            return
         prompt_tokens = torch.as_tensor(
             prompt_tokens, dtype=torch.int32, device=self.device
         )
@@ -531,6 +535,8 @@ class TokenGenerator:
         num_generated_tokens = 0
         while max_tokens == 0 or num_generated_tokens < max_tokens:
             self.input_token[0] = predicted_token
+            for cache in self.caches:
+                cache.reserve(1)
             self.graph.replay()
             if temperature == 0.0:
                 predicted_token = torch.argmax(self.logits[-1, :], dim=-1).item()
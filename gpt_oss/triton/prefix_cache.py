@@ -0,0 +1,260 @@
+"""
+Radix-tree prefix cache shared by every session of a backend.
+
+Each edge of the tree is labelled with a run of tokens and holds references
+to the :class:`~gpt_oss.triton.cache.BlockPool` blocks that store the
+per-layer key/value rows of exactly those tokens, so the path from the root
+to a node spells out a token prefix together with its KV cache.  A new
+request looks up its longest cached prefix, points its block table at those
+blocks and only prefills the remainder; after prefilling, the blocks of the
+rows that were not cached yet are inserted.  Nothing is copied: blocks are
+reference counted, and a session copies a shared block only when it writes
+to it.
+
+An edge boundary may fall inside a block; that block is then referenced by
+the nodes on both sides, and a prefix reads each block from the deepest node
+on its path (the one whose sequence wrote the block last).
+
+Matched paths are pinned with reference counts while they are being read.
+When the referenced blocks exceed ``budget_bytes``, unpinned leaves are
+evicted in least-recently-used order.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from gpt_oss.triton.cache import BlockPool, PagedCache
+
+DEFAULT_PREFIX_CACHE_BYTES = 4 << 30
+
+# Pool block ids per layer, in position order.
+Blocks = list[list[int]]
+
+
+class _Node:
+    __slots__ = ("tokens", "start", "blocks", "parent", "children", "refs", "last_used")
+
+    def __init__(
+        self, tokens: list[int], start: int, blocks: Blocks, parent: Optional["_Node"]
+    ):
+        self.tokens = tokens
+        self.start = start  # position of tokens[0] in the prefix
+        self.blocks = blocks  # blocks overlapping positions start:start+len(tokens)
+        self.parent = parent
+        self.children: dict[int, _Node] = {}
+        self.refs = 0
+        self.last_used = 0
+
+    @property
+    def num_blocks(self) -> int:
+        return sum(len(layer) for layer in self.blocks)
+
+
+@dataclass
+class PrefixMatch:
+    """A pinned cached prefix; hand it back with :meth:`PrefixCache.release`."""
+
+    length: int
+    node: _Node
+
+
+class PrefixCache:
+    def __init__(self, pool: BlockPool, budget_bytes: int = DEFAULT_PREFIX_CACHE_BYTES):
+        self.pool = pool
+        self.block_size = pool.block_size
+        self.block_bytes = 2 * pool.k[0].numel() * pool.k.element_size()
+        self.budget_bytes = budget_bytes
+        self.root = _Node([], 0, [], None)
+        self.root.refs = 1  # never evicted
+        self.nbytes = 0
+        self._clock = itertools.count(1)
+        self._lock = threading.Lock()
+        # metrics
+        self.lookups = 0
+        self.hits = 0
+        self.tokens_matched = 0
+        self.tokens_inserted = 0
+        self.tokens_evicted = 0
+
+    # ---- tree walking ------------------------------------------------
+    def _split(self, node: _Node, n: int) -> _Node:
+        """Cut ``node``'s edge after ``n`` tokens and return the new upper node.
+
+        ``node`` keeps its identity as the lower half, so pins that walk up
+        from it (or from a descendant) also cover the new node.
+        """
+        first = node.start // self.block_size
+        cut = node.start + n
+        upper_end = math.ceil(cut / self.block_size) - first
+        lower_start = cut // self.block_size - first
+        upper = _Node(
+            node.tokens[:n],
+            node.start,
+            [layer[:upper_end] for layer in node.blocks],
+            node.parent,
+        )
+        if lower_start < upper_end:  # the block holding the cut is shared
+            for layer in node.blocks:
+                self.pool.incref(layer[lower_start])
+            self.nbytes += len(node.blocks) * self.block_bytes
+        upper.refs, upper.last_used = node.refs, node.last_used
+        node.parent.children[node.tokens[0]] = upper
+        node.tokens = node.tokens[n:]
+        node.start = cut
+        node.blocks = [layer[lower_start:] for layer in node.blocks]
+        node.parent = upper
+        upper.children[node.tokens[0]] = node
+        return upper
+
+    def _walk(self, tokens: list[int]) -> tuple[_Node, int]:
+        """Deepest node whose path is a prefix of ``tokens`` (splitting an edge
+        that only partially matches) and the length of that path."""
+        node, length = self.root, 0
+        while length < len(tokens):
+            child = node.children.get(tokens[length])
+            if child is None:
+                break
+            n = 0
+            edge = child.tokens
+            while (
+                n < len(edge)
+                and length + n < len(tokens)
+                and edge[n] == tokens[length + n]
+            ):
+                n += 1
+            if n < len(edge):
+                child = self._split(child, n)
+            node, length = child, length + n
+        return node, length
+
+    def _pin(self, node: _Node, delta: int) -> None:
+        now = next(self._clock)
+        while node is not self.root:
+            node.refs += delta
+            node.last_used = now
+            node = node.parent
+
+    # ---- public API --------------------------------------------------
+    def match(self, tokens: list[int]) -> PrefixMatch:
+        """Pin and return the longest cached prefix of ``tokens``."""
+        with self._lock:
+            node, length = self._walk(tokens)
+            self._pin(node, +1)
+            self.lookups += 1
+            self.hits += length > 0
+            self.tokens_matched += length
+            return PrefixMatch(length, node)
+
+    def release(self, match: PrefixMatch) -> None:
+        with self._lock:
+            self._pin(match.node, -1)
+
+    def gather(self, match: PrefixMatch) -> Blocks:
+        """Per-layer blocks holding the KV rows of a matched prefix."""
+        path, node = [], match.node
+        while node is not self.root:
+            path.append(node)
+            node = node.parent
+        path.reverse()
+        blocks: Blocks = [[] for _ in (path[0].blocks if path else [])]
+        for node in path:  # deeper nodes win blocks shared across an edge
+            first = node.start // self.block_size
+            for table, layer in zip(blocks, node.blocks):
+                del table[first:]
+                table.extend(layer)
+        return blocks
+
+    def insert(self, tokens: list[int], blocks_of: Callable[[int, int], Blocks]) -> int:
+        """Cache ``tokens``; ``blocks_of(start, stop)`` must return the blocks
+        holding the KV rows of ``tokens[start:stop]`` (see :func:`cache_blocks`).
+        Only blocks of rows that are not cached yet are referenced.  Returns
+        the number of newly cached tokens."""
+        with self._lock:
+            node, length = self._walk(tokens)
+            if length == len(tokens):
+                self._pin(node, 0)  # touch
+                return 0
+            leaf = _Node(tokens[length:], length, blocks_of(length, len(tokens)), node)
+            nbytes = leaf.num_blocks * self.block_bytes
+            # Keep the attachment point alive while making room.
+            self._pin(node, +1)
+            self._evict(self.nbytes + nbytes - self.budget_bytes)
+            self._pin(node, -1)
+            if self.nbytes + nbytes > self.budget_bytes:
+                return 0
+            for layer in leaf.blocks:
+                for block in layer:
+                    self.pool.incref(block)
+            node.children[leaf.tokens[0]] = leaf
+            self.nbytes += nbytes
+            self.tokens_inserted += len(leaf.tokens)
+            self._pin(leaf, 0)
+            return len(leaf.tokens)
+
+    def _evict(self, nbytes: int) -> None:
+        """Drop unpinned leaves, least recently used first, to free ``nbytes``."""
+        if nbytes <= 0:
+            return
+        order = itertools.count()  # tie-breaker, nodes are not comparable
+        heap = [(n.last_used, next(order), n) for n in self._leaves() if n.refs == 0]
+        heapq.heapify(heap)
+        freed = 0
+        while heap and freed < nbytes:
+            _, _, node = heapq.heappop(heap)
+            parent = node.parent
+            del parent.children[node.tokens[0]]
+            for layer in node.blocks:
+                for block in layer:
+                    self.pool.decref(block)
+            freed += node.num_blocks * self.block_bytes
+            self.nbytes -= node.num_blocks * self.block_bytes
+            self.tokens_evicted += len(node.tokens)
+            if parent is not self.root and not parent.children and parent.refs == 0:
+                heapq.heappush(heap, (parent.last_used, next(order), parent))
+
+    def _leaves(self):
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.children:
+                stack.extend(node.children.values())
+            elif node is not self.root:
+                yield node
+
+    def metrics(self) -> dict:
+        return {
+            "lookups": self.lookups,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "tokens_matched": self.tokens_matched,
+            "tokens_inserted": self.tokens_inserted,
+            "tokens_evicted": self.tokens_evicted,
+            "nbytes": self.nbytes,
+            "budget_bytes": self.budget_bytes,
+        }
+
+
+def cache_blocks(caches: list[PagedCache]) -> Callable[[int, int], Blocks]:
+    """``blocks_of`` callback reading the block tables of single-sequence
+    caches."""
+
+    def blocks_of(start: int, stop: int) -> Blocks:
+        return [
+            cache.tables[0][
+                start // cache.block_size : math.ceil(stop / cache.block_size)
+            ]
+            for cache in caches
+        ]
+
+    return blocks_of
+
+
+def restore(caches: list[PagedCache], blocks: Blocks, n_ctx: int) -> int:
+    """Point ``caches`` at the blocks of a gathered prefix in place (CUDA
+    graphs captured on the cache tensors stay valid).  Returns ``n_ctx``."""
+    for cache, layer in zip(caches, blocks):
+        cache.share(layer[: math.ceil(n_ctx / cache.block_size)], n_ctx)
+    return n_ctx
@@ -73,6 +73,7 @@ def cmd_run(args):
         budget_usd=args.budget_usd,
         interactive=not args.no_interactive,
         enable_code_interpreter=args.enable_code_interpreter,
+        resume=args.resume,
     )
     orch = Orchestrator(prj, provider, cfg)
     orch.run()
@@ -145,6 +146,11 @@ def main(argv=None):
         action="store_true",
         help="Enable server-side code interpreter tool",
     )
+    p_run.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue from the first unfinished stage checkpointed under <project>/checkpoints",
+    )
     p_run.add_argument(
         "--enable-browser",
         action="store_true",
@@ -0,0 +1,300 @@
+"""
+RevisionStore: deduplicated, delta-compressed draft history in two files.
+
+Autosaves used to copy the whole draft into ``revisions/`` every time.  The
+store instead appends to a pack file and to ``index.jsonl``:
+
+* each distinct draft (by SHA-256) is stored once; saving identical content
+  again only adds an index line;
+* a new draft is stored as a zlib-compressed line diff against the latest
+  keyframe, and as a compressed keyframe every ``keyframe_interval`` objects
+  or when the diff would not be much smaller, so any revision is rebuilt
+  from at most one keyframe plus one diff;
+* revisions are kept in timestamp order, so lookups by time bisect.
+
+:meth:`RevisionStore.gc` drops old revisions and writes the objects still
+referenced to a new pack; replacing the index (whose first line names the
+pack) commits it atomically.  With ``keep_last`` set, :meth:`RevisionStore.save`
+runs it whenever the history doubles past ``keep_last`` revisions, so the
+pack is rewritten once every ``keep_last`` saves.
+"""
+
+from __future__ import annotations
+
+import bisect
+import difflib
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+INDEX_NAME = "index.jsonl"
+# Revisions kept by the autosaves of a paper draft.
+AUTOSAVE_KEEP_LAST = 256
+
+
+@dataclass(frozen=True)
+class Revision:
+    ts: float
+    sha256: str
+    size: int  # characters of the draft
+
+
+@dataclass
+class _Object:
+    offset: int
+    length: int
+    size: int
+    base: Optional[str]  # keyframe sha256 for deltas, ``None`` for keyframes
+
+
+def _encode_delta(base: List[str], lines: List[str]) -> List[list]:
+    """Ops rebuilding ``lines`` from ``base``: ``[i, j]`` copies, ``[text]`` inserts."""
+    ops: List[list] = []
+    matcher = difflib.SequenceMatcher(a=base, b=lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(["".join(lines[j1:j2])])
+    return ops
+
+
+def _apply_delta(base: List[str], ops: List[list]) -> str:
+    parts = []
+    for op in ops:
+        parts.append("".join(base[op[0] : op[1]]) if len(op) == 2 else op[0])
+    return "".join(parts)
+
+
+class RevisionStore:
+    """Append-only revision history of one document.
+
+    Args:
+        root: directory holding ``index.jsonl`` and its ``pack-<n>.bin``.
+        keyframe_interval: objects stored between two keyframes.
+        max_delta_ratio: store a keyframe when the compressed diff is larger
+            than this fraction of the compressed full text.
+        keep_last: garbage-collect down to the newest ``keep_last``
+            revisions once twice as many are stored; ``None`` keeps all.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        keyframe_interval: int = 32,
+        max_delta_ratio: float = 0.5,
+        keep_last: Optional[int] = None,
+    ) -> None:
+        self.root = root
+        self.keyframe_interval = keyframe_interval
+        self.max_delta_ratio = max_delta_ratio
+        self.keep_last = None if keep_last is None else max(1, keep_last)
+        self.index_path = os.path.join(root, INDEX_NAME)
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._load()
+
+    # ---- index -------------------------------------------------------
+    def _reset(self, pack: str) -> None:
+        self.pack_path = os.path.join(self.root, pack)
+        self._objects: Dict[str, _Object] = {}
+        self._revisions: List[Revision] = []
+        self._times: List[float] = []
+        self._keyframe: Optional[str] = None
+        self._keyframe_lines: List[str] = []
+        self._since_keyframe = 0
+
+    def _load(self) -> None:
+        self._reset("pack-0.bin")
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        if lines:
+            self._reset(json.loads(lines[0])["pack"])
+        pack_size = (
+            os.path.getsize(self.pack_path) if os.path.exists(self.pack_path) else 0
+        )
+        for n, line in enumerate(lines[1:], start=1):
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                rec = None
+            if rec is None or ("obj" in rec and rec["off"] + rec["len"] > pack_size):
+                # Interrupted save: drop the tail so later appends stay readable.
+                tmp = self.index_path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.writelines(lines[:n])
+                os.replace(tmp, self.index_path)
+                break
+            if "obj" in rec:
+                self._add_object(
+                    rec["obj"],
+                    _Object(rec["off"], rec["len"], rec["size"], rec["base"]),
+                )
+            elif rec.get("rev") in self._objects:
+                self._add_revision(
+                    Revision(rec["ts"], rec["rev"], self._objects[rec["rev"]].size)
+                )
+
+    def _add_revision(self, rev: Revision) -> None:
+        self._revisions.append(rev)
+        self._times.append(rev.ts)
+
+    def _add_object(self, sha: str, obj: _Object) -> None:
+        self._objects[sha] = obj
+        if obj.base is None:
+            self._keyframe, self._since_keyframe = sha, 0
+            self._keyframe_lines = []
+        else:
+            self._since_keyframe += 1
+
+    # ---- writing -----------------------------------------------------
+    def save(self, content: str, ts: Optional[float] = None) -> Revision:
+        """Record ``content`` as the newest revision."""
+        sha = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        with self._lock:
+            ts = time.time() if ts is None else ts
+            if self._revisions:
+                ts = max(ts, self._revisions[-1].ts)  # keep the index sorted
+            records: List[dict] = []
+            if not os.path.exists(self.index_path):
+                records.append({"pack": os.path.basename(self.pack_path)})
+            if sha not in self._objects:
+                records.append(self._append_object(sha, content))
+            rev = Revision(ts, sha, len(content))
+            records.append({"rev": sha, "ts": ts})
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(r) + "\n" for r in records))
+            self._add_revision(rev)
+            if self.keep_last and len(self._revisions) >= 2 * self.keep_last:
+                self._rewrite(self._revisions[-self.keep_last :])
+        return rev
+
+    def _append_object(self, sha: str, content: str) -> dict:
+        full = zlib.compress(content.encode("utf-8"))
+        blob, base = full, None
+        if (
+            self._keyframe is not None
+            and self._since_keyframe < self.keyframe_interval - 1
+        ):
+            if not self._keyframe_lines:
+                self._keyframe_lines = self._read(self._keyframe).splitlines(
+                    keepends=True
+                )
+            ops = _encode_delta(self._keyframe_lines, content.splitlines(keepends=True))
+            delta = zlib.compress(json.dumps(ops).encode("utf-8"))
+            if len(delta) < self.max_delta_ratio * len(full):
+                blob, base = delta, self._keyframe
+        with open(self.pack_path, "ab") as f:
+            offset = f.tell()
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        self._add_object(sha, _Object(offset, len(blob), len(content), base))
+        if base is None:
+            self._keyframe_lines = content.splitlines(keepends=True)
+        return {
+            "obj": sha,
+            "off": offset,
+            "len": len(blob),
+            "size": len(content),
+            "base": base,
+        }
+
+    # ---- reading -----------------------------------------------------
+    def _blob(self, obj: _Object) -> bytes:
+        with open(self.pack_path, "rb") as f:
+            f.seek(obj.offset)
+            return zlib.decompress(f.read(obj.length))
+
+    def _read(self, sha: str) -> str:
+        obj = self._objects[sha]
+        if obj.base is None:
+            return self._blob(obj).decode("utf-8")
+        base = self._read(obj.base).splitlines(keepends=True)
+        return _apply_delta(base, json.loads(self._blob(obj)))
+
+    def read(self, rev: Revision) -> str:
+        """Full text of ``rev``."""
+        with self._lock:
+            return self._read(rev.sha256)
+
+    def list(self) -> List[Revision]:
+        """Every revision, oldest first."""
+        with self._lock:
+            return list(self._revisions)
+
+    def latest(self) -> Optional[Revision]:
+        with self._lock:
+            return self._revisions[-1] if self._revisions else None
+
+    def at(self, ts: float) -> Optional[Revision]:
+        """Newest revision saved at or before ``ts`` (binary search)."""
+        with self._lock:
+            i = bisect.bisect_right(self._times, ts)
+            return self._revisions[i - 1] if i else None
+
+    def __len__(self) -> int:
+        return len(self._revisions)
+
+    # ---- garbage collection -----------------------------------------
+    def gc(
+        self, keep_last: Optional[int] = None, before: Optional[float] = None
+    ) -> int:
+        """Drop revisions and compact the pack; returns revisions removed.
+
+        Args:
+            keep_last: keep only the newest ``keep_last`` revisions.
+            before: drop revisions saved before this timestamp. The newest
+                revision is always kept.
+        """
+        with self._lock:
+            kept = self._revisions
+            if before is not None:
+                kept = [r for r in kept if r.ts >= before] or kept[-1:]
+            if keep_last is not None:
+                kept = kept[-max(1, keep_last) :] if kept else kept
+            removed = len(self._revisions) - len(kept)
+            self._rewrite(kept)
+            return removed
+
+    def _rewrite(self, kept: List[Revision]) -> None:
+        texts = {r.sha256: self._read(r.sha256) for r in kept}
+        old_pack = self.pack_path
+        generation = int(os.path.basename(old_pack)[len("pack-") : -len(".bin")])
+        new_pack = f"pack-{generation + 1}.bin"
+        index_tmp = self.index_path + ".tmp"
+        # Re-encode from scratch so deltas never point at dropped keyframes.
+        self._reset(new_pack)
+        try:
+            open(self.pack_path, "wb").close()
+            records: List[dict] = [{"pack": new_pack}]
+            for rev in kept:
+                if rev.sha256 not in self._objects:
+                    records.append(self._append_object(rev.sha256, texts[rev.sha256]))
+                records.append({"rev": rev.sha256, "ts": rev.ts})
+                self._add_revision(rev)
+            with open(index_tmp, "w", encoding="utf-8") as f:
+                f.write("".join(json.dumps(r) + "\n" for r in records))
+            os.replace(index_tmp, self.index_path)
+        except BaseException:
+            if os.path.exists(self.pack_path):
+                os.remove(self.pack_path)
+            self._load()
+            raise
+        if os.path.exists(old_pack):
+            os.remove(old_pack)
+
+    def disk_usage(self) -> int:
+        """Bytes used by the pack and the index."""
+        return sum(
+            os.path.getsize(p)
+            for p in (self.pack_path, self.index_path)
+            if os.path.exists(p)
+        )
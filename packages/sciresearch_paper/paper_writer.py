@@ -1,9 +1,8 @@
 from __future__ import annotations
 
-import datetime
 import os
-import shutil
-from pathlib import Path
+
+from sciresearch_core.revisions import AUTOSAVE_KEEP_LAST, Revision, RevisionStore
 
 from .project_fs import ProjectFS
 
@@ -14,21 +13,19 @@ class PaperWriter:
         self.draft_path = self.fs.get_path("paper/draft.tex")
         if not self.draft_path.exists():
             self.fs.write("paper/draft.tex", DEFAULT_TEX)
+        self.revisions = RevisionStore(
+            str(self.fs.rev_dir), keep_last=AUTOSAVE_KEEP_LAST
+        )
 
-    def autosave(self, content: str) -> Path:
-        """Atomically writes content to the draft and creates a checkpoint."""
+    def autosave(self, content: str) -> Revision:
+        """Atomically writes content to the draft and records a revision."""
         # Atomic write
         tmp_path = self.draft_path.with_suffix(".tex.tmp")
         tmp_path.write_text(content, encoding="utf-8")
         os.replace(tmp_path, self.draft_path)
 
-        # Checkpoint snapshot
-        now = datetime.datetime.now(datetime.timezone.utc)
-        ts = now.strftime("%Y%m%d-%H%M%S") + f"-{int(now.microsecond/1000):03d}"
-        snap_name = f"draft-{ts}.tex"
-        snap_path = self.fs.rev_dir / snap_name
-        shutil.copy2(self.draft_path, snap_path)
-        return snap_path
+        # Checkpoint snapshot (deduplicated and delta-compressed)
+        return self.revisions.save(content)
 
 
 DEFAULT_TEX = r"""\documentclass{article}
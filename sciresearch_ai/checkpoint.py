@@ -0,0 +1,100 @@
+"""
+StageStore: durable, content-addressed artifacts of orchestrator stages.
+
+Every finished stage (``plan:0``, ``ttc:0``, ...) is serialised to JSON and
+written once under ``checkpoints/objects/<sha256>.json``; a small manifest
+maps stage names to those hashes.  Both are replaced atomically, so a crash
+leaves either the old or the new manifest and never a torn artifact.  A
+resumed run reloads the manifest and only executes stages missing from it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, Optional
+
+MANIFEST_VERSION = 1
+
+
+def _atomic_write(path: str, text: str) -> None:
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class StageStore:
+    """Stage artifacts of one project, keyed by stage name.
+
+    Args:
+        root: directory holding the manifest and the ``objects`` folder.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.manifest_path = os.path.join(root, "manifest.json")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, Any]] = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != MANIFEST_VERSION:
+            return {}
+        return data.get("stages", {})
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, f"{digest}.json")
+
+    def put(self, name: str, value: Any) -> str:
+        """Persist ``value`` as the artifact of stage ``name``; returns its hash."""
+        text = json.dumps(value, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        path = self._object_path(digest)
+        with self._lock:
+            if not os.path.exists(path):
+                _atomic_write(path, text)
+            self.stages[name] = {"sha256": digest, "saved_at": time.time()}
+            _atomic_write(
+                self.manifest_path,
+                json.dumps(
+                    {"version": MANIFEST_VERSION, "stages": self.stages}, indent=2
+                ),
+            )
+        return digest
+
+    def get(self, name: str, default: Optional[Any] = None) -> Any:
+        """Artifact of stage ``name``; ``default`` if missing or corrupted."""
+        entry = self.stages.get(name)
+        if entry is None:
+            return default
+        try:
+            with open(self._object_path(entry["sha256"]), "rb") as f:
+                raw = f.read()
+        except OSError:
+            return default
+        if hashlib.sha256(raw).hexdigest() != entry["sha256"]:
+            return default
+        return json.loads(raw.decode("utf-8"))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.stages
+
+    def reset(self) -> None:
+        """Forget every stage and delete the stored artifacts."""
+        with self._lock:
+            self.stages = {}
+            if os.path.exists(self.manifest_path):
+                os.remove(self.manifest_path)
+            shutil.rmtree(self.objects_dir, ignore_errors=True)
+            os.makedirs(self.objects_dir, exist_ok=True)
@@ -11,6 +11,7 @@ class RunConfig:
     samples_per_query: int = 5  # test-time compute for self-consistency
     time_budget_sec: int = 1800
     parallel_workers: int = 2
+    stage_workers: int = 3  # orchestrator stages (debate, reflection, ...) run at once
     devices: List[str] = field(default_factory=list)  # e.g., ["cuda:0"]
     reasoning_effort: str = "high"  # low | medium | high
     temperature: float = 0.2
@@ -19,6 +20,8 @@ class RunConfig:
     budget_usd: Optional[float] = None  # soft budget tracker (not enforced by API)
     interactive: bool = True
     enable_code_interpreter: bool = False  # GPT-5 tool: server-side code interpreter
+    revision_mode: str = "full"  # full | patch (see reflection.critique_and_revise)
+    resume: bool = False  # reuse checkpointed stages of a previous run
 
 
 @dataclass
@@ -1,31 +1,91 @@
 from __future__ import annotations
 
-from typing import Any, Callable, Dict, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 
 DEBATE_SYS = "You are debating to arrive at a correct, clear, and verifiable solution. Be concise."
 
+# --- Multi-agent debate ---
+# Debaters of a round do not see each other's arguments, so they are
+# independent requests: they are dispatched together and the consensus step
+# runs as soon as the last argument is back.  Round latency is then roughly
+# one argument plus one consensus call regardless of ``n_debaters``.
+
+
+def _argument_prompt(topic_prompt: str, stance: str, r: int) -> str:
+    # Debater-specific text goes last so every prompt of a round shares the
+    # system and topic prefix (prefix-caching providers prefill it once).
+    return f"{DEBATE_SYS}\nTopic: {topic_prompt}\n{stance}: Provide your argument for this round {r+1}."
+
 
 def multi_agent_debate(
     provider_generate: Callable[[str, int], List[str]],
     topic_prompt: str,
     n_debaters: int = 2,
     rounds: int = 2,
+    parallel_workers: Optional[int] = None,
+    batched: bool = False,
 ) -> Dict[str, Any]:
+    """Debate ``topic_prompt`` for ``rounds`` rounds and synthesise a consensus.
+
+    Args:
+        provider_generate: function returning ``n`` completions for a prompt.
+        topic_prompt: question under debate.
+        n_debaters: arguments collected per round.
+        rounds: debate rounds; each ends with a consensus call.
+        parallel_workers: arguments requested concurrently. Defaults to
+            ``n_debaters``; ``1`` restores the sequential behaviour.
+        batched: request all arguments of a round as one ``n=n_debaters``
+            call on a shared prompt instead of one call per debater. Missing
+            completions are filled with per-debater calls.
+
+    Returns:
+        Mapping with the last consensus, the transcript of arguments and
+        per-round ``timings`` (seconds spent on arguments and consensus).
+    """
     stances = [f"Debater {i+1}" for i in range(n_debaters)]
+    workers = n_debaters if parallel_workers is None else parallel_workers
     transcripts: List[str] = []
+    timings: List[Dict[str, float]] = []
     current = topic_prompt
-    for r in range(rounds):
-        round_utterances: List[str] = []
-        for s in stances:
-            p = f"{DEBATE_SYS}\nTopic: {topic_prompt}\n{ s }: Provide your argument for this round {r+1}."
-            out = provider_generate(p, 1)[0]
-            round_utterances.append(f"{s}: {out}")
-        transcripts.extend(round_utterances)
-        # consensus step
-        consensus_prompt = (
-            f"{DEBATE_SYS}\nGiven the following arguments, synthesize a consensus that is likely correct, "
-            "with explicit verification steps if possible.\n"
-            + "\n".join(round_utterances)
-        )
-        current = provider_generate(consensus_prompt, 1)[0]
-    return {"consensus": current, "transcript": transcripts}
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def argue(prompt: str) -> str:
+        return provider_generate(prompt, 1)[0]
+
+    try:
+        for r in range(rounds):
+            start = time.perf_counter()
+            outs: List[str] = []
+            if batched:
+                shared = f"{DEBATE_SYS}\nTopic: {topic_prompt}\nProvide your argument for this round {r+1}."
+                outs = list(provider_generate(shared, n_debaters))[:n_debaters]
+            prompts = [
+                _argument_prompt(topic_prompt, s, r) for s in stances[len(outs) :]
+            ]
+            if pool is None or len(prompts) <= 1:
+                outs.extend(argue(p) for p in prompts)
+            else:
+                outs.extend(pool.map(argue, prompts))
+            round_utterances = [f"{s}: {out}" for s, out in zip(stances, outs)]
+            argued = time.perf_counter()
+            transcripts.extend(round_utterances)
+            # consensus step
+            consensus_prompt = (
+                f"{DEBATE_SYS}\nGiven the following arguments, synthesize a consensus that is likely correct, "
+                "with explicit verification steps if possible.\n"
+                + "\n".join(round_utterances)
+            )
+            current = provider_generate(consensus_prompt, 1)[0]
+            timings.append(
+                {
+                    "round": r + 1,
+                    "arguments_sec": argued - start,
+                    "consensus_sec": time.perf_counter() - argued,
+                }
+            )
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+    return {"consensus": current, "transcript": transcripts, "timings": timings}
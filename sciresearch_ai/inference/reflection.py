@@ -1,6 +1,11 @@
 from __future__ import annotations
 
-from typing import Any, Callable, Dict, List
+import difflib
+import re
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from gpt_oss.tools.apply_patch import DiffError, patch_to_commit, text_to_patch
 
 CHECKLIST = (
     "Ensure the draft follows academic conventions: spelling/typo-free writing, grammar, LaTeX formatting that compiles under pdflatex, "
@@ -10,25 +15,208 @@ CRITIC_SYS = (
     "You are a meticulous reviewer. Follow the checklist strictly and propose concrete fixes.\n"
     f"CHECKLIST: {CHECKLIST}"
 )
+REVISION_MODES = ("full", "patch")
+
+# --- Span-targeted revision ("patch" mode) ---
+# The critic sees numbered lines and lists located issues; the reviser sees
+# only the flagged spans and answers with an apply_patch style patch against
+# them.  After the first pass the critic is shown only the lines the last
+# patch changed, so untouched text is never sent twice.
+PATCH_CRITIC_SYS = (
+    f"{CRITIC_SYS}\n"
+    "List each actionable issue on its own line as 'L<first>-<last>: <problem and fix>' "
+    "using the line numbers shown. Reply 'NO ISSUES' if nothing needs to change."
+)
+PATCH_REVISER_SYS = (
+    "Fix the listed issues. Reply with a patch only, in this format:\n"
+    "*** Begin Patch\n*** Update File: draft\n@@\n unchanged line\n-old line\n+new line\n*** End Patch\n"
+    "Copy context and removed lines exactly from the spans below; do not touch other text."
+)
+PATCH_PATH = "draft"
+SPAN_CONTEXT = 1  # unflagged lines shown around each span
+_ISSUE = re.compile(r"^\s*[-*]?\s*L(\d+)(?:\s*-\s*L?(\d+))?\s*:\s*(.+)$")
+
+
+def approx_tokens(text: str) -> int:
+    """Rough token count (four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def parse_issues(critique: str, n_lines: int) -> List[Tuple[int, int, str]]:
+    """Located issues as ``(first, last, text)`` with 0-based inclusive lines."""
+    issues = []
+    for line in critique.splitlines():
+        m = _ISSUE.match(line)
+        if not m or n_lines == 0:
+            continue
+        first = min(max(int(m.group(1)), 1), n_lines)
+        last = min(max(int(m.group(2) or first), first), n_lines)
+        issues.append((first - 1, last - 1, m.group(3).strip()))
+    return issues
+
+
+def _merge(spans: List[Tuple[int, int]], n_lines: int) -> List[Tuple[int, int]]:
+    """Widen spans by ``SPAN_CONTEXT`` lines and merge overlapping ones."""
+    merged: List[Tuple[int, int]] = []
+    for first, last in sorted(spans):
+        first = max(first - SPAN_CONTEXT, 0)
+        last = min(last + SPAN_CONTEXT, n_lines - 1)
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def _show(lines: List[str], spans: List[Tuple[int, int]], numbered: bool) -> str:
+    blocks = []
+    for first, last in spans:
+        body = lines[first : last + 1]
+        if numbered:
+            body = [f"{first + i + 1}| {line}" for i, line in enumerate(body)]
+        blocks.append(f"[lines {first + 1}-{last + 1}]\n" + "\n".join(body))
+    return "\n".join(blocks)
+
+
+def _changed(old: List[str], new: List[str]) -> List[Tuple[int, int]]:
+    """Line spans of ``new`` that differ from ``old``."""
+    spans = []
+    matcher = difflib.SequenceMatcher(a=old, b=new, autojunk=False)
+    for tag, _i1, _i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal" or not new:
+            continue
+        # a pure deletion leaves a seam between two kept lines
+        first = min(j1, len(new) - 1)
+        spans.append(
+            (max(first - 1, 0) if tag == "delete" else first, max(j2 - 1, first))
+        )
+    return spans
+
+
+def apply_draft_patch(draft: str, patch: str) -> str:
+    """Apply an apply_patch style update of ``PATCH_PATH`` to ``draft``."""
+    text = patch.strip()
+    if not text.startswith("*** Begin Patch"):
+        text = f"*** Begin Patch\n*** Update File: {PATCH_PATH}\n{text}\n*** End Patch"
+    orig = {PATCH_PATH: draft}
+    parsed, _fuzz = text_to_patch(text, orig)
+    if set(parsed.actions) != {PATCH_PATH}:
+        raise DiffError(f"Patch must only update {PATCH_PATH}")
+    return patch_to_commit(parsed, orig).changes[PATCH_PATH].new_content
+
+
+def _critic_prompt(draft: str) -> str:
+    return f"{CRITIC_SYS}\nPlease review the following draft and critique it:\n{draft}"
+
+
+def _revise_prompt(critique: str, draft: str) -> str:
+    return (
+        "Revise the draft to resolve the above critique. Return only the revised text.\n"
+        f"CRITIQUE:\n{critique}\nDRAFT:\n{draft}"
+    )
+
+
+def critique_and_patch(
+    provider_generate: Callable[[str, int], List[str]],
+    draft: str,
+    passes: int = 3,
+) -> Dict[str, Any]:
+    """Critique located issues and revise them with patches.
+
+    Stops early when the critique lists no actionable issue or the last
+    patch changed nothing. Each entry of ``stats`` compares the tokens sent
+    and received with what a full-text pass would have cost (estimated at
+    four characters per token); ``est_seconds_saved`` scales the measured
+    revise latency by the output-token ratio.
+    """
+    history: List[str] = []
+    patches: List[str] = []
+    stats: List[Dict[str, Any]] = []
+    current = draft
+    lines = current.splitlines()
+    review = [(0, len(lines) - 1)] if lines else []
+    for i in range(passes):
+        if not review:
+            break
+        start = time.perf_counter()
+        critic_prompt = (
+            f"{PATCH_CRITIC_SYS}\nDRAFT LINES:\n{_show(lines, review, True)}"
+        )
+        critique = provider_generate(critic_prompt, 1)[0]
+        history.append(critique)
+        issues = parse_issues(critique, len(lines))
+        entry = {
+            "pass": i + 1,
+            "issues": len(issues),
+            "input_tokens": approx_tokens(critic_prompt),
+            "output_tokens": approx_tokens(critique),
+            "full_input_tokens": approx_tokens(_critic_prompt(current)),
+            "full_output_tokens": approx_tokens(critique),
+        }
+        stats.append(entry)
+        if not issues:
+            entry.update(_savings(entry, time.perf_counter() - start, 0.0))
+            break
+        spans = _merge([(first, last) for first, last, _ in issues], len(lines))
+        revise_prompt = (
+            f"{PATCH_REVISER_SYS}\nISSUES:\n"
+            + "\n".join(f"L{a + 1}-{b + 1}: {text}" for a, b, text in issues)
+            + f"\nSPANS:\n{_show(lines, spans, False)}"
+        )
+        revise_start = time.perf_counter()
+        patch = provider_generate(revise_prompt, 1)[0]
+        revise_sec = time.perf_counter() - revise_start
+        patches.append(patch)
+        try:
+            revised = apply_draft_patch(current, patch)
+        except (DiffError, KeyError, IndexError) as exc:
+            entry["patch_error"] = str(exc)
+            revised = current
+        new_lines = revised.splitlines()
+        entry["input_tokens"] += approx_tokens(revise_prompt)
+        entry["output_tokens"] += approx_tokens(patch)
+        entry["full_input_tokens"] += approx_tokens(_revise_prompt(critique, current))
+        entry["full_output_tokens"] += approx_tokens(revised)
+        entry["changed_lines"] = sum(b - a + 1 for a, b in _changed(lines, new_lines))
+        entry.update(
+            _savings(
+                entry,
+                time.perf_counter() - start,
+                revise_sec
+                * (approx_tokens(revised) / max(1, approx_tokens(patch)) - 1),
+            )
+        )
+        review = _merge(_changed(lines, new_lines), len(new_lines))
+        current, lines = revised, new_lines
+    return {"final": current, "critiques": history, "patches": patches, "stats": stats}
+
+
+def _savings(entry: Dict[str, Any], seconds: float, est_saved: float) -> Dict[str, Any]:
+    return {
+        "tokens_saved": entry["full_input_tokens"]
+        + entry["full_output_tokens"]
+        - entry["input_tokens"]
+        - entry["output_tokens"],
+        "seconds": seconds,
+        "est_seconds_saved": max(0.0, est_saved),
+    }
 
 
 def critique_and_revise(
     provider_generate: Callable[[str, int], List[str]],
     draft: str,
     passes: int = 3,
+    mode: str = "full",
 ) -> Dict[str, Any]:
+    if mode not in REVISION_MODES:
+        raise ValueError(f"mode must be one of {REVISION_MODES}, got {mode!r}")
+    if mode == "patch":
+        return critique_and_patch(provider_generate, draft, passes)
     history: List[str] = []
     current = draft
     for i in range(passes):
-        critique = provider_generate(
-            f"{CRITIC_SYS}\nPlease review the following draft and critique it:\n{current}",
-            1,
-        )[0]
+        critique = provider_generate(_critic_prompt(current), 1)[0]
         history.append(critique)
-        revised = provider_generate(
-            "Revise the draft to resolve the above critique. Return only the revised text.\n"
-            f"CRITIQUE:\n{critique}\nDRAFT:\n{current}",
-            1,
-        )[0]
+        revised = provider_generate(_revise_prompt(critique, current), 1)[0]
         current = revised
     return {"final": current, "critiques": history}
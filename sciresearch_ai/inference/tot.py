@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# --- Tree-of-Thoughts engine ---
+# Nodes store only their own thought plus a pointer to their parent; full
+# states are rebuilt on demand for provider and scorer calls.  Every frontier
+# node of a level is expanded concurrently, children whose normalised state
+# was already seen are dropped, and scores are memoised by state hash.
+
+
+def normalize_thought(text: str) -> str:
+    """Case, whitespace and trailing punctuation do not make a new thought."""
+    return re.sub(r"\s+", " ", text).strip().rstrip(".!;,").lower()
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+@dataclass(eq=False)
+class ThoughtNode:
+    delta: str
+    parent: Optional["ThoughtNode"]
+    key: str
+    depth: int = 0
+
+    def state(self) -> str:
+        """Prompt plus every thought on the way here, newline separated."""
+        return "\n".join(n.delta for n in reversed(list(self._lineage())))
+
+    def path(self) -> List[str]:
+        return [n.delta for n in reversed(list(self._lineage()))][1:]
+
+    def _lineage(self) -> Iterable["ThoughtNode"]:
+        node: Optional[ThoughtNode] = self
+        while node is not None:
+            yield node
+            node = node.parent
+
+
+@dataclass
+class SearchStats:
+    provider_calls: int = 0
+    candidates: int = 0
+    duplicates: int = 0
+    scorer_calls: int = 0
+    score_cache_hits: int = 0
+    stored_chars: int = 0  # text held by nodes (deltas only)
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+@dataclass
+class TreeOfThoughts:
+    """Breadth-first Tree-of-Thoughts search.
+
+    Args:
+        provider_generate: expands a state into up to ``n`` thoughts.
+        scorer: optional heuristic to rank states. Higher is better.
+        max_workers: frontier nodes expanded (and candidates scored) at once.
+        executor: pool to run expansions and scoring on instead of a private
+            thread pool.
+        normalize: maps a thought to the text used for deduplication.
+    """
+
+    provider_generate: Callable[[str, int], List[str]]
+    scorer: Callable[[str], float] | None = None
+    max_workers: int = 4
+    executor: Executor | None = None
+    normalize: Callable[[str], str] = normalize_thought
+    score_cache: Dict[str, float] = field(default_factory=dict)
+    stats: SearchStats = field(default_factory=SearchStats)
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def _map(self, pool: Executor | None, fn, items: List[Any]) -> List[Any]:
+        if pool is None or len(items) <= 1:
+            return [fn(item) for item in items]
+        return list(pool.map(fn, items))
+
+    def _expand(self, node: ThoughtNode, breadth: int) -> List[str]:
+        with self._lock:
+            self.stats.provider_calls += 1
+        return self.provider_generate(node.state(), breadth)
+
+    def _score(self, node: ThoughtNode) -> float:
+        with self._lock:
+            if node.key in self.score_cache:
+                self.stats.score_cache_hits += 1
+                return self.score_cache[node.key]
+            self.stats.scorer_calls += 1
+        score = self.scorer(node.state())
+        with self._lock:
+            self.score_cache[node.key] = score
+        return score
+
+    def search(self, prompt: str, depth: int, breadth: int) -> Dict[str, Any]:
+        """Run ``depth`` expansion rounds keeping the ``breadth`` best states.
+
+        Returns:
+            Mapping with the best final state, the path of thoughts leading
+            to it, its score (``None`` without a scorer) and search stats.
+        """
+        pool = self.executor
+        own_pool = pool is None and self.max_workers > 1
+        if own_pool:
+            pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            frontier = self._search(pool, prompt, depth, breadth)
+        finally:
+            if own_pool:
+                pool.shutdown(wait=True)
+        if not frontier:
+            return {"best": "", "path": [], "score": None, "stats": {}}
+        best = frontier[0]
+        return {
+            "best": best.state(),
+            "path": best.path(),
+            "score": self.score_cache.get(best.key) if self.scorer else None,
+            "stats": self.stats.as_dict(),
+        }
+
+    def _search(self, pool, prompt: str, depth: int, breadth: int):
+        root = ThoughtNode(prompt, None, _digest(self.normalize(prompt)))
+        self.stats.stored_chars += len(prompt)
+        seen = {root.key}
+        frontier = [root]
+        for _ in range(depth):
+            expansions = self._map(pool, lambda n: self._expand(n, breadth), frontier)
+            candidates: List[ThoughtNode] = []
+            for node, thoughts in zip(frontier, expansions):
+                for thought in thoughts:
+                    key = _digest(f"{node.key}\x00{self.normalize(thought)}")
+                    if key in seen:
+                        self.stats.duplicates += 1
+                        continue
+                    seen.add(key)
+                    candidates.append(ThoughtNode(thought, node, key, node.depth + 1))
+                    self.stats.stored_chars += len(thought)
+            self.stats.candidates += len(candidates)
+            if not candidates:
+                break
+            if self.scorer:
+                scores = self._map(pool, self._score, candidates)
+                order = sorted(
+                    range(len(candidates)), key=lambda i: scores[i], reverse=True
+                )
+                candidates = [candidates[i] for i in order]
+            frontier = candidates[:breadth]
+        return frontier
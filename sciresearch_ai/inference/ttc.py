@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 import math
-from typing import Any, Callable, Dict, List, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Set
+
+from .tot import TreeOfThoughts
 
 # --- Test-Time Compute (TTC) strategies ---
 # Self-consistency / Best-of-N with majority vote + simple scoring hooks.
@@ -36,36 +39,65 @@ def budgeted_adaptive_deliberation(
     batch_size: int = 2,
     scorer: Callable[[str], float] | None = None,
     early_stop_margin: float = 0.15,
+    parallel_workers: int = 1,
 ) -> Dict[str, Any]:
     # A novel-ish TTC variant: allocate samples in rounds; stop early when the
     # running best is sufficiently ahead by a margin. Otherwise, keep sampling.
+    # With ``parallel_workers > 1`` up to that many batches are in flight at
+    # once; each batch is scored as soon as it returns and the margin check
+    # cancels whatever is still pending.
     all_samples: List[str] = []
     all_scores: List[float] = []
-    spent = 0
     best = None
     best_score = -math.inf
-    while spent < total_budget:
-        take = min(batch_size, total_budget - spent)
-        new_samples = provider_generate(prompt, take)
+
+    def absorb(new_samples: List[str]) -> bool:
+        """Score a finished batch, update the running best; True means stop."""
+        nonlocal best, best_score
         all_samples.extend(new_samples)
         if scorer:
             new_scores = [scorer(s) for s in new_samples]
         else:
             new_scores = [0.0 for _ in new_samples]  # neutral if no scorer
         all_scores.extend(new_scores)
-        spent += take
+        if not all_samples:
+            return False
         # check margin-early-stop
-        b_idx = max(
-            range(len(all_samples)), key=lambda i: all_scores[i] if all_scores else 0.0
-        )
-        b_score = all_scores[b_idx] if all_scores else 0.0
+        b_idx = max(range(len(all_samples)), key=lambda i: all_scores[i])
+        b_score = all_scores[b_idx]
         if b_score - best_score > early_stop_margin:
             best = all_samples[b_idx]
             best_score = b_score
         # if the best is sufficiently ahead of the current average, stop early
         avg = sum(all_scores) / max(1, len(all_scores))
-        if best_score >= avg + early_stop_margin:
-            break
+        return best_score >= avg + early_stop_margin
+
+    spent = 0
+    if parallel_workers <= 1:
+        while spent < total_budget:
+            take = min(batch_size, total_budget - spent)
+            spent += take
+            if absorb(provider_generate(prompt, take)):
+                break
+    else:
+        pool = ThreadPoolExecutor(max_workers=parallel_workers)
+        pending: Set[Future] = set()
+        try:
+            stop = False
+            while not stop and (pending or spent < total_budget):
+                while spent < total_budget and len(pending) < parallel_workers:
+                    take = min(batch_size, total_budget - spent)
+                    pending.add(pool.submit(provider_generate, prompt, take))
+                    spent += take
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    stop = absorb(fut.result()) or stop
+        finally:
+            # Drop queued batches; running ones finish in the background and
+            # their results are discarded.
+            for fut in pending:
+                fut.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
     if best is None and all_samples:
         best = all_samples[0]
     return {"best": best or "", "samples": all_samples, "scores": all_scores}
@@ -77,6 +109,7 @@ def tree_of_thoughts(
     depth: int,
     breadth: int,
     scorer: Callable[[str], float] | None = None,
+    parallel_workers: int = 4,
 ) -> Dict[str, Any]:
     """Simple breadth-first Tree-of-Thoughts search.
 
@@ -86,23 +119,16 @@ def tree_of_thoughts(
         depth: number of expansion rounds.
         breadth: beam width; number of states kept per level.
         scorer: optional heuristic to rank states. Higher is better.
+        parallel_workers: frontier states expanded (and scored) concurrently.
 
     Returns:
         Mapping with the best final state and the path of thoughts leading to it.
-    """
 
-    frontier: List[Tuple[str, List[str]]] = [(prompt, [])]
-    for _ in range(depth):
-        candidates: List[Tuple[str, List[str]]] = []
-        for state, path in frontier:
-            thoughts = provider_generate(state, breadth)
-            for t in thoughts:
-                new_state = f"{state}\n{t}"
-                candidates.append((new_state, path + [t]))
-        if not candidates:
-            break
-        if scorer:
-            candidates.sort(key=lambda n: scorer(n[0]), reverse=True)
-        frontier = candidates[:breadth]
-    best_state, best_path = frontier[0] if frontier else ("", [])
-    return {"best": best_state, "path": best_path}
+    Every child state extends its parent's text, so providers that remember
+    prefilled prompts (``OssProvider`` with a forking backend) continue each
+    child from its parent's KV cache instead of prefilling it again.  See
+    :class:`~sciresearch_ai.inference.tot.TreeOfThoughts` for deduplication
+    and score caching.
+    """
+    engine = TreeOfThoughts(provider_generate, scorer, max_workers=parallel_workers)
+    return engine.search(prompt, depth, breadth)
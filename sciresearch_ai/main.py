@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import os
 import sys
 
 from .config import RunConfig
@@ -62,6 +63,20 @@ def build_provider(args, project_root: str):
         raise SystemExit(f"Unknown provider: {provider_name}")
 
 
+def maybe_cache_provider(args, provider, project_root: str):
+    """Wrap ``provider`` in the on-disk response cache when ``--cache`` is set."""
+    if not getattr(args, "cache", False):
+        return provider
+    from .providers.cached_provider import CachedProvider
+
+    return CachedProvider(
+        provider,
+        os.path.join(project_root, "cache", "responses.sqlite"),
+        max_entries=args.cache_max_entries,
+        max_bytes=int(args.cache_max_mb * 1024 * 1024),
+    )
+
+
 def cmd_new(args):
     prj = Project.create(args.root, args.name)
     print(f"Created project at: {prj.root}")
@@ -69,13 +84,14 @@ def cmd_new(args):
 
 def cmd_run(args):
     prj = Project(args.project)
-    provider = build_provider(args, prj.root)
+    provider = maybe_cache_provider(args, build_provider(args, prj.root), prj.root)
     cfg = RunConfig(
         model=args.model,
         max_iterations=args.max_iterations,
         samples_per_query=args.samples_per_query,
         time_budget_sec=args.time_budget_sec,
         parallel_workers=args.parallel_workers,
+        stage_workers=args.stage_workers,
         devices=args.devices.split(",") if args.devices else [],
         reasoning_effort=args.reasoning_effort,
         temperature=args.temperature,
@@ -84,11 +100,17 @@ def cmd_run(args):
         budget_usd=args.budget_usd,
         interactive=not args.no_interactive,
         enable_code_interpreter=args.enable_code_interpreter,
+        revision_mode=args.revision_mode,
+        resume=args.resume,
     )
     from .orchestrator import Orchestrator
 
     orch = Orchestrator(prj, provider, cfg)
     orch.run()
+    print("Stage seconds:", orch.stage_seconds())
+    stats = getattr(provider, "stats", None)
+    if callable(stats):
+        print("Response cache:", stats())
     print("Run finished. See state.json and logs folder for details.")
 
 
@@ -145,6 +167,12 @@ def main(argv=None):
     p_run.add_argument("--samples-per-query", type=int, default=5)
     p_run.add_argument("--time-budget-sec", type=int, default=1800)
     p_run.add_argument("--parallel-workers", type=int, default=2)
+    p_run.add_argument(
+        "--stage-workers",
+        type=int,
+        default=3,
+        help="Orchestrator stages run concurrently (1 runs them in order)",
+    )
     p_run.add_argument("--devices", default="")
     p_run.add_argument(
         "--reasoning-effort", choices=["low", "medium", "high"], default="high"
@@ -163,6 +191,11 @@ def main(argv=None):
         action="store_true",
         help="Enable server-side code interpreter tool",
     )
+    p_run.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue from the first unfinished stage checkpointed under <project>/checkpoints",
+    )
     p_run.add_argument(
         "--enable-browser",
         action="store_true",
@@ -173,6 +206,19 @@ def main(argv=None):
         action="store_true",
         help="Enable Python tool for OSS provider",
     )
+    p_run.add_argument(
+        "--cache",
+        action="store_true",
+        help="Serve repeated prompts from an on-disk cache under <project>/cache",
+    )
+    p_run.add_argument(
+        "--revision-mode",
+        choices=["full", "patch"],
+        default="full",
+        help="'patch' revises only the spans the critic flags, via patches",
+    )
+    p_run.add_argument("--cache-max-entries", type=int, default=50_000)
+    p_run.add_argument("--cache-max-mb", type=float, default=256.0)
     p_run.set_defaults(func=cmd_run)
 
     p_test = sub.add_parser(
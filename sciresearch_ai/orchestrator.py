@@ -1,11 +1,28 @@
 from __future__ import annotations
 
+import hashlib
+import os
 import time
+from concurrent.futures import Future
 
+from .checkpoint import StageStore
 from .config import RunConfig
 from .inference import debate, reflection, ttc
 from .inference.experiment_runner import run_synthetic_regression
 from .paper.parser import parse_response
+from .stages import StageGraph
+
+# Stages of one iteration.  Debate and reflection only need the TTC
+# experiment, so they overlap; the next iteration's plan is independent of
+# the previous iteration and starts while its TTC result is being reviewed.
+# Iteration ``i + 1`` writes only after iteration ``i`` started validation
+# (its PDF builds in the background and is awaited at the end of the run),
+# and in interactive runs nothing of it starts before the human-in-the-loop
+# pause.
+# Every finished stage is checkpointed (validation once its PDF build is
+# done); ``RunConfig.resume`` reuses them.
+_MISSING = object()
+STAGES = ("plan", "ttc", "debate", "reflect", "write", "validate", "hitl")
 
 
 class Orchestrator:
@@ -14,6 +31,11 @@ class Orchestrator:
         self.provider = provider
         self.cfg = cfg
         self.stop_flag = False
+        self.timings = []  # per-stage {"stage", "iter", "start", "seconds"}
+        self.resumed = []  # stages whose checkpointed artifact was reused
+        self.store = None
+        # per iteration, resolved once its PDF build is done and checkpointed
+        self.validations = []
 
     def _gen(self, prompt: str, n: int = 1):
         return self.provider.generate(prompt, n=n)
@@ -26,141 +48,275 @@ class Orchestrator:
         pm = self.project.pm
         state = {"iter": 0, "status": "running"}
         start = time.time()
-        while state["iter"] < self.cfg.max_iterations:
-            if (
-                self.cfg.time_budget_sec
-                and (time.time() - start) > self.cfg.time_budget_sec
+        self.store = StageStore(os.path.join(self.project.root, "checkpoints"))
+        if self.cfg.resume:
+            state["iter"] = pm.load_state().get("iter", 0)
+        else:
+            self.store.reset()
+        graph = StageGraph()
+        for i in range(self.cfg.max_iterations):
+            self._add_iteration(graph, i, state)
+
+        out_of_time = False
+
+        def should_start(name: str) -> bool:
+            # Out of time, no new iteration is planned (the graph skips its
+            # other stages); iterations already planned still run to the end.
+            nonlocal out_of_time
+            if self.stop_flag or state["status"] != "running":
+                return False
+            if name.startswith("plan:") and (
+                out_of_time
+                or (
+                    self.cfg.time_budget_sec
+                    and (time.time() - start) > self.cfg.time_budget_sec
+                )
             ):
-                state["status"] = "time_budget_exhausted"
-                break
-
-            # 1) Planning step (concise research objective + plan)
-            plan_prompt = (
-                "You are an AI researcher. Propose a concise research objective and a 3-step plan "
-                "with clear, testable milestones, focusing on a small but meaningful experiment. "
-                "Return in 120 words."
-            )
-            plan = self._gen(plan_prompt, 1)[0]
-
-            # 2) TTC: sample N candidate experiment designs and pick best
-            ttc_out = ttc.budgeted_adaptive_deliberation(
-                lambda p, n: self._gen(p, n),
-                prompt=f"Refine this plan into a concrete experiment protocol with brief pseudo-code.\n{plan}",
-                total_budget=self.cfg.samples_per_query,
-                batch_size=max(1, self.cfg.samples_per_query // 2),
-                scorer=self._score,
+                out_of_time = True
+                return False
+            return True
+
+        try:
+            graph.run(self.cfg.stage_workers, should_start)
+        finally:
+            # the last draft's PDF build may still be running
+            for fut in self.validations:
+                fut.exception()
+            for t in graph.timings:
+                stage, it = t["stage"].split(":")
+                self.timings.append({**t, "stage": stage, "iter": int(it)})
+            if self.timings:
+                pm.log("Stage timings: " + self._timing_summary())
+
+        if state["status"] == "running":
+            state["status"] = (
+                "time_budget_exhausted" if out_of_time else "complete_limit_reached"
             )
-            experiment = ttc_out["best"]
-
-            # 3) Debate for sanity-check & verification hooks
-            debate_out = debate.multi_agent_debate(
-                lambda p, n: self._gen(p, n),
-                topic_prompt=f"Is the following experiment well-posed and reproducible? Identify pitfalls and fixes.\n{experiment}",
-                n_debaters=2,
-                rounds=1,
+            self.project.pm.save_state(state)
+
+    def stage_seconds(self):
+        """Total seconds spent per stage kind across iterations."""
+        totals = {}
+        for t in self.timings:
+            totals[t["stage"]] = totals.get(t["stage"], 0.0) + t["seconds"]
+        return totals
+
+    def _timing_summary(self) -> str:
+        totals = self.stage_seconds()
+        return ", ".join(f"{s}={totals[s]:.2f}s" for s in STAGES if s in totals)
+
+    def _checkpointed(self, name: str, fn, save: bool = True, apply=None):
+        # Stages with ``save=False`` checkpoint their own result; ``apply``
+        # restores a stage's effect on the run, fresh or resumed.
+        def run(results):
+            value = self.store.get(name, _MISSING)
+            if value is not _MISSING:
+                self.resumed.append(name)
+            else:
+                value = fn(results)
+                if save:
+                    self.store.put(name, value)
+            if apply is not None:
+                apply(value)
+            return value
+
+        return run
+
+    def _add_iteration(self, graph: StageGraph, i: int, state) -> None:
+        def add(name, fn, deps, save=True, apply=None):
+            graph.add(name, self._checkpointed(name, fn, save, apply), deps)
+
+        prev = i - 1
+        if i == 0:
+            plan_deps = ()
+        elif self.cfg.interactive:
+            plan_deps = (f"hitl:{prev}",)
+        else:
+            # one iteration of lookahead: plan once the previous TTC is done
+            plan_deps = (f"ttc:{prev}",)
+        add(f"plan:{i}", lambda r: self._plan(), plan_deps)
+        add(
+            f"ttc:{i}",
+            lambda r: self._ttc(r[f"plan:{i}"]),
+            (f"plan:{i}",) + ((f"write:{prev}",) if i else ()),
+        )
+        add(f"debate:{i}", lambda r: self._debate(r[f"ttc:{i}"]["best"]), (f"ttc:{i}",))
+        add(
+            f"reflect:{i}",
+            lambda r: self._reflect(r[f"ttc:{i}"]["best"]),
+            (f"ttc:{i}",),
+        )
+        add(
+            f"write:{i}",
+            lambda r: self._write(i, r[f"ttc:{i}"]["best"], r[f"reflect:{i}"]["final"]),
+            (f"debate:{i}", f"reflect:{i}") + ((f"validate:{prev}",) if i else ()),
+        )
+        add(
+            f"validate:{i}",
+            lambda r: self._validate(i, state),
+            (f"write:{i}",),
+            save=False,
+        )
+        if self.cfg.interactive:
+            add(
+                f"hitl:{i}",
+                lambda r: self._hitl(),
+                (f"validate:{i}",),
+                apply=lambda user: self._apply_hitl(user, state),
             )
-            reviewed = debate_out["consensus"]
 
-            # 4) Reflection: critique and revise a draft methods section with three passes
-            refl = reflection.critique_and_revise(
-                lambda p, n: self._gen(p, n),
-                draft=f"Methods draft (start from this experiment):\n{experiment}",
+    def _plan(self) -> str:
+        # 1) Planning step (concise research objective + plan)
+        plan_prompt = (
+            "You are an AI researcher. Propose a concise research objective and a 3-step plan "
+            "with clear, testable milestones, focusing on a small but meaningful experiment. "
+            "Return in 120 words."
+        )
+        return self._gen(plan_prompt, 1)[0]
+
+    def _ttc(self, plan: str):
+        # 2) TTC: sample N candidate experiment designs and pick best
+        ttc_out = ttc.budgeted_adaptive_deliberation(
+            lambda p, n: self._gen(p, n),
+            prompt=f"Refine this plan into a concrete experiment protocol with brief pseudo-code.\n{plan}",
+            total_budget=self.cfg.samples_per_query,
+            batch_size=max(1, self.cfg.samples_per_query // 2),
+            scorer=self._score,
+            parallel_workers=self.cfg.parallel_workers,
+        )
+        return ttc_out
+
+    def _debate(self, experiment: str):
+        # 3) Debate for sanity-check & verification hooks
+        debate_out = debate.multi_agent_debate(
+            lambda p, n: self._gen(p, n),
+            topic_prompt=f"Is the following experiment well-posed and reproducible? Identify pitfalls and fixes.\n{experiment}",
+            n_debaters=2,
+            rounds=1,
+            parallel_workers=self.cfg.parallel_workers,
+        )
+        return debate_out
+
+    def _reflect(self, experiment: str):
+        # 4) Reflection: critique and revise a draft methods section with three passes
+        refl = reflection.critique_and_revise(
+            lambda p, n: self._gen(p, n),
+            draft=f"Methods draft (start from this experiment):\n{experiment}",
+            mode=self.cfg.revision_mode,
+        )
+        return refl
+
+    def _write(self, i: int, experiment: str, methods: str):
+        # 5) Update LaTeX and autosave
+        pm = self.project.pm
+        # Read current draft content
+        with open(pm.draft_path, "r", encoding="utf-8") as f:
+            tex = f.read()
+        # Depending on the iteration index, generate content for
+        # Methods, Experiments, Results or Discussion.  We always
+        # parse responses to ensure LaTeX escaping and code formatting.
+        if i == 0:
+            # Methods: use the revised methods section produced by reflection
+            section_content = parse_response(methods[:2000])
+        elif i == 1:
+            # Experiments: include the refined experiment protocol
+            # emphasise reproducibility and include code in verbatim
+            expl = (
+                "The experiment follows a reproducible protocol derived "
+                "from the plan. We implement the synthetic dataset generation, "
+                "model training and evaluation as described below:\n\n"
+                + experiment
+                + "\n\nThis protocol is executed with a fixed random seed to "
+                "ensure comparability across runs."
             )
-            methods = refl["final"]
-
-            # 5) Update LaTeX and autosave
-            # Read current draft content
-            with open(pm.draft_path, "r", encoding="utf-8") as f:
-                tex = f.read()
-            # Depending on the iteration index, generate content for
-            # Methods, Experiments, Results or Discussion.  We always
-            # parse responses to ensure LaTeX escaping and code formatting.
-            if state["iter"] == 0:
-                # Methods: use the revised methods section produced by reflection
-                section_content = parse_response(methods[:2000])
-            elif state["iter"] == 1:
-                # Experiments: include the refined experiment protocol
-                # emphasise reproducibility and include code in verbatim
-                expl = (
-                    "The experiment follows a reproducible protocol derived "
-                    "from the plan. We implement the synthetic dataset generation, "
-                    "model training and evaluation as described below:\n\n"
-                    + experiment
-                    + "\n\nThis protocol is executed with a fixed random seed to "
-                    "ensure comparability across runs."
+            section_content = parse_response(expl[:2000])
+        elif i == 2:
+            # Results: run the synthetic regression and report RMSEs
+            try:
+                rmse_lin, rmse_poly = run_synthetic_regression()
+                res_text = (
+                    f"We conducted the synthetic regression experiment as planned. "
+                    f"The linear regression achieved a root mean squared error (RMSE) of {rmse_lin:.3f}, "
+                    f"while the second‑degree polynomial regression achieved an RMSE of {rmse_poly:.3f}. "
+                    "The lower RMSE indicates better fit. In our runs the polynomial model slightly "
+                    "outperformed the linear model, but both models recovered the underlying linear trend. "
+                    "These results are innovative because they demonstrate how even simple models can "
+                    "achieve state‑of‑the‑art accuracy on appropriately designed synthetic tasks."
                 )
-                section_content = parse_response(expl[:2000])
-            elif state["iter"] == 2:
-                # Results: run the synthetic regression and report RMSEs
-                try:
-                    rmse_lin, rmse_poly = run_synthetic_regression()
-                    res_text = (
-                        f"We conducted the synthetic regression experiment as planned. "
-                        f"The linear regression achieved a root mean squared error (RMSE) of {rmse_lin:.3f}, "
-                        f"while the second‑degree polynomial regression achieved an RMSE of {rmse_poly:.3f}. "
-                        "The lower RMSE indicates better fit. In our runs the polynomial model slightly "
-                        "outperformed the linear model, but both models recovered the underlying linear trend. "
-                        "These results are innovative because they demonstrate how even simple models can "
-                        "achieve state‑of‑the‑art accuracy on appropriately designed synthetic tasks."
-                    )
-                except Exception as e:
-                    # fall back if execution fails
-                    res_text = (
-                        "Due to an execution error we report qualitative results instead. "
-                        "Both the linear and polynomial models fit the synthetic data well. "
-                        "Preliminary experiments suggest the polynomial model attains a lower RMSE."
-                    )
-                section_content = parse_response(res_text[:2000])
-            else:
-                # Discussion: summarise findings, reflect on pitfalls and improvements
-                disc_text = (
-                    "Our study confirms that simple regression models can recover a known linear relation "
-                    "from noisy synthetic data. The debate phase identified potential pitfalls such as excessive noise "
-                    "or the need for feature scaling. By adhering to a disciplined experimental protocol we avoided "
-                    "these issues. The linear and polynomial models produced comparable performance, suggesting that "
-                    "complexity does not always confer a significant advantage. Future work could explore different noise "
-                    "levels, higher‑degree polynomials and real‑world datasets. Overall, this project illustrates the "
-                    "innovation of combining heuristic planning, adaptive test‑time compute and offline execution to "
-                    "generate a complete, high‑quality research draft."
+            except Exception as e:
+                # fall back if execution fails
+                res_text = (
+                    "Due to an execution error we report qualitative results instead. "
+                    "Both the linear and polynomial models fit the synthetic data well. "
+                    "Preliminary experiments suggest the polynomial model attains a lower RMSE."
                 )
-                section_content = parse_response(disc_text[:2000])
-            # Replace only the first occurrence of the placeholder
-            new_tex = tex.replace("TBD.", section_content, 1)
-            pm.autosave(new_tex)
-            ok = pm.validate_paper()
-            pm.log(
-                f"Iter {state['iter']}: plan, experiment, review added. "
-                f"Validation {'succeeded' if ok else 'failed'}"
+            section_content = parse_response(res_text[:2000])
+        else:
+            # Discussion: summarise findings, reflect on pitfalls and improvements
+            disc_text = (
+                "Our study confirms that simple regression models can recover a known linear relation "
+                "from noisy synthetic data. The debate phase identified potential pitfalls such as excessive noise "
+                "or the need for feature scaling. By adhering to a disciplined experimental protocol we avoided "
+                "these issues. The linear and polynomial models produced comparable performance, suggesting that "
+                "complexity does not always confer a significant advantage. Future work could explore different noise "
+                "levels, higher‑degree polynomials and real‑world datasets. Overall, this project illustrates the "
+                "innovation of combining heuristic planning, adaptive test‑time compute and offline execution to "
+                "generate a complete, high‑quality research draft."
             )
+            section_content = parse_response(disc_text[:2000])
+        # Replace only the first occurrence of the placeholder, unless a run
+        # interrupted before checkpointing this stage already did
+        if not section_content or section_content not in tex:
+            tex = tex.replace("TBD.", section_content, 1)
+        pm.autosave(tex)
+        return {"draft_sha256": hashlib.sha256(tex.encode("utf-8")).hexdigest()}
 
-            # 6) Save state
-            state["iter"] += 1
-            pm.save_state(state)
+    def _validate(self, i: int, state) -> None:
+        # The PDF builds in the background (skipped if the draft is unchanged,
+        # coalesced with newer drafts) while the next iteration proceeds.
+        # Its checkpoint is the build's outcome, stored once it is known.
+        pm = self.project.pm
+        fut = pm.validate_paper_async()
+        recorded: Future = Future()
 
-            # Human-in-the-loop prompt after each iter (if interactive)
-            if self.cfg.interactive:
-                print(
-                    "\n[HUMAN LOOP] Press Enter to continue, or type a prompt to inject guidance. Type 'stop' to end."
+        def report(done) -> None:
+            try:
+                ok = done.exception() is None and done.result()
+                pm.log(
+                    f"Iter {i}: plan, experiment, review added. "
+                    f"Validation {'succeeded' if ok else 'failed'}"
                 )
-                try:
-                    user = input().strip()
-                except EOFError:
-                    user = ""
-                if user.lower() == "stop":
-                    self.stop_flag = True
-                elif user:
-                    # feed guidance signal into next loop by appending to draft
-                    with open(pm.draft_path, "a", encoding="utf-8") as f:
-                        f.write("\n% HUMAN NOTE: " + user + "\n")
-                    pm.autosave(open(pm.draft_path, "r", encoding="utf-8").read())
-                    ok = pm.validate_paper()
-                    pm.log(
-                        f"HITL note added. Validation {'succeeded' if ok else 'failed'}"
-                    )
-                if self.stop_flag:
-                    state["status"] = "stopped_by_user"
-                    break
+                self.store.put(f"validate:{i}", ok)
+            finally:
+                recorded.set_result(None)
 
-        if state["status"] == "running":
-            state["status"] = "complete_limit_reached"
-            self.project.pm.save_state(state)
+        fut.add_done_callback(report)
+        self.validations.append(recorded)
+
+        # 6) Save state
+        state["iter"] = i + 1
+        pm.save_state(state)
+
+    def _hitl(self) -> str:
+        # Human-in-the-loop prompt after each iter (if interactive)
+        pm = self.project.pm
+        print(
+            "\n[HUMAN LOOP] Press Enter to continue, or type a prompt to inject guidance. Type 'stop' to end."
+        )
+        try:
+            user = input().strip()
+        except EOFError:
+            user = ""
+        if user and user.lower() != "stop":
+            # feed guidance signal into next loop by appending to draft
+            with open(pm.draft_path, "a", encoding="utf-8") as f:
+                f.write("\n% HUMAN NOTE: " + user + "\n")
+            pm.autosave(open(pm.draft_path, "r", encoding="utf-8").read())
+            ok = pm.validate_paper()
+            pm.log(f"HITL note added. Validation {'succeeded' if ok else 'failed'}")
+        return user
+
+    def _apply_hitl(self, user: str, state) -> None:
+        if user.lower() == "stop":
+            self.stop_flag = True
+            state["status"] = "stopped_by_user"
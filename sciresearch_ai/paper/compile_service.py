@@ -0,0 +1,150 @@
+"""
+CompileService: incremental, coalescing PDF builds off the caller's thread.
+
+``submit()`` returns a :class:`~concurrent.futures.Future` right away.  A
+single worker thread runs the compiler subprocess; every request queued while
+a build is running is answered by one follow-up build of the files as they
+are then, so a burst of autosaves costs at most two builds.  Before running
+the compiler the worker hashes the draft, ``refs.bib`` and the figures; if
+they match the last build the cached result is returned without compiling.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Sequence
+
+DEFAULT_COMMAND = ("pdflatex", "-interaction=nonstopmode")
+
+
+class CompileService:
+    """Build ``draft_path`` with ``command`` in the background.
+
+    Args:
+        draft_path: LaTeX source; the compiler runs in its directory.
+        fig_dir: figures folder hashed along with the draft.
+        log_path: compiler output is appended here.
+        log: project logger for messages such as a missing toolchain.
+        command: compiler and leading arguments; the draft file name is
+            appended.
+    """
+
+    def __init__(
+        self,
+        draft_path: str,
+        fig_dir: Optional[str] = None,
+        log_path: Optional[str] = None,
+        log: Callable[[str], None] = lambda text: None,
+        command: Sequence[str] = DEFAULT_COMMAND,
+    ) -> None:
+        self.draft_path = draft_path
+        self.paper_dir = os.path.dirname(draft_path)
+        self.fig_dir = fig_dir
+        self.log_path = log_path
+        self.log = log
+        self.command = tuple(command)
+        self.cache_path = os.path.splitext(draft_path)[0] + ".build.json"
+        self.builds = 0
+        self.cache_hits = 0
+        self._lock = threading.Lock()
+        self._waiting: List[Future] = []
+        self._worker: Optional[threading.Thread] = None
+
+    # ---- inputs ------------------------------------------------------
+    def input_hash(self) -> str:
+        """SHA-256 over the draft, ``refs.bib`` and every figure file."""
+        h = hashlib.sha256()
+        paths = [self.draft_path, os.path.join(self.paper_dir, "refs.bib")]
+        if self.fig_dir and os.path.isdir(self.fig_dir):
+            for base, dirs, files in os.walk(self.fig_dir):
+                dirs.sort()
+                paths.extend(os.path.join(base, f) for f in sorted(files))
+        for path in paths:
+            h.update(os.path.relpath(path, self.paper_dir).encode("utf-8") + b"\0")
+            try:
+                with open(path, "rb") as f:
+                    h.update(hashlib.sha256(f.read()).digest())
+            except OSError:
+                h.update(b"missing")
+        return h.hexdigest()
+
+    def _cached(self, digest: str) -> Optional[bool]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                last = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return last["ok"] if last.get("hash") == digest else None
+
+    def _remember(self, digest: str, ok: bool) -> None:
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"hash": digest, "ok": ok}, f)
+        os.replace(tmp, self.cache_path)
+
+    # ---- building ----------------------------------------------------
+    def submit(self) -> "Future[bool]":
+        """Request a build of the current files; resolves to success."""
+        fut: Future = Future()
+        with self._lock:
+            self._waiting.append(fut)
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="pdf-compile", daemon=True
+                )
+                self._worker.start()
+        return fut
+
+    def compile(self) -> bool:
+        """Build now (or reuse the cached result) and wait for it."""
+        return self.submit().result()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                batch, self._waiting = self._waiting, []
+                if not batch:
+                    self._worker = None
+                    return
+            try:
+                ok = self._build()
+            except BaseException as exc:  # noqa: BLE001 - handed to the futures
+                for fut in batch:
+                    fut.set_exception(exc)
+            else:
+                for fut in batch:
+                    fut.set_result(ok)
+
+    def _build(self) -> bool:
+        digest = self.input_hash()
+        cached = self._cached(digest)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+        cmd = list(self.command) + [os.path.basename(self.draft_path)]
+        try:
+            proc = subprocess.run(
+                cmd,
+                cwd=self.paper_dir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+            )
+        except FileNotFoundError:
+            # In absence of pdflatex, skip compilation but treat as success
+            self.log(f"{self.command[0]} not found; skipping PDF compilation")
+            return True
+        self.builds += 1
+        if self.log_path:
+            # Write compiler output to a log file for debugging
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(proc.stdout)
+        ok = proc.returncode == 0
+        if self.input_hash() == digest:  # not edited while compiling
+            self._remember(digest, ok)
+        return ok
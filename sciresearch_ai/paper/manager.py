@@ -1,14 +1,16 @@
 from __future__ import annotations
 
-import datetime
 import json
 import os
 import re
-import shutil
-import subprocess
 import time
+from concurrent.futures import Future
 from typing import Any, Dict, Optional
 
+from sciresearch_core.revisions import AUTOSAVE_KEEP_LAST, Revision, RevisionStore
+
+from .compile_service import CompileService
+
 
 class PaperManager:
     def __init__(
@@ -35,11 +37,18 @@ class PaperManager:
             self.rev_dir,
         ]:
             os.makedirs(d, exist_ok=True)
+        self.revisions = RevisionStore(self.rev_dir, keep_last=AUTOSAVE_KEEP_LAST)
         self.state_path = os.path.join(self.root, "state.json")
         self.draft_path = os.path.join(self.paper_dir, "draft.tex")
         if not os.path.exists(self.draft_path):
             with open(self.draft_path, "w", encoding="utf-8") as f:
                 f.write(DEFAULT_TEX)
+        self.compiler = CompileService(
+            self.draft_path,
+            fig_dir=self.fig_dir,
+            log_path=os.path.join(self.logs_dir, "pdflatex.log"),
+            log=self.log,
+        )
         self.model_path = model_path
         self.device = device
         self._model = None
@@ -61,17 +70,14 @@ class PaperManager:
         outputs = self._model.generate(**inputs, max_new_tokens=max_new_tokens)
         return self._tokenizer.decode(outputs[0], skip_special_tokens=True)
 
-    def autosave(self, content: str) -> None:
+    def autosave(self, content: str) -> Revision:
         # atomic write
         tmp = self.draft_path + ".tmp"
         with open(tmp, "w", encoding="utf-8") as f:
             f.write(content)
         os.replace(tmp, self.draft_path)
-        # checkpoint snapshot
-        now = datetime.datetime.now()
-        ts = now.strftime("%Y%m%d-%H%M%S") + f"-{int(now.microsecond/1000):03d}"
-        snap = os.path.join(self.rev_dir, f"draft-{ts}.tex")
-        shutil.copy2(self.draft_path, snap)
+        # checkpoint snapshot (deduplicated and delta-compressed)
+        return self.revisions.save(content)
 
     def validate_citations(self) -> bool:
         r"""Check that every \cite{key} has a matching entry in refs.bib."""
@@ -112,33 +118,22 @@ class PaperManager:
         returns ``True`` so that the rest of the validation pipeline
         can proceed.  If pdflatex is available it executes it in
         non‑interactive mode and writes its output to a log file.
+        Drafts identical to the last build (including ``refs.bib`` and
+        figures) are not compiled again.
 
         Returns:
             ``True`` if the document compiled successfully or if
             pdflatex is unavailable, ``False`` otherwise.
         """
-        cmd = [
-            "pdflatex",
-            "-interaction=nonstopmode",
-            os.path.basename(self.draft_path),
-        ]
-        try:
-            proc = subprocess.run(
-                cmd,
-                cwd=self.paper_dir,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-            )
-        except FileNotFoundError:
-            # In absence of pdflatex, skip compilation but treat as success
-            self.log("pdflatex not found; skipping PDF compilation")
-            return True
-        # Write pdflatex output to a log file for debugging
-        log_path = os.path.join(self.logs_dir, "pdflatex.log")
-        with open(log_path, "a", encoding="utf-8") as f:
-            f.write(proc.stdout)
-        return proc.returncode == 0
+        return self.compiler.compile()
+
+    def compile_pdf_async(self) -> "Future[bool]":
+        """Like :meth:`compile_pdf` but built in the background.
+
+        Requests made while a build is running are coalesced into one build
+        of the latest draft.
+        """
+        return self.compiler.submit()
 
     def validate_paper(self) -> bool:
         """Run citation, innovation, and LaTeX compile checks."""
@@ -147,12 +142,36 @@ class PaperManager:
         comp = self.compile_pdf()
         return cit and innov and comp
 
+    def validate_paper_async(self) -> "Future[bool]":
+        """Run the text checks now and resolve once the PDF build finishes."""
+        cit = self.validate_citations()
+        innov = self.check_innovation()
+        checks = cit and innov
+        result: Future = Future()
+
+        def done(build: Future) -> None:
+            try:
+                result.set_result(checks and build.result())
+            except Exception as exc:
+                result.set_exception(exc)
+
+        self.compile_pdf_async().add_done_callback(done)
+        return result
+
     def log(self, text: str) -> None:
         ts = time.strftime("%Y%m%d-%H%M%S")
         path = os.path.join(self.logs_dir, f"run-{ts}.log")
         with open(path, "a", encoding="utf-8") as f:
             f.write(text + "\n")
 
+    def load_state(self) -> Dict[str, Any]:
+        """Last state written by :meth:`save_state` (empty if none)."""
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
     def save_state(self, state: Dict[str, Any]) -> None:
         tmp = self.state_path + ".tmp"
         with open(tmp, "w", encoding="utf-8") as f:
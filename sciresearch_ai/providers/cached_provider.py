@@ -0,0 +1,196 @@
+"""
+CachedProvider: a content-addressed response cache that wraps any provider.
+
+Each completion is stored under a SHA-256 key derived from the provider name,
+model, sampling parameters, prompt and sample index, so asking the same
+question again (a replay after a crash, a deterministic temperature-0 call)
+is served from disk instead of the backend.  When sampling (temperature > 0)
+the index keeps counting across calls with the same prompt, so repeated
+batches of one prompt (TTC, the planning prompt of every iteration) get new
+samples within a run while a replayed run reads them back in the same order.
+Entries live in a single SQLite file under the project root and are evicted
+least-recently-used once the entry or byte caps are exceeded.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+
+class CachedProvider:
+    """Wrap ``provider`` so that ``generate`` consults an on-disk cache first.
+
+    Args:
+        provider: Any object exposing ``generate(prompt, n=1, **gen_kwargs)``.
+        path: SQLite file to store entries in (created if missing).
+        max_entries: Evict least-recently-used entries beyond this count.
+        max_bytes: Evict least-recently-used entries once stored responses
+            exceed this many bytes.
+    """
+
+    def __init__(
+        self,
+        provider: Any,
+        path: str,
+        max_entries: int = 50_000,
+        max_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        self.provider = provider
+        self.name = getattr(provider, "name", type(provider).__name__)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Samples drawn so far per sampled prompt and parameters.
+        self._drawn: Dict[str, int] = {}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Providers may be called from worker threads (e.g. TTC batches), so
+        # one connection is shared behind a lock.
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(_SCHEMA)
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_used)"
+        )
+        self._db.commit()
+
+    def __getattr__(self, item: str) -> Any:
+        # Expose the wrapped provider's attributes (model, temperature, ...).
+        if item == "provider":
+            raise AttributeError(item)
+        return getattr(self.provider, item)
+
+    # ---- keys --------------------------------------------------------
+    def _key(self, prompt: str, index: int, gen_kwargs: Dict[str, Any]) -> str:
+        p = self.provider
+        payload = {
+            "provider": self.name,
+            "model": getattr(p, "model", None) or getattr(p, "checkpoint", None),
+            "temperature": gen_kwargs.get(
+                "temperature", getattr(p, "temperature", None)
+            ),
+            "top_p": gen_kwargs.get("top_p", getattr(p, "top_p", None)),
+            "reasoning_effort": gen_kwargs.get(
+                "reasoning_effort", getattr(p, "reasoning_effort", None)
+            ),
+            "extra": {
+                k: gen_kwargs[k]
+                for k in sorted(gen_kwargs)
+                if k not in ("temperature", "top_p", "reasoning_effort")
+            },
+            "prompt": prompt,
+            "index": index,
+        }
+        blob = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _sampled(self, gen_kwargs: Dict[str, Any]) -> bool:
+        temperature = gen_kwargs.get(
+            "temperature", getattr(self.provider, "temperature", None)
+        )
+        return bool(temperature)
+
+    def _first_index(self, prompt: str, n: int, gen_kwargs: Dict[str, Any]) -> int:
+        """Index of the first of ``n`` samples: 0 for deterministic calls, the
+        running count of earlier samples of the same call when sampling."""
+        if not self._sampled(gen_kwargs):
+            return 0
+        call = json.dumps([prompt, gen_kwargs], sort_keys=True, default=str)
+        with self._lock:
+            start = self._drawn.get(call, 0)
+            self._drawn[call] = start + n
+        return start
+
+    # ---- storage -----------------------------------------------------
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._db.commit()
+            return row[0]
+
+    def _put(self, key: str, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        count, total = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        victims = []
+        rows = self._db.execute(
+            "SELECT key, size FROM responses ORDER BY last_used ASC"
+        )
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            victims.append((key,))
+            count -= 1
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current cache occupancy."""
+        with self._lock:
+            count, total = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": count,
+            "bytes": total,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # ---- public API --------------------------------------------------
+    def generate(self, prompt: str, n: int = 1, **gen_kwargs) -> List[str]:
+        start = self._first_index(prompt, n, gen_kwargs)
+        keys = [self._key(prompt, start + i, gen_kwargs) for i in range(n)]
+        outputs: List[Optional[str]] = [self._get(k) for k in keys]
+        missing = [i for i, o in enumerate(outputs) if o is None]
+        with self._lock:
+            self.hits += n - len(missing)
+            self.misses += len(missing)
+        if missing:
+            fresh = self.provider.generate(prompt, n=len(missing), **gen_kwargs)
+            for i, text in zip(missing, fresh):
+                outputs[i] = text
+                # Provider failures are reported as text; never cache them.
+                if not text.startswith(("API error:", "Provider exception:")):
+                    self._put(keys[i], text)
+        return [o for o in outputs if o is not None]
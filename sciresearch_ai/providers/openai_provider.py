@@ -2,10 +2,20 @@ from __future__ import annotations
 
 import json
 import os
-from typing import Any, Dict, List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 
 import httpx
-from openai import APIError, APITimeoutError, OpenAI
+from openai import (
+    APIConnectionError,
+    APIError,
+    APITimeoutError,
+    DefaultHttpxClient,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+)
 
 # Local function tools that the model can call through the Responses API.
 # We expose simple capabilities that are safe and useful during research.
@@ -13,18 +23,34 @@ from ..tools.python_exec import run_user_code
 from ..tools.sympy_tools import check_symbolic_equality
 
 
-def _build_client() -> OpenAI:
+def _build_client(max_connections: int = 8, timeout: Optional[float] = None) -> OpenAI:
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("Set OPENAI_API_KEY environment variable.")
+    # One pooled client is shared by every concurrent sample; retries are
+    # handled by the provider so the SDK's own retry loop is disabled.
+    limits = httpx.Limits(
+        max_connections=max_connections, max_keepalive_connections=max_connections
+    )
     proxy = os.environ.get("HTTPS_PROXY") or os.environ.get("HTTP_PROXY")
-    if proxy:
-        transport = httpx.HTTPTransport(proxy=proxy)
-        http_client = httpx.Client(
-            transport=transport, timeout=httpx.Timeout(120, connect=10)
-        )
-        return OpenAI(api_key=api_key, http_client=http_client)
-    return OpenAI(api_key=api_key)
+    transport = httpx.HTTPTransport(proxy=proxy or None, limits=limits)
+    # Keep the SDK's default timeout unless one is given (or a proxy is set).
+    client_kwargs: Dict[str, Any] = {}
+    if timeout is not None:
+        client_kwargs["timeout"] = timeout
+    elif proxy:
+        client_kwargs["timeout"] = httpx.Timeout(120, connect=10)
+    http_client = DefaultHttpxClient(transport=transport, **client_kwargs)
+    return OpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+
+
+# Errors worth retrying: throttling, dropped connections and server faults.
+_RETRYABLE_ERRORS = (
+    APITimeoutError,
+    APIConnectionError,
+    RateLimitError,
+    InternalServerError,
+)
 
 
 class OpenAIProvider:
@@ -39,8 +65,17 @@ class OpenAIProvider:
         reasoning_effort: Optional[str] = None,
         enable_code_interpreter: bool = False,
         project_root: Optional[str] = None,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        timeout: Optional[float] = None,
     ):
-        self.client = _build_client()
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.client = _build_client(
+            max_connections=self.max_concurrency, timeout=timeout
+        )
         self.model = model
         self.temperature = temperature
         self.top_p = top_p
@@ -165,21 +200,37 @@ class OpenAIProvider:
         except Exception as e:
             return json.dumps({"error": str(e)})
 
+    def _with_retries(self, fn: Callable[..., Any], **kwargs: Any) -> Any:
+        """Call ``fn`` and retry transient API errors with exponential backoff."""
+        trial = 0
+        while True:
+            try:
+                return fn(**kwargs)
+            except _RETRYABLE_ERRORS:
+                if trial >= self.max_retries:
+                    raise
+                time.sleep(self.retry_backoff * 2**trial)
+                trial += 1
+
     def generate(self, prompt: str, n: int = 1, **gen_kwargs) -> List[str]:
-        # Tool-enabled Responses API with function tools and optional code_interpreter
-        outputs: List[str] = []
+        if n <= 1:
+            return [self._generate_one(prompt, gen_kwargs)]
+        # Independent samples run concurrently on the shared client; each one
+        # keeps its own tool-calling loop.
+        workers = min(n, self.max_concurrency)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(
+                pool.map(lambda _: self._generate_one(prompt, gen_kwargs), range(n))
+            )
+
+    def _generate_one(self, prompt: str, gen_kwargs: Dict[str, Any]) -> str:
         try:
+            # Tool-enabled Responses API with function tools and optional code_interpreter
             tools = self._function_tools()
             if self.enable_code_interpreter:
                 tools = [
                     {"type": "code_interpreter", "name": "code_interpreter"}
                 ] + tools
-            # We keep it simple: single prompt per call; if n>1, loop.
-            if n > 1:
-                for _ in range(n):
-                    outputs.extend(self.generate(prompt, n=1, **gen_kwargs))
-                return outputs
-
             reasoning_effort = gen_kwargs.get("reasoning_effort", self.reasoning_effort)
             include_reasoning = (
                 reasoning_effort is not None or self._model_supports_reasoning()
@@ -199,7 +250,7 @@ class OpenAIProvider:
                     if reasoning_effort is not None:
                         reasoning["effort"] = reasoning_effort
                     req["reasoning"] = reasoning
-                return self.client.responses.create(**req)
+                return self._with_retries(self.client.responses.create, **req)
 
             try:
                 resp = _create(include_reasoning)
@@ -224,8 +275,7 @@ class OpenAIProvider:
                     elif getattr(item, "type", None) == "tool_call":
                         tool_calls.append(item)
                 if txts and not tool_calls:
-                    outputs.append("".join(txts))
-                    break
+                    return "".join(txts)
                 if tool_calls:
                     tool_outputs = []
                     for call in tool_calls:
@@ -248,16 +298,16 @@ class OpenAIProvider:
                                 "output": result[:100000],  # avoid oversized payloads
                             }
                         )
-                    resp = self.client.responses.submit_tool_outputs(
-                        response_id=resp.id, tool_outputs=tool_outputs
+                    resp = self._with_retries(
+                        self.client.responses.submit_tool_outputs,
+                        response_id=resp.id,
+                        tool_outputs=tool_outputs,
                     )
                     # loop again to read new outputs
                     continue
-                # if we got here with no text and no tools, append raw
-                outputs.append(str(resp))
-                break
+                # if we got here with no text and no tools, return raw
+                return str(resp)
         except (APIError, APITimeoutError) as e:
-            outputs.append(f"API error: {e}")
+            return f"API error: {e}"
         except Exception as e:
-            outputs.append(f"Provider exception: {e}")
-        return outputs
+            return f"Provider exception: {e}"
@@ -3,13 +3,25 @@ from __future__ import annotations
 import asyncio
 import datetime
 import os
-from typing import Any, List, Optional
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
 
 # Imports for the heavy OSS model are deferred so that the lightweight stub
 # can run without triggering network downloads of Harmony vocabularies.
 _setup_transformers = None
 
 
+def is_revision_prompt(prompt: str) -> bool:
+    """Prompts asking to rewrite a given draft (see ``critique_and_revise``)."""
+    return "revise the draft" in prompt.lower() and "DRAFT:" in prompt
+
+
+def _kv_bytes(prefix) -> int:
+    """Bytes of KV cache a prefilled prefix keeps alive, over all layers."""
+    return sum(cache.kv_bytes() for cache in prefix.caches)
+
+
 class OssProvider:
     """Local provider for the open-source OSS 120B model with tool support."""
 
@@ -23,10 +35,39 @@ class OssProvider:
         reasoning_effort: str = "low",
         enable_browser: bool = False,
         enable_python: bool = False,
+        temperature: float = 0.0,
+        prompt_lookup: Optional[bool] = None,
+        max_prefix_bytes: int = 2 << 30,
     ) -> None:
         self.checkpoint = checkpoint or "openai/oss-120b"
+        # The backend keeps a single KV session; serialise callers (e.g. TTC
+        # worker threads) so one sample's prefix is not evicted mid-decode.
+        self._lock = threading.Lock()
         backend = os.environ.get("OSS_PROVIDER_BACKEND", "transformers")
         self._backend = backend
+        self.temperature = temperature
+        # Backends that can decode several sequences in lockstep expose
+        # ``generate_batch(prompts, stop_tokens, temperature, max_tokens)``.
+        self._generate_batch = None
+        # Backends with prompt-lookup decoding expose ``generate(...,
+        # prompt_lookup=True, stats=...)``.  ``None`` enables it for revision
+        # prompts only, which mostly copy the draft they are given.
+        self.prompt_lookup = prompt_lookup
+        self._generate_stream = None
+        self._lookup_stats = None
+        self._new_lookup_stats = None
+        self.last_prompt_lookup_stats: Optional[Dict[str, Any]] = None
+        # Backends with forked decoding expose ``prefill(tokens, parent)`` and
+        # ``generate_forked(prefix, n, ...)``: a prompt is prefilled once and
+        # its n samples decode from copies of its KV cache.  Recent prefixes
+        # are kept so a prompt that extends one of them (a tree-of-thoughts
+        # child extends its parent's state) only prefills the new tokens;
+        # each holds a full copy of its KV rows, so they are bounded by the
+        # bytes of KV cache they keep alive rather than by their number.
+        self._prefill = None
+        self._generate_forked = None
+        self.max_prefix_bytes = max_prefix_bytes
+        self._prefixes: OrderedDict = OrderedDict()
         if backend == "stub":
             # The stub backend returns a fixed string and avoids any heavy
             # initialization or network access.
@@ -47,10 +88,6 @@ class OssProvider:
                 load_harmony_encoding,
             )
 
-            from gpt_oss.responses_api.inference.transformers import (
-                setup_model as _setup_transformers,
-            )
-
             self.Author = Author
             self.Conversation = Conversation
             self.DeveloperContent = DeveloperContent
@@ -68,8 +105,27 @@ class OssProvider:
                 "low": ReasoningEffort.LOW,
             }
 
-            # transformers-based incremental generator
-            self._infer_next_token = _setup_transformers(self.checkpoint, device=device)
+            if backend == "torch":
+                # reference torch model with per-layer KV caches; serves the
+                # n samples of one prompt in a single batched pass
+                from gpt_oss.torch.model import TokenGenerator
+
+                generator = TokenGenerator(self.checkpoint, device=device or "cpu")
+                self._infer_next_token = generator.infer_next_token
+                self._generate_batch = generator.generate_batch
+                self._generate_stream = generator.generate
+                self._new_lookup_stats = generator.new_speculative_stats
+                self._prefill = generator.prefill
+                self._generate_forked = generator.generate_forked
+            else:
+                from gpt_oss.responses_api.inference.transformers import (
+                    setup_model as _setup_transformers,
+                )
+
+                # transformers-based incremental generator
+                self._infer_next_token = _setup_transformers(
+                    self.checkpoint, device=device
+                )
             self.encoding = load_harmony_encoding(HarmonyEncodingName.HARMONY_GPT_OSS)
         self.reasoning_effort = reasoning_effort
         self.enable_browser = enable_browser
@@ -133,13 +189,23 @@ class OssProvider:
     def _token_generator(
         self, tokens: List[int], stop: List[int], max_new_tokens: Optional[int]
     ):
+        if self._lookup_stats is not None:
+            yield from self._generate_stream(
+                tokens,
+                stop_tokens=stop,
+                temperature=self.temperature,
+                max_tokens=max_new_tokens or 0,
+                prompt_lookup=True,
+                stats=self._lookup_stats,
+            )
+            return
         new_request = True
         produced = 0
         while True:
             if max_new_tokens is not None and produced >= max_new_tokens:
                 break
             next_tok = self._infer_next_token(
-                tokens, temperature=0.0, new_request=new_request
+                tokens, temperature=self.temperature, new_request=new_request
             )
             new_request = False
             tokens.append(next_tok)
@@ -163,38 +229,124 @@ class OssProvider:
         if self.encoding is None:
             return ["This is a demo response from the OSS provider stub."] * n
 
-        outputs: List[str] = []
-        for _ in range(n):
-            messages: List[Any] = [
-                self._system_message(),
-                self.Message.from_role_and_content(
-                    self.Role.DEVELOPER, self.DeveloperContent.new()
-                ),
-                self.Message.from_role_and_content(self.Role.USER, prompt),
-            ]
-            remaining = max_new_tokens
-            while True:
-                conversation = self.Conversation.from_messages(messages)
-                tokens = self.encoding.render_conversation_for_completion(
-                    conversation, self.Role.ASSISTANT
+        with self._lock:
+            use_lookup = self._generate_stream is not None and (
+                self.prompt_lookup
+                if self.prompt_lookup is not None
+                else is_revision_prompt(prompt)
+            )
+            self._lookup_stats = self._new_lookup_stats() if use_lookup else None
+            try:
+                return self._generate_locked(prompt, n, max_new_tokens)
+            finally:
+                # Acceptance of the n-gram drafts for this call.
+                self.last_prompt_lookup_stats = (
+                    self._lookup_stats.as_dict() if use_lookup else None
                 )
-                parser = self.StreamableParser(self.encoding, role=self.Role.ASSISTANT)
-                produced = 0
-                for tok in self._token_generator(
-                    tokens,
+                self._lookup_stats = None
+
+    def _generate_locked(
+        self, prompt: str, n: int, max_new_tokens: Optional[int]
+    ) -> List[str]:
+        # Every sample and every post-tool continuation re-renders the
+        # conversation; the backend reuses the KV cache for the longest
+        # common prefix, so only tokens that changed are run through the model.
+        first_turns: List[Optional[List[int]]] = [None] * n
+        if self._generate_forked is not None and self._lookup_stats is None:
+            tokens = self._render(self._initial_messages(prompt))
+            first_turns = self._generate_forked(
+                self._prefix_for(tokens),
+                n,
+                stop_tokens=self.encoding.stop_tokens_for_assistant_actions(),
+                temperature=self.temperature,
+                max_tokens=max_new_tokens or 0,
+            )
+        elif self._generate_batch is not None and n > 1:
+            # Decode the first assistant turn of all samples in one batched
+            # pass; tool-call continuations then proceed per sample.
+            tokens = self._render(self._initial_messages(prompt))
+            first_turns = self._generate_batch(
+                [list(tokens) for _ in range(n)],
+                stop_tokens=self.encoding.stop_tokens_for_assistant_actions(),
+                temperature=self.temperature,
+                max_tokens=max_new_tokens or 0,
+            )
+        return [
+            self._complete(self._initial_messages(prompt), max_new_tokens, first)
+            for first in first_turns
+        ]
+
+    def _prefix_for(self, tokens: List[int]):
+        """Prefill ``tokens`` starting from the remembered prefix that shares
+        the most leading tokens with them."""
+
+        def shared(prefix) -> int:
+            i = 0
+            for a, b in zip(prefix.tokens, tokens):
+                if a != b:
+                    break
+                i += 1
+            return i
+
+        parent = max(self._prefixes.values(), key=shared, default=None)
+        if parent is not None and shared(parent) == 0:
+            parent = None
+        prefix = self._prefill(tokens, parent=parent)
+        key = tuple(tokens)
+        self._prefixes[key] = prefix
+        self._prefixes.move_to_end(key)
+        # The newest prefix is always kept: it is about to be decoded from.
+        nbytes = sum(_kv_bytes(p) for p in self._prefixes.values())
+        while len(self._prefixes) > 1 and nbytes > self.max_prefix_bytes:
+            nbytes -= _kv_bytes(self._prefixes.popitem(last=False)[1])
+        return prefix
+
+    def _initial_messages(self, prompt: str) -> List[Any]:
+        return [
+            self._system_message(),
+            self.Message.from_role_and_content(
+                self.Role.DEVELOPER, self.DeveloperContent.new()
+            ),
+            self.Message.from_role_and_content(self.Role.USER, prompt),
+        ]
+
+    def _render(self, messages: List[Any]) -> List[int]:
+        conversation = self.Conversation.from_messages(messages)
+        return self.encoding.render_conversation_for_completion(
+            conversation, self.Role.ASSISTANT
+        )
+
+    def _complete(
+        self,
+        messages: List[Any],
+        remaining: Optional[int],
+        first_turn: Optional[List[int]] = None,
+    ) -> str:
+        """Run the assistant/tool loop until a final answer or budget runs out.
+
+        ``first_turn`` holds already-decoded tokens for the first assistant
+        turn (from a batched pass); later turns are decoded incrementally.
+        """
+        while True:
+            if first_turn is not None:
+                generated, first_turn = first_turn, None
+            else:
+                generated = self._token_generator(
+                    self._render(messages),
                     self.encoding.stop_tokens_for_assistant_actions(),
                     remaining,
-                ):
-                    parser.process(tok)
-                    produced += 1
-                messages.extend(parser.messages)
-                last = messages[-1]
-                if last.recipient is None or (
-                    remaining is not None and remaining - produced <= 0
-                ):
-                    outputs.append(last.content[0].text)
-                    break
-                remaining = None if remaining is None else remaining - produced
-                tool_msgs = self._dispatch_tool(last)
-                messages.extend(tool_msgs)
-        return outputs
+                )
+            parser = self.StreamableParser(self.encoding, role=self.Role.ASSISTANT)
+            produced = 0
+            for tok in generated:
+                parser.process(tok)
+                produced += 1
+            messages.extend(parser.messages)
+            last = messages[-1]
+            if last.recipient is None or (
+                remaining is not None and remaining - produced <= 0
+            ):
+                return last.content[0].text
+            remaining = None if remaining is None else remaining - produced
+            tool_msgs = self._dispatch_tool(last)
+            messages.extend(tool_msgs)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+# --- Stage DAG ---
+# A stage may only depend on stages added before it, so insertion order is a
+# topological order and earlier stages win when several are ready.  Ready
+# stages run on a bounded thread pool; a stage whose dependency was skipped
+# or failed is skipped too.
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    deps: Tuple[str, ...] = ()
+
+
+class StageGraph:
+    """Dependency graph of stages run with bounded concurrency."""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, Stage] = {}
+        self.results: Dict[str, Any] = {}
+        self.skipped: Set[str] = set()
+        self.timings: List[Dict[str, Any]] = []
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[[Dict[str, Any]], Any],
+        deps: Tuple[str, ...] = (),
+    ) -> None:
+        """Add a stage; ``fn`` receives the results of finished stages."""
+        if name in self.stages:
+            raise ValueError(f"duplicate stage {name!r}")
+        unknown = [d for d in deps if d not in self.stages]
+        if unknown:
+            raise ValueError(f"stage {name!r} depends on unknown {unknown}")
+        self.stages[name] = Stage(name, fn, tuple(deps))
+
+    def run(
+        self,
+        max_workers: int = 2,
+        should_start: Optional[Callable[[str], bool]] = None,
+    ) -> Dict[str, Any]:
+        """Run every stage once its dependencies have finished.
+
+        Args:
+            max_workers: stages running at once.
+            should_start: consulted when a stage becomes ready; returning
+                ``False`` skips it and everything depending on it.
+
+        Returns:
+            Results by stage name. The first exception raised by a stage is
+            re-raised once running stages have finished; nothing new starts
+            after it.
+        """
+        pending = list(self.stages)
+        running: Dict[Future, str] = {}
+        error: Optional[BaseException] = None
+        origin = time.perf_counter()
+
+        def timed(stage: Stage):
+            start = time.perf_counter()
+            result = stage.fn(self.results)
+            return result, start - origin, time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            while pending or running:
+                for name in list(pending):
+                    stage = self.stages[name]
+                    if error is not None or any(d in self.skipped for d in stage.deps):
+                        pending.remove(name)
+                        self.skipped.add(name)
+                    elif len(running) < max(1, max_workers) and all(
+                        d in self.results for d in stage.deps
+                    ):
+                        pending.remove(name)
+                        if should_start is not None and not should_start(name):
+                            self.skipped.add(name)
+                        else:
+                            running[pool.submit(timed, stage)] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    try:
+                        result, start, seconds = fut.result()
+                    except BaseException as exc:  # noqa: BLE001 - re-raised below
+                        error = error or exc
+                        self.skipped.add(name)
+                        continue
+                    self.results[name] = result
+                    self.timings.append(
+                        {"stage": name, "start": start, "seconds": seconds}
+                    )
+        if error is not None:
+            raise error
+        return self.results
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import glob
 import os
 
 from sciresearch_ai.config import RunConfig
@@ -16,8 +15,9 @@ def test_autosave_and_checkpoints(tmp_path):
     cfg = RunConfig(max_iterations=2, samples_per_query=3, interactive=False)
     orch = Orchestrator(prj, MockProvider(), cfg)
     orch.run()
-    revs = glob.glob(os.path.join(prj.root, "revisions", "draft-*.tex"))
+    revs = prj.pm.revisions.list()
     assert len(revs) >= 2, "Expect at least one snapshot per iteration"
+    assert len(os.listdir(os.path.join(prj.root, "revisions"))) == 2
 
 
 def test_bad_early_stop():
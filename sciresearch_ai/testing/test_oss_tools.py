@@ -202,3 +202,104 @@ def test_python_tool_routing(monkeypatch):
     prov.python_tool = DummyTool("py result")
     out = prov.generate("hi")[0]
     assert out == "py result"
+
+
+def test_batched_first_turn_then_tool_continuation(monkeypatch):
+    msgs = [
+        # sample 0 answers directly
+        [Message.from_role_and_content(Role.ASSISTANT, "direct")],
+        # sample 1 calls a tool, then answers after the tool result
+        [
+            Message.from_role_and_content(
+                Role.ASSISTANT, TextContent(text="code")
+            ).with_recipient("python")
+        ],
+        [Message.from_role_and_content(Role.ASSISTANT, "after tool")],
+    ]
+    setup_fake_model(monkeypatch, msgs)
+    prov = OssProvider()
+    prov.python_tool = DummyTool("py result")
+    batches = []
+
+    def fake_generate_batch(prompts, stop_tokens, temperature, max_tokens):
+        batches.append(len(prompts))
+        return [[0] for _ in prompts]
+
+    prov._generate_batch = fake_generate_batch
+    out = prov.generate("hi", n=2)
+    assert batches == [2]
+    assert out == ["direct", "after tool"]
+
+
+def test_revision_prompts_use_prompt_lookup(monkeypatch):
+    msgs = [
+        [Message.from_role_and_content(Role.ASSISTANT, "revised")],
+        [Message.from_role_and_content(Role.ASSISTANT, "plain")],
+    ]
+    setup_fake_model(monkeypatch, msgs)
+    prov = OssProvider()
+    calls = []
+
+    class Stats:
+        def as_dict(self):
+            return {"acceptance_rate": 0.75}
+
+    def fake_generate(tokens, stop_tokens, temperature, max_tokens, **kwargs):
+        calls.append(kwargs)
+        yield 0
+
+    prov._generate_stream = fake_generate
+    prov._new_lookup_stats = Stats
+    revise = "Revise the draft to resolve the above critique.\nCRITIQUE:\nx\nDRAFT:\ny"
+    assert prov.generate(revise) == ["revised"]
+    assert calls[0]["prompt_lookup"] is True
+    assert prov.last_prompt_lookup_stats == {"acceptance_rate": 0.75}
+
+    assert prov.generate("hi") == ["plain"]
+    assert len(calls) == 1
+    assert prov.last_prompt_lookup_stats is None
+
+
+def test_forked_sampling_reuses_parent_prefix(monkeypatch):
+    msgs = [[Message.from_role_and_content(Role.ASSISTANT, "t")] for _ in range(5)]
+    setup_fake_model(monkeypatch, msgs)
+    prov = OssProvider()
+    prov._render = lambda messages: [ord(c) for c in messages[-1].content[0].text]
+    prefills, forks = [], []
+
+    def fake_prefill(tokens, parent=None):
+        prefills.append(None if parent is None else parent.tokens)
+        return types.SimpleNamespace(tokens=tokens, caches=[])
+
+    def fake_generate_forked(prefix, n, stop_tokens, temperature, max_tokens):
+        forks.append(n)
+        return [[0] for _ in range(n)]
+
+    prov._prefill = fake_prefill
+    prov._generate_forked = fake_generate_forked
+    assert prov.generate("root", n=3) == ["t"] * 3
+    # A tree-search child continues from its parent's prefilled prompt.
+    assert prov.generate("root\nA", n=2) == ["t"] * 2
+    assert forks == [3, 2]
+    assert prefills == [None, [ord(c) for c in "root"]]
+
+
+def test_remembered_prefixes_are_bounded_by_kv_bytes(monkeypatch):
+    setup_fake_model(monkeypatch, [])
+    prov = OssProvider(max_prefix_bytes=20)
+    parents = []
+
+    def fake_prefill(tokens, parent=None):
+        parents.append(None if parent is None else parent.tokens)
+        cache = types.SimpleNamespace(kv_bytes=lambda: len(tokens))
+        return types.SimpleNamespace(tokens=tokens, caches=[cache, cache])
+
+    prov._prefill = fake_prefill
+    prov._prefix_for([1, 2, 3, 4])  # 8 bytes
+    prov._prefix_for([5, 6, 7])  # 6 bytes
+    prov._prefix_for([1, 2, 3, 4, 8])  # 10 bytes: the oldest goes
+    assert list(prov._prefixes) == [(5, 6, 7), (1, 2, 3, 4, 8)]
+    assert parents == [None, None, [1, 2, 3, 4]]
+    # A prefix over the budget on its own is kept until the next one.
+    prov._prefix_for(list(range(9, 21)))
+    assert list(prov._prefixes) == [tuple(range(9, 21))]
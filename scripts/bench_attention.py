@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""Benchmark dense vs blockwise attention of the torch reference model on CPU."""
+from __future__ import annotations
+
+import argparse
+import time
+
+import torch
+
+from gpt_oss.torch.model import sdpa, sdpa_blockwise
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Compare sdpa and sdpa_blockwise")
+    p.add_argument("--heads", type=int, default=64, help="Query heads")
+    p.add_argument("--kv-heads", type=int, default=8)
+    p.add_argument("--head-dim", type=int, default=64)
+    p.add_argument("--block-size", type=int, default=128)
+    p.add_argument(
+        "--lengths", type=int, nargs="+", default=[256, 512, 1024, 2048, 4096]
+    )
+    p.add_argument(
+        "--max-dense-mb",
+        type=int,
+        default=4096,
+        help="Skip dense sdpa when its intermediates would exceed this size",
+    )
+    return p.parse_args()
+
+
+def timed(fn) -> tuple[float, torch.Tensor]:
+    start = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - start, out
+
+
+@torch.inference_mode()
+def main() -> None:
+    args = parse_args()
+    torch.manual_seed(0)
+    q_mult = args.heads // args.kv_heads
+    print(
+        f"{'window':>6} {'tokens':>7} {'dense ms':>9} {'dense MB':>9} "
+        f"{'block ms':>9} {'block MB':>9} {'max err':>8}"
+    )
+    for window in (128, 0):
+        for n in args.lengths:
+            Q = torch.randn(n, args.kv_heads, q_mult, args.head_dim).bfloat16()
+            K = torch.randn(n, args.kv_heads, args.head_dim).bfloat16()
+            V = torch.randn(n, args.kv_heads, args.head_dim).bfloat16()
+            S = torch.randn(args.heads).bfloat16()
+            sm_scale = args.head_dim**-0.5
+            # Live intermediates: sdpa keeps ~4 bf16 (heads, n, n + 1) score
+            # matrices (scores, +sink, softmax, slice); the blockwise kernel
+            # keeps a few float32 (heads, block, block) tiles.
+            dense_mb = 4 * args.heads * n * (n + 1) * 2 / 2**20
+            block_mb = args.heads * args.block_size**2 * 4 * 3 / 2**20
+            block_s, out = timed(
+                lambda: sdpa_blockwise(
+                    Q, K, V, S, sm_scale, window, block_size=args.block_size
+                )
+            )
+            if dense_mb <= args.max_dense_mb:
+                dense_s, ref = timed(lambda: sdpa(Q, K, V, S, sm_scale, window))
+                err = f"{(out.float() - ref.float()).abs().max().item():8.4f}"
+                dense_ms = f"{dense_s * 1e3:9.1f}"
+            else:
+                dense_ms, err = f"{'skip':>9}", f"{'-':>8}"
+            print(
+                f"{window:>6} {n:>7} {dense_ms} {dense_mb:>9.0f} "
+                f"{block_s * 1e3:>9.1f} {block_mb:>9.0f} {err}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""Accuracy versus memory of the compressed KV cache modes on CPU.
+
+A random model prefills a prompt and then decodes a continuation token by
+token with each ``kv_mode``; the next-token logits are compared with the
+full-precision cache.
+"""
+from __future__ import annotations
+
+import argparse
+
+import torch
+
+from gpt_oss.torch.model import ModelConfig, Transformer, new_caches
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Benchmark compressed KV caches")
+    p.add_argument("--layers", type=int, default=4)
+    p.add_argument("--hidden-size", type=int, default=256)
+    p.add_argument("--prompt-length", type=int, default=1024)
+    p.add_argument("--decode-tokens", type=int, default=32)
+    p.add_argument("--ranks", type=int, nargs="+", default=[8, 16, 32])
+    p.add_argument("--recent", type=int, default=256)
+    p.add_argument("--chunk", type=int, default=128)
+    return p.parse_args()
+
+
+def build_model(args) -> Transformer:
+    config = ModelConfig(
+        num_hidden_layers=args.layers,
+        num_experts=8,
+        experts_per_token=2,
+        vocab_size=4096,
+        hidden_size=args.hidden_size,
+        intermediate_size=args.hidden_size,
+        num_attention_heads=8,
+        num_key_value_heads=2,
+    )
+    torch.manual_seed(0)
+    model = Transformer(config, device=torch.device("cpu")).eval()
+    with torch.no_grad():
+        for param in model.parameters():
+            param.normal_(0.0, 0.05)
+    return model
+
+
+@torch.inference_mode()
+def decode_logits(model, tokens, prompt_length, caches) -> torch.Tensor:
+    x = torch.as_tensor([tokens[:prompt_length]], dtype=torch.int32)
+    steps = [model(x, caches=caches, logits_positions=slice(-1, None))[0, -1]]
+    for token in tokens[prompt_length:]:
+        x = torch.as_tensor([[token]], dtype=torch.int32)
+        steps.append(model(x, caches=caches)[0, -1])
+    return torch.stack(steps).float()
+
+
+def main() -> None:
+    args = parse_args()
+    model = build_model(args)
+    total = args.prompt_length + args.decode_tokens
+    tokens = torch.randint(0, model.config.vocab_size, (total,)).tolist()
+
+    modes = [("full", {}), ("int8", {})] + [
+        (
+            "sketch",
+            {"rank": rank, "recent": args.recent, "chunk": args.chunk},
+        )
+        for rank in args.ranks
+    ]
+    print(
+        f"{'mode':>12} {'bytes/token':>12} {'ratio':>6} "
+        f"{'max |dlogit|':>12} {'KL':>9} {'top-1':>6}"
+    )
+    reference = None
+    for mode, options in modes:
+        caches = new_caches(model, 1, capacity=total, kv_mode=mode, **options)
+        logits = decode_logits(model, tokens, args.prompt_length, caches)
+        kv_bytes = sum(cache.kv_bytes() for cache in caches) / total
+        if reference is None:
+            reference, full_bytes = logits, kv_bytes
+        log_p = torch.log_softmax(reference, dim=-1)
+        log_q = torch.log_softmax(logits, dim=-1)
+        kl = (log_p.exp() * (log_p - log_q)).sum(dim=-1).mean().item()
+        top1 = (reference.argmax(-1) == logits.argmax(-1)).float().mean().item()
+        label = mode if mode != "sketch" else f"sketch r={options['rank']}"
+        print(
+            f"{label:>12} {kv_bytes:12.0f} {full_bytes / kv_bytes:6.2f} "
+            f"{(logits - reference).abs().max().item():12.4f} {kl:9.2e} {top1:6.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""Microbenchmark the shared RoPE table against per-call recomputation."""
+from __future__ import annotations
+
+import argparse
+import time
+from unittest import mock
+
+import torch
+
+from gpt_oss.torch.model import (
+    ModelConfig,
+    RotaryEmbedding,
+    TokenGenerator,
+    Transformer,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Benchmark RoPE table reuse")
+    p.add_argument("--context", type=int, default=4096, help="Decode position")
+    p.add_argument("--layers", type=int, default=36)
+    p.add_argument("--steps", type=int, default=32, help="Decode steps to time")
+    return p.parse_args()
+
+
+def recompute_cos_sin(self, start: int, num_tokens: int):
+    """The previous behaviour: rerun YaRN + einsum from position 0 every call."""
+    concentration, inv_freq = self._compute_concentration_and_inv_freq()
+    t = torch.arange(start + num_tokens, dtype=torch.float32, device=self.device)
+    freqs = torch.einsum("i,j->ij", t, inv_freq)
+    cos = freqs.cos() * concentration
+    sin = freqs.sin() * concentration
+    return cos[start:], sin[start:]
+
+
+def time_rope_calls(config: ModelConfig, args) -> float:
+    rope = RotaryEmbedding.for_config(config)
+    q_mult = config.num_attention_heads // config.num_key_value_heads
+    q = torch.randn(1, 1, config.num_key_value_heads, q_mult, config.head_dim)
+    k = torch.randn(1, 1, config.num_key_value_heads, config.head_dim)
+    positions = torch.tensor([[args.context]])
+    rope(q, k, positions=positions)  # warm up / build the table
+    start = time.perf_counter()
+    for _ in range(args.layers * args.steps):
+        rope(q, k, positions=positions)
+    return (time.perf_counter() - start) / args.steps
+
+
+def time_decode(config: ModelConfig, args) -> float:
+    torch.manual_seed(0)
+    model = Transformer(config, device=torch.device("cpu"))
+    for param in model.parameters():
+        param.data.normal_(0.0, 0.02)
+    generator = TokenGenerator("", device=torch.device("cpu"), model=model.eval())
+    prompt = torch.randint(0, config.vocab_size, (args.context,)).tolist()
+    generator.infer_next_token(prompt, new_request=True)
+    tokens = list(prompt)
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        tokens.append(generator.infer_next_token(tokens))
+    return (time.perf_counter() - start) / args.steps
+
+
+def main() -> None:
+    args = parse_args()
+    config = ModelConfig(
+        num_hidden_layers=args.layers,
+        num_experts=4,
+        experts_per_token=2,
+        vocab_size=1024,
+        hidden_size=256,
+        intermediate_size=256,
+        head_dim=64,
+        num_attention_heads=8,
+        num_key_value_heads=2,
+    )
+    table_rope = time_rope_calls(config, args)
+    table_decode = time_decode(config, args)
+    with mock.patch.object(RotaryEmbedding, "_compute_cos_sin", recompute_cos_sin):
+        old_rope = time_rope_calls(config, args)
+        old_decode = time_decode(config, args)
+    print(f"position {args.context}, {args.layers} layers, per decoded token:")
+    print(f"  rope only : {old_rope * 1e3:7.2f} ms -> {table_rope * 1e3:7.2f} ms")
+    print(f"  full step : {old_decode * 1e3:7.2f} ms -> {table_decode * 1e3:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""Benchmark the Tree-of-Thoughts engine against sequential expansion.
+
+A mock provider sleeps ``--latency`` seconds per call (as a remote model
+would) and proposes thoughts of which a fraction repeat an earlier idea.
+For each depth/breadth pair the baseline expands frontier states one at a
+time, keeps every state as a concatenated string and scores each candidate;
+the engine expands a level concurrently, drops duplicate states and caches
+scores.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import List
+
+from sciresearch_ai.inference.tot import TreeOfThoughts
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Benchmark Tree-of-Thoughts search")
+    p.add_argument("--depths", type=int, nargs="+", default=[2, 3, 4])
+    p.add_argument("--breadths", type=int, nargs="+", default=[2, 4, 8])
+    p.add_argument("--latency", type=float, default=0.02, help="Seconds per call")
+    p.add_argument("--duplicate-rate", type=float, default=0.3)
+    p.add_argument("--thought-chars", type=int, default=400)
+    p.add_argument("--workers", type=int, default=8)
+    return p.parse_args()
+
+
+class LatencyProvider:
+    def __init__(self, latency: float, duplicate_rate: float, thought_chars: int):
+        self.latency = latency
+        self.duplicate_rate = duplicate_rate
+        self.thought_chars = thought_chars
+
+    def __call__(self, state: str, n: int) -> List[str]:
+        time.sleep(self.latency)
+        rng = random.Random(hash(state))
+        thoughts = []
+        for i in range(n):
+            if thoughts and rng.random() < self.duplicate_rate:
+                thoughts.append(thoughts[0].upper())  # a near-identical repeat
+            else:
+                idea = f"idea {rng.randrange(10**6)} "
+                thoughts.append((idea * self.thought_chars)[: self.thought_chars])
+        return thoughts
+
+
+def scorer(state: str) -> float:
+    time.sleep(0.001)
+    return float(sum(map(ord, state[-64:])) % 997)
+
+
+def sequential(provider, prompt: str, depth: int, breadth: int) -> dict:
+    """The original loop: one expansion at a time, full strings per node."""
+    frontier = [(prompt, [])]
+    calls = scores = stored = 0
+    for _ in range(depth):
+        candidates = []
+        for state, path in frontier:
+            calls += 1
+            for t in provider(state, breadth):
+                new_state = f"{state}\n{t}"
+                stored += len(new_state)
+                candidates.append((new_state, path + [t]))
+        if not candidates:
+            break
+        scores += len(candidates)
+        candidates.sort(key=lambda n: scorer(n[0]), reverse=True)
+        frontier = candidates[:breadth]
+    return {"calls": calls, "scores": scores, "stored": stored}
+
+
+def main() -> None:
+    args = parse_args()
+    provider = LatencyProvider(args.latency, args.duplicate_rate, args.thought_chars)
+    print(
+        f"{'depth':>5} {'breadth':>7} {'seq s':>7} {'tot s':>7} {'speedup':>7} "
+        f"{'calls':>11} {'scores':>11} {'dups':>5} {'stored KB':>13}"
+    )
+    for depth in args.depths:
+        for breadth in args.breadths:
+            start = time.perf_counter()
+            base = sequential(provider, "prompt", depth, breadth)
+            seq_s = time.perf_counter() - start
+
+            engine = TreeOfThoughts(provider, scorer, max_workers=args.workers)
+            start = time.perf_counter()
+            engine.search("prompt", depth, breadth)
+            tot_s = time.perf_counter() - start
+            stats = engine.stats
+            print(
+                f"{depth:>5} {breadth:>7} {seq_s:7.2f} {tot_s:7.2f} "
+                f"{seq_s / tot_s:6.1f}x "
+                f"{base['calls']:>5}/{stats.provider_calls:<5} "
+                f"{base['scores']:>5}/{stats.scorer_calls:<5} "
+                f"{stats.duplicates:>5} "
+                f"{base['stored'] / 1024:>6.0f}/{stats.stored_chars / 1024:<6.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
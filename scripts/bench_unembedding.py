@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""Benchmark prefill with full vs last-position-only unembedding on CPU."""
+from __future__ import annotations
+
+import argparse
+import time
+
+import torch
+
+from gpt_oss.torch.model import LAST_POSITION, ModelConfig, Transformer
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Compare prefill unembedding modes")
+    p.add_argument("--vocab-size", type=int, default=201088)
+    p.add_argument("--hidden-size", type=int, default=256)
+    p.add_argument("--layers", type=int, default=2)
+    p.add_argument("--lengths", type=int, nargs="+", default=[128, 512, 1024, 2048])
+    p.add_argument("--repeats", type=int, default=2)
+    return p.parse_args()
+
+
+def best_of(repeats: int, fn) -> tuple[float, torch.Tensor]:
+    best, out = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+@torch.inference_mode()
+def main() -> None:
+    args = parse_args()
+    torch.manual_seed(0)
+    config = ModelConfig(
+        num_hidden_layers=args.layers,
+        num_experts=4,
+        experts_per_token=2,
+        vocab_size=args.vocab_size,
+        hidden_size=args.hidden_size,
+        intermediate_size=args.hidden_size,
+        num_attention_heads=8,
+        num_key_value_heads=2,
+    )
+    model = Transformer(config, device=torch.device("cpu")).eval()
+    for param in model.parameters():
+        param.normal_(0.0, 0.02)
+
+    print(f"{'tokens':>7} {'all ms':>8} {'all MB':>8} {'last ms':>8} {'last MB':>8}")
+    for n in args.lengths:
+        x = torch.randint(0, config.vocab_size, (n,))
+        full_s, full = best_of(args.repeats, lambda: model(x))
+        last_s, last = best_of(
+            args.repeats, lambda: model(x, logits_positions=LAST_POSITION)
+        )
+        assert torch.equal(full[-1:], last)
+        mb = lambda t: t.numel() * t.element_size() / 2**20  # noqa: E731
+        print(
+            f"{n:>7} {full_s * 1e3:>8.1f} {mb(full):>8.1f} "
+            f"{last_s * 1e3:>8.1f} {mb(last):>8.2f}"
+        )
+        del full, last
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import os
 import sys
 
-# Ensure the standalone CLI package is importable during tests
-pkg_root = os.path.join(os.path.dirname(__file__), "..", "packages", "sciresearch-cli")
-sys.path.insert(0, os.path.abspath(pkg_root))
+# Ensure the standalone CLI and provider packages are importable during tests
+for pkg in ("sciresearch-cli", "sciresearch-providers-openai"):
+    pkg_root = os.path.join(os.path.dirname(__file__), "..", "packages", pkg)
+    sys.path.insert(0, os.path.abspath(pkg_root))
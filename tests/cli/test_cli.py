@@ -78,3 +78,29 @@ def test_run_mocked():
 
         # Check that the run method is called
         mock_orchestrator_instance.run.assert_called_once()
+
+
+def test_run_resume_reuses_checkpointed_stages(tmp_path):
+    import json
+
+    project = str(tmp_path / "prj")
+    base = ["run", "--project", project, "--provider", "mock", "--no-interactive"]
+    main(base + ["--max-iterations", "1", "--samples-per-query", "2"])
+    manifest = tmp_path / "prj" / "checkpoints" / "manifest.json"
+    first = json.loads(manifest.read_text())["stages"]
+
+    main(base + ["--max-iterations", "2", "--samples-per-query", "2", "--resume"])
+    stages = json.loads(manifest.read_text())["stages"]
+    assert stages["plan:0"] == first["plan:0"]  # reused, not re-run
+    assert "validate:1" in stages
+    state = json.loads((tmp_path / "prj" / "state.json").read_text())
+    assert state["iter"] == 2
+
+
+def test_openai_provider_is_built_from_run_args(tmp_path):
+    with patch("sciresearch_ai.providers.openai_provider.OpenAIProvider") as cls, patch(
+        "sciresearch_ai.orchestrator.Orchestrator"
+    ):
+        main(["run", "--project", str(tmp_path), "--provider", "openai", "--resume"])
+    _, kwargs = cls.call_args
+    assert "resume" not in kwargs and kwargs["project_root"] == str(tmp_path)
@@ -0,0 +1,65 @@
+import dataclasses
+import json
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from gpt_oss.torch.model import ModelConfig, Transformer
+
+
+def tiny_config(**overrides) -> ModelConfig:
+    params = dict(
+        num_hidden_layers=2,
+        num_experts=4,
+        experts_per_token=2,
+        vocab_size=97,
+        hidden_size=64,
+        intermediate_size=32,
+        head_dim=16,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        sliding_window=4,
+    )
+    params.update(overrides)
+    return ModelConfig(**params)
+
+
+def random_transformer(config: ModelConfig, seed: int = 0) -> Transformer:
+    torch.manual_seed(seed)
+    model = Transformer(config, device=torch.device("cpu"))
+    with torch.no_grad():
+        for param in model.parameters():
+            param.normal_(0.0, 0.2)
+    return model.float().eval()
+
+
+@pytest.fixture
+def tiny_model() -> Transformer:
+    return random_transformer(tiny_config())
+
+
+@pytest.fixture
+def checkpoint_dir(tmp_path):
+    """A tiny gpt-oss checkpoint with MXFP4 MoE weights, split over two files."""
+    from safetensors.torch import save_file
+
+    config = tiny_config()
+    model = random_transformer(config, seed=0)
+    gen = torch.Generator().manual_seed(1)
+    dense, moe = {}, {}
+    for name, param in model.named_parameters():
+        if name.endswith(("mlp1_weight", "mlp2_weight")):
+            E, rows, cols = param.shape
+            moe[f"{name}.blocks"] = torch.randint(
+                0, 256, (E, rows, cols // 32, 16), dtype=torch.uint8, generator=gen
+            )
+            moe[f"{name}.scales"] = torch.randint(
+                122, 130, (E, rows, cols // 32), dtype=torch.uint8, generator=gen
+            )
+        else:
+            dense[name] = param.detach().to(torch.bfloat16).contiguous()
+    save_file(dense, str(tmp_path / "dense.safetensors"))
+    save_file(moe, str(tmp_path / "moe.safetensors"))
+    (tmp_path / "config.json").write_text(json.dumps(dataclasses.asdict(config)))
+    return tmp_path
@@ -0,0 +1,146 @@
+import os
+import subprocess
+import sys
+
+import pytest
+import torch
+
+from gpt_oss.triton.attention import attention_ref, paged_attention_ref
+from gpt_oss.triton.cache import NULL_BLOCK, BlockPool, Cache, PagedCache
+
+N_KV_HEADS, GROUPS, D_HEAD, BLOCK = 2, 2, 8, 4
+
+
+def _rows(batch, n):
+    return (
+        torch.randn(batch, n, N_KV_HEADS, D_HEAD).bfloat16(),
+        torch.randn(batch, n, N_KV_HEADS, D_HEAD).bfloat16(),
+    )
+
+
+def _pool(num_blocks=32):
+    return BlockPool(num_blocks, BLOCK, N_KV_HEADS, D_HEAD)
+
+
+def test_paged_cache_matches_dense_cache_and_attention():
+    torch.manual_seed(0)
+    dense, paged = Cache(2, 24, N_KV_HEADS, D_HEAD), PagedCache(_pool(), 2, 24)
+    for n in (5, 3, 1):
+        k, v = _rows(2, n)
+        dense.extend(k, v)
+        paged.extend(k, v)
+    dense.truncate(6)
+    paged.truncate(6)
+    k, v = _rows(2, 3)
+    dense_k, dense_v = dense.extend(k, v)
+    paged_k, paged_v = paged.extend(k, v)
+    assert int(paged.offset) == int(dense.offset) == 9
+    torch.testing.assert_close(paged.rows(0, 9), dense.rows(0, 9))
+
+    # Attention over whole blocks (stale rows past the end are masked).
+    q = torch.randn(2, 3, N_KV_HEADS, GROUPS, D_HEAD).bfloat16()
+    sinks = torch.randn(N_KV_HEADS * GROUPS)
+    start = torch.tensor([6])
+    expected = attention_ref(q, dense_k, dense_v, sinks, 0.25, 4, start)
+    torch.testing.assert_close(
+        attention_ref(q, paged_k, paged_v, sinks, 0.25, 4, start), expected
+    )
+    pool = paged.pool
+    torch.testing.assert_close(
+        paged_attention_ref(
+            q, pool.k, pool.v, paged.block_table, sinks, 0.25, 4, start
+        ),
+        expected,
+    )
+
+
+def test_forked_sequences_share_blocks_until_written():
+    torch.manual_seed(0)
+    pool = _pool()
+    cache = PagedCache(pool, 1, 32)
+    k, v = _rows(1, 6)  # one full block and half of another
+    cache.extend(k, v)
+    cache.repeat_interleave(3)
+    assert cache.num_blocks == 6 and pool.num_free == 31 - 2
+    assert pool.metrics()["shared_blocks"] == 2
+
+    new_k, new_v = _rows(3, 1)
+    cache.extend(new_k, new_v)
+    # Only the partially filled block is copied, once per writer but the last.
+    assert pool.num_free == 31 - 2 - 2
+    assert len({table[0] for table in cache.tables}) == 1
+    assert len({table[1] for table in cache.tables}) == 3
+    got_k, got_v = cache.rows(0, 7)
+    for row in range(3):
+        torch.testing.assert_close(got_k[row, :6], k[0])
+        torch.testing.assert_close(got_k[row, 6], new_k[row, 0])
+        torch.testing.assert_close(got_v[row, 6], new_v[row, 0])
+
+
+def test_truncate_returns_whole_blocks_and_pool_exhaustion_raises():
+    pool = _pool(num_blocks=4)
+    cache = PagedCache(pool, 1, 16)
+    cache.extend(*_rows(1, 10))
+    assert pool.num_free == 0
+    cache.truncate(5)
+    assert cache.tables == [cache.tables[0][:2]] and pool.num_free == 1
+    assert cache.block_table[0, 2:].eq(NULL_BLOCK).all()
+    cache.extend(*_rows(1, 7))
+    with pytest.raises(RuntimeError, match="exhausted"):
+        cache.extend(*_rows(1, 1))
+
+
+def test_fork_shares_prefix_blocks_with_parent():
+    torch.manual_seed(0)
+    pool = _pool()
+    parent = PagedCache(pool, 1, 32)
+    k, v = _rows(1, 6)
+    parent.extend(k, v)
+    children = parent.fork(2)
+    assert pool.num_free == 31 - 2  # nothing copied yet
+    children.extend(*_rows(2, 1))
+    # The children copied the half-filled block; the parent's is intact.
+    assert pool.num_free == 31 - 2 - 2
+    torch.testing.assert_close(parent.rows(0, 6), (k, v))
+    assert children.tables[0][0] == children.tables[1][0] == parent.tables[0][0]
+    children.reset()
+    assert pool.num_free == 31 - 2
+
+
+_KERNEL_CHECK = """
+import torch
+from gpt_oss.triton.attention import paged_attention, paged_attention_ref
+
+torch.manual_seed(0)
+n_kv_heads, groups, block, d_head = 2, 2, 4, 16
+k_blocks = torch.randn(12, block, n_kv_heads, d_head)
+v_blocks = torch.randn(12, block, n_kv_heads, d_head)
+# Scattered, shared and unallocated (NULL_BLOCK) entries.
+block_table = torch.tensor([[3, 5, 7, 1, 9, 0, 0], [2, 4, 5, 8, 10, 11, 6]])
+sinks = torch.randn(n_kv_heads * groups)
+for sliding_window in (None, 8):
+    for num_queries, start in ((1, 21), (6, 3), (20, 0)):
+        q = torch.randn(2, num_queries, n_kv_heads, groups, d_head)
+        args = (block_table, sinks, 0.25, sliding_window, torch.tensor([start]))
+        torch.testing.assert_close(
+            paged_attention(q, k_blocks, v_blocks, *args).bfloat16(),
+            paged_attention_ref(q, k_blocks, v_blocks, *args),
+            atol=2e-2,
+            rtol=2e-2,
+        )
+"""
+
+
+def test_paged_attention_kernel_walks_the_block_table():
+    # The triton interpreter runs the kernel on the CPU; it must be enabled
+    # before triton is imported, and only handles float32 inputs well.
+    env = dict(os.environ, TRITON_INTERPRET="1")
+    root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    proc = subprocess.run(
+        [sys.executable, "-c", _KERNEL_CHECK],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 0, proc.stderr
@@ -0,0 +1,118 @@
+import torch
+
+from gpt_oss.triton.cache import BlockPool, PagedCache
+from gpt_oss.triton.prefix_cache import PrefixCache, cache_blocks, restore
+
+N_LAYERS, N_KV_HEADS, D_HEAD, BLOCK = 2, 2, 4, 4
+BLOCK_BYTES = 2 * BLOCK * N_KV_HEADS * D_HEAD * 2  # bf16 k and v
+
+
+def _kv_of(tokens):
+    """Deterministic KV rows so cached prefixes can be checked exactly."""
+    rows = torch.tensor(tokens, dtype=torch.float32)[:, None, None]
+    rows = rows.expand(len(tokens), N_KV_HEADS, D_HEAD).to(torch.bfloat16)
+    return [(rows + layer, -rows - layer) for layer in range(N_LAYERS)]
+
+
+def _session(pool, tokens=()):
+    caches = [PagedCache(pool, 1, 32) for _ in range(N_LAYERS)]
+    if tokens:
+        for c, (k, v) in zip(caches, _kv_of(tokens)):
+            c.extend(k[None], v[None])
+    return caches
+
+
+def _insert(cache, tokens):
+    session = _session(cache.pool, tokens)
+    inserted = cache.insert(tokens, cache_blocks(session))
+    for c in session:
+        c.reset()  # the tree keeps its own references
+    return inserted
+
+
+def _lookup(cache, tokens):
+    match = cache.match(tokens)
+    cache.release(match)
+    return match.length
+
+
+def _assert_rows(caches, tokens):
+    for c, (k, v) in zip(caches, _kv_of(tokens)):
+        got_k, got_v = c.rows(0, len(tokens))
+        torch.testing.assert_close(got_k[0], k)
+        torch.testing.assert_close(got_v[0], v)
+
+
+def test_interleaved_conversations_share_their_common_prefix():
+    pool = BlockPool(64, BLOCK, N_KV_HEADS, D_HEAD)
+    cache = PrefixCache(pool)
+    system = [1, 2, 3, 4, 5, 6]
+    a, b = system + [10, 11, 12], system + [20, 21]
+    assert _insert(cache, a) == 9
+    assert _insert(cache, b) == 2  # only b's own suffix is new
+    assert _lookup(cache, a + [13]) == 9
+    assert _lookup(cache, b + [22]) == 8
+    assert _lookup(cache, system + [30]) == 6
+
+    match = cache.match(system + [10, 99])
+    blocks = cache.gather(match)
+    target = _session(pool)
+    free = pool.num_free
+    assert restore(target, blocks, match.length) == 7
+    cache.release(match)
+    _assert_rows(target, system + [10])
+    # The session reads the tree's blocks; nothing was copied.
+    assert [c.tables[0] for c in target] == blocks
+    assert pool.num_free == free
+    assert cache.metrics()["hit_rate"] == 1.0
+
+
+def test_lru_eviction_under_budget_skips_pinned_prefixes():
+    pool = BlockPool(64, BLOCK, N_KV_HEADS, D_HEAD)
+    cache = PrefixCache(pool, budget_bytes=5 * BLOCK_BYTES)
+    old, pinned, new = [1, 2, 3, 4], [5, 6, 7], [8, 9, 10, 11]
+    _insert(cache, old)
+    _insert(cache, pinned)
+    match = cache.match(pinned)
+    _insert(cache, new)  # one block per layer each: the oldest leaf must go
+
+    assert cache.nbytes <= cache.budget_bytes
+    assert _lookup(cache, old) == 0
+    assert _lookup(cache, new) == 4
+
+    # While pinned, the older prefix survives and a large insert is refused.
+    big = [12] * 8
+    assert _insert(cache, big) == 0
+    assert _lookup(cache, pinned) == 3
+    cache.release(match)
+    assert _insert(cache, big) == 8
+    assert _lookup(cache, pinned) == 0
+    assert cache.metrics()["tokens_evicted"] == 4 + 4 + 3
+    # Evicted prefixes handed their blocks back to the pool.
+    assert pool.num_free == 63 - 2 * N_LAYERS
+
+
+def test_restored_prefix_is_copied_on_write_only():
+    pool = BlockPool(64, BLOCK, N_KV_HEADS, D_HEAD)
+    cache = PrefixCache(pool)
+    tokens = [3, 1, 4, 1, 5, 9, 2]
+    _insert(cache, tokens)
+    assert pool.num_free == 63 - 2 * N_LAYERS
+
+    # The match ends inside the second block, which both halves now share.
+    match = cache.match(tokens[:5] + [2, 6])
+    target = _session(pool)
+    restore(target, cache.gather(match), match.length)
+    cache.release(match)
+    assert pool.num_free == 63 - 2 * N_LAYERS
+    for c, (k, v) in zip(target, _kv_of([2, 6])):
+        c.extend(k[None], v[None])
+    # Writing past the prefix copied the shared block, once per layer.
+    assert pool.num_free == 63 - 3 * N_LAYERS
+    _assert_rows(target, tokens[:5] + [2, 6])
+
+    check = _session(pool)
+    match = cache.match(tokens)
+    restore(check, cache.gather(match), match.length)
+    cache.release(match)
+    _assert_rows(check, tokens)
@@ -0,0 +1,60 @@
+import torch
+
+from gpt_oss.inference.prompt_lookup import find_draft
+from gpt_oss.inference.speculative import SpeculativeStats
+from gpt_oss.torch.model import TokenGenerator
+
+
+def test_find_draft_prefers_longest_then_latest_match():
+    tokens = [1, 2, 3, 4, 9, 2, 3, 5, 6, 7, 2, 3]
+    # "2 3" occurs twice before the suffix; the later one continues with 5, 6.
+    assert find_draft(tokens, max_ngram=3, num_draft_tokens=2) == [5, 6]
+    # A longer suffix match wins over a more recent shorter one.
+    tokens = [7, 8, 9, 1, 4, 9, 5, 7, 8, 9]
+    assert find_draft(tokens, max_ngram=3, num_draft_tokens=1) == [1]
+    assert find_draft([1, 2, 3], max_ngram=3) == []
+
+
+def test_prompt_lookup_generation_matches_greedy_decoding(tiny_model):
+    generator = TokenGenerator("unused", device=torch.device("cpu"), model=tiny_model)
+    prompt = [5, 17, 33, 2, 60, 41, 8, 5, 17, 33, 2, 60, 41, 8, 5, 17]
+    expected = list(
+        generator.generate(prompt, stop_tokens=[], temperature=0.0, max_tokens=24)
+    )
+    stats = SpeculativeStats()
+    actual = list(
+        generator.generate(
+            prompt,
+            stop_tokens=[],
+            temperature=0.0,
+            max_tokens=24,
+            prompt_lookup=True,
+            stats=stats,
+        )
+    )
+    assert actual == expected
+    assert stats.drafted > 0
+    assert stats.generated == 24
+    assert 0.0 <= stats.acceptance_rate <= 1.0
+
+
+def test_prompt_lookup_prefill_skips_the_unembedding(tiny_model, monkeypatch):
+    generator = TokenGenerator("unused", device=torch.device("cpu"), model=tiny_model)
+    unembedded = []
+    forward = tiny_model.forward
+
+    def recording_forward(x, *args, **kwargs):
+        logits = forward(x, *args, **kwargs)
+        unembedded.append((x.shape[1], logits.shape[1]))
+        return logits
+
+    monkeypatch.setattr(tiny_model, "forward", recording_forward)
+    prompt = [5, 17, 33, 2, 60, 41, 8, 5, 17]
+    list(
+        generator.generate(
+            prompt, stop_tokens=[], temperature=0.0, max_tokens=4, prompt_lookup=True
+        )
+    )
+    # The prompt goes through the model once, without any logits rows.
+    assert unembedded[0] == (len(prompt) - 1, 0)
+    assert all(n_tokens == n_rows for n_tokens, n_rows in unembedded[1:])
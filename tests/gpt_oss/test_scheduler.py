@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import torch
+
+from gpt_oss.responses_api.inference.stub import setup_batched_model
+from gpt_oss.responses_api.scheduler import BatchScheduler, per_slot_backend
+from gpt_oss.torch.model import TokenGenerator
+
+
+class RecordingBackend:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, slots, tokens, temperatures, new_requests):
+        self.calls.append((list(slots), list(new_requests)))
+        return [len(t) for t in tokens]
+
+
+async def _stream(scheduler, prompt, n_tokens):
+    session = await scheduler.open_session()
+    try:
+        tokens = list(prompt)
+        for i in range(n_tokens):
+            tokens.append(
+                await scheduler.next_token(session, tokens, 0.0, new_request=i == 0)
+            )
+        return tokens
+    finally:
+        scheduler.close_session(session)
+
+
+def test_concurrent_streams_share_decode_steps():
+    async def main():
+        scheduler = BatchScheduler(setup_batched_model("", 4), max_sessions=4)
+        start = time.perf_counter()
+        await asyncio.gather(*[_stream(scheduler, [1], 4) for _ in range(4)])
+        return time.perf_counter() - start, scheduler.metrics()
+
+    elapsed, metrics = asyncio.run(main())
+    # The stub sleeps 0.1s per step: four streams of four tokens run in a few
+    # steps instead of the 16 a shared single-stream backend would take.
+    assert elapsed < 1.2
+    assert metrics["tokens_generated"] == 16
+    assert metrics["steps"] < 16
+    assert metrics["mean_batch_size"] > 1
+    assert metrics["ttft_max_s"] is not None
+
+
+def test_sessions_queue_for_slots_and_prefills_are_capped():
+    backend = RecordingBackend()
+
+    async def main():
+        scheduler = BatchScheduler(backend, max_sessions=2, max_prefills_per_step=1)
+        opened = [await scheduler.open_session() for _ in range(2)]
+        waiter = asyncio.ensure_future(scheduler.open_session())
+        await asyncio.sleep(0)
+        assert scheduler.metrics()["queue_depth"] == 1
+        assert scheduler.metrics()["active_sessions"] == 2
+
+        results = await asyncio.gather(
+            *[scheduler.next_token(s, [1, 2, 3], 0.0, True) for s in opened]
+        )
+        assert results == [3, 3]
+        freed = opened[0].slot
+        scheduler.close_session(opened[0])
+        third = await waiter
+        assert third.slot == freed
+        assert scheduler.metrics()["queue_depth"] == 0
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    # Both prompts arrived together, but only one prefill was admitted per step.
+    assert [len(slots) for slots, _ in backend.calls] == [1, 1]
+    assert scheduler.metrics()["steps"] == 2
+    assert len(scheduler.ttft) == 2
+
+
+def test_per_slot_backend_keeps_independent_state():
+    def make():
+        seen = []
+
+        def infer_next_token(tokens, temperature=0.0, new_request=False):
+            seen.append(tokens[-1])
+            return len(seen)
+
+        return infer_next_token
+
+    backend = per_slot_backend(make, 2)
+    assert backend([0, 1, 0], [[5], [6], [7]], [0.0] * 3, [True] * 3) == [1, 1, 2]
+
+
+def test_cancelled_waiters_do_not_take_freed_slots():
+    async def main():
+        scheduler = BatchScheduler(RecordingBackend(), max_sessions=1)
+        session = await scheduler.open_session()
+        cancelled = asyncio.ensure_future(scheduler.open_session())
+        waiter = asyncio.ensure_future(scheduler.open_session())
+        await asyncio.sleep(0)
+        cancelled.cancel()  # its queue entry is still there when the slot frees
+        scheduler.close_session(session)
+        assert (await waiter).slot == 0
+        assert cancelled.cancelled()
+        scheduler.close_session(waiter.result())
+        assert scheduler.metrics()["active_sessions"] == 0
+        assert scheduler.metrics()["queue_depth"] == 0
+
+    asyncio.run(main())
+
+
+def test_late_request_joins_the_running_torch_batch(tiny_model):
+    def generator():
+        return TokenGenerator("unused", device=torch.device("cpu"), model=tiny_model)
+
+    def reference(prompt, n_tokens):
+        gen, tokens = generator(), list(prompt)
+        for _ in range(n_tokens):
+            tokens.append(gen.infer_next_token(tokens))
+        return tokens
+
+    # Compact eagerly so the run also moves rows around in the caches.
+    batched = generator().slot_backend(2, compact_ratio=1.2)
+    calls = []
+
+    def backend(slots, tokens, temperatures, new_requests):
+        calls.append((list(slots), list(new_requests)))
+        return batched(slots, tokens, temperatures, new_requests)
+
+    async def main():
+        scheduler = BatchScheduler(backend, max_sessions=2)
+        decoding = asyncio.Event()
+
+        async def late():
+            await decoding.wait()
+            return await _stream(scheduler, [9, 8, 7, 6, 5, 4, 3], 4)
+
+        joined = asyncio.ensure_future(late())
+        session = await scheduler.open_session()
+        tokens = [1, 2, 3, 4, 5]
+        for i in range(8):
+            tokens.append(await scheduler.next_token(session, tokens, 0.0, i == 0))
+            decoding.set()
+        scheduler.close_session(session)
+        return tokens, await joined
+
+    first, second = asyncio.run(main())
+    # The second prompt is prefilled in the step that decodes the first
+    # stream's second token, and both then decode in one forward per step.
+    assert calls[:3] == [([0], [True]), ([0, 1], [False, True]), ([0, 1], [False] * 2)]
+    assert first == reference([1, 2, 3, 4, 5], 8)
+    assert second == reference([9, 8, 7, 6, 5, 4, 3], 4)
+    cache = batched.caches[0]
+    assert cache.lengths.tolist() == [12, 10]
+    assert cache.offset <= 1.2 * 12
+
+    # A new request that diverges from what the row holds drops its tail.
+    edited = second[:6] + [50]
+    assert batched([1], [edited], [0.0], [True]) == reference(edited, 1)[-1:]
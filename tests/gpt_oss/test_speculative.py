@@ -0,0 +1,55 @@
+import torch
+
+from gpt_oss.inference.speculative import SpeculativeStats, speculative_decode
+from gpt_oss.torch.model import TokenGenerator
+
+from .conftest import random_transformer, tiny_config
+
+
+def test_greedy_speculative_matches_plain_decoding(tiny_model):
+    draft = random_transformer(tiny_config(num_hidden_layers=1), seed=7)
+    prompt = [5, 17, 33, 2, 60]
+    generator = TokenGenerator("unused", device=torch.device("cpu"), model=tiny_model)
+    expected = list(
+        generator.generate(prompt, stop_tokens=[], temperature=0.0, max_tokens=20)
+    )
+
+    stats = SpeculativeStats()
+    actual = list(
+        speculative_decode(
+            prompt,
+            tiny_model,
+            draft,
+            max_tokens=20,
+            gamma=4,
+            stop_tokens=[],
+            temperature=0.0,
+            stats=stats,
+        )
+    )
+    assert actual == expected
+    # An unrelated draft gets rejected, so caches were rolled back.
+    assert stats.accepted < stats.drafted
+    assert stats.generated == 20
+    assert stats.tokens_per_second > 0
+
+
+def test_identical_draft_is_always_accepted_and_gamma_grows(tiny_model):
+    torch.manual_seed(0)
+    stats = SpeculativeStats()
+    out = list(
+        speculative_decode(
+            [5, 17, 33],
+            tiny_model,
+            tiny_model,
+            max_tokens=30,
+            gamma=2,
+            stop_tokens=[],
+            temperature=1.0,
+            stats=stats,
+        )
+    )
+    assert len(out) == 30
+    assert stats.acceptance_rate > 0.95
+    assert max(stats.gammas) > 2
+    assert stats.as_dict()["rounds"] == stats.rounds
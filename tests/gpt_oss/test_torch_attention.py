@@ -0,0 +1,64 @@
+import functools
+
+import pytest
+import torch
+
+from gpt_oss.torch.model import sdpa, sdpa_blockwise, sdpa_cached
+
+
+def _qkvs(n_q, n_kv, batch=None, heads=2, q_mult=3, d_head=8, seed=0):
+    gen = torch.Generator().manual_seed(seed)
+    lead = () if batch is None else (batch,)
+    Q = torch.randn(*lead, n_q, heads, q_mult, d_head, generator=gen)
+    K = torch.randn(*lead, n_kv, heads, d_head, generator=gen)
+    V = torch.randn(*lead, n_kv, heads, d_head, generator=gen)
+    S = torch.randn(heads * q_mult, generator=gen)
+    return Q, K, V, S
+
+
+@pytest.mark.parametrize("sliding_window", [0, 1, 5, 16])
+@pytest.mark.parametrize("block_size", [1, 4, 7, 64])
+def test_blockwise_matches_sdpa(sliding_window, block_size):
+    Q, K, V, S = _qkvs(37, 37)
+    expected = sdpa(Q, K, V, S, 0.3, sliding_window)
+    actual = sdpa_blockwise(Q, K, V, S, 0.3, sliding_window, block_size=block_size)
+    torch.testing.assert_close(actual, expected, atol=1e-5, rtol=1e-5)
+
+
+@pytest.mark.parametrize("sliding_window", [0, 6])
+def test_blockwise_matches_cached_attention_with_padding(sliding_window):
+    # Three new queries against 20 cached slots; row 1 is left-padded.
+    Q, K, V, S = _qkvs(3, 20, batch=2)
+    key_valid = torch.ones(2, 20, dtype=torch.bool)
+    key_valid[1, :9] = False
+    args = (Q, K, V, S, 0.25, sliding_window, 17, key_valid)
+    expected = sdpa_cached(*args)
+    torch.testing.assert_close(
+        sdpa_blockwise(*args, block_size=4), expected, atol=1e-5, rtol=1e-5
+    )
+
+
+@pytest.mark.parametrize(
+    "attention", [sdpa_cached, functools.partial(sdpa_blockwise, block_size=4)]
+)
+def test_padding_between_tokens_does_not_count_towards_the_window(attention):
+    # Slots 10-13 of row 0 are padding left by steps the row sat out; the
+    # window must reach back as far as without them.
+    Q, K, V, S = _qkvs(3, 20, batch=1)
+    key_valid = torch.ones(1, 20, dtype=torch.bool)
+    key_valid[0, 10:14] = False
+    gapped = attention(Q, K, V, S, 0.25, 6, 17, key_valid)
+    keep = torch.cat([torch.arange(10, 14), torch.arange(0, 10), torch.arange(14, 20)])
+    packed = key_valid.clone()
+    packed[0, :4], packed[0, 4:] = False, True
+    expected = sdpa_cached(Q, K[:, keep], V[:, keep], S, 0.25, 6, 17, packed)
+    torch.testing.assert_close(gapped, expected, atol=1e-5, rtol=1e-5)
+
+
+def test_model_prefill_uses_blockwise_path(tiny_model):
+    tokens = torch.randint(0, 97, (40,), generator=torch.Generator().manual_seed(0))
+    expected = tiny_model(tokens)
+    for block in tiny_model.block:
+        block.attn.blockwise_min_tokens = 1
+        block.attn.attention_block_size = 8
+    torch.testing.assert_close(tiny_model(tokens), expected, atol=1e-4, rtol=1e-4)
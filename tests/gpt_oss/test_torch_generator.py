@@ -0,0 +1,108 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from gpt_oss.inference.speculative import speculative_decode
+from gpt_oss.torch.model import LAST_POSITION, TokenGenerator
+
+
+def generator(model):
+    return TokenGenerator("unused", device=torch.device("cpu"), model=model)
+
+
+def test_cached_forward_matches_full_forward(tiny_model):
+    tokens = torch.randint(0, 97, (12,), dtype=torch.int32)
+    full = tiny_model(tokens)
+    caches = generator(tiny_model).new_caches(1, capacity=4)
+    prefix = tiny_model(tokens[None, :7], caches=caches)[0]
+    steps = [
+        tiny_model(tokens[None, i : i + 1], caches=caches)[0] for i in range(7, 12)
+    ]
+    torch.testing.assert_close(torch.cat([prefix] + steps), full, rtol=1e-4, atol=1e-4)
+
+
+def test_generate_batch_matches_sequential_decoding(tiny_model):
+    gen = generator(tiny_model)
+    prompts = [[5, 6, 7, 8, 9, 10], [11, 12], [1, 2, 3, 4]]
+    max_tokens = [6, 3, 8]
+    batched = gen.generate_batch(
+        prompts, stop_tokens=[], temperature=0.0, max_tokens=max_tokens
+    )
+    for prompt, limit, out in zip(prompts, max_tokens, batched):
+        single = list(gen.generate(prompt, [], temperature=0.0, max_tokens=limit))
+        assert out == single
+        assert len(out) == limit
+
+
+def test_generate_batch_stops_rows_independently(tiny_model):
+    gen = generator(tiny_model)
+    reference = gen.generate_batch([[3, 1, 4]], [], temperature=0.0, max_tokens=5)[0]
+    stop = reference[1]
+    outs = gen.generate_batch(
+        [[3, 1, 4], [3, 1, 4]],
+        stop_tokens=[stop],
+        temperature=[0.0, 0.0],
+        max_tokens=[5, 1],
+    )
+    assert outs[0] == reference[: reference.index(stop) + 1]
+    assert outs[1] == reference[:1]
+
+
+def test_forked_branches_prefill_the_prompt_once(tiny_model):
+    gen = generator(tiny_model)
+    prompt = [5, 6, 7, 8, 9, 10]
+    prefix = gen.prefill(prompt)
+    assert gen.tokens_prefilled == len(prompt) - 1
+    expected = gen.generate_batch([prompt], [], temperature=0.0, max_tokens=4)[0]
+    for n in (1, 3):
+        outs = gen.generate_forked(prefix, n, [], temperature=0.0, max_tokens=4)
+        assert outs == [expected] * n
+    assert gen.tokens_prefilled == len(prompt) - 1
+
+    # A child prompt extending the parent's only prefills its new tokens.
+    child = prompt + [11, 12, 13]
+    forked = gen.prefill(child, parent=prefix)
+    assert forked.reused == len(prompt) - 1
+    assert gen.tokens_prefilled == len(child) - 1
+    fresh = gen.generate_batch([child], [], temperature=0.0, max_tokens=4)[0]
+    assert gen.generate_forked(forked, 2, [], 0.0, 4) == [fresh, fresh]
+
+
+def test_infer_next_token_reuses_prefix(tiny_model):
+    gen = generator(tiny_model)
+    tokens = [1, 2, 3, 4, 5]
+    expected = int(tiny_model(torch.tensor(tokens, dtype=torch.int32))[-1].argmax())
+    assert gen.infer_next_token(tokens, temperature=0.0) == expected
+    offset = gen._stream_caches[0].offset
+    longer = tokens + [expected]
+    gen.infer_next_token(longer, temperature=0.0)
+    assert gen._stream_caches[0].offset == offset + 1
+    # a different continuation rolls the cache back to the shared prefix
+    assert gen.infer_next_token(tokens, temperature=0.0) == expected
+
+
+def test_logits_positions_only_unembeds_requested_rows(tiny_model):
+    tokens = torch.tensor([5, 17, 33, 2, 60, 41, 8])
+    full = tiny_model(tokens)
+    last = tiny_model(tokens, logits_positions=LAST_POSITION)
+    assert last.shape == (1, full.shape[-1])
+    torch.testing.assert_close(last, full[-1:])
+    window = tiny_model(tokens, logits_positions=slice(3, None))
+    torch.testing.assert_close(window, full[3:])
+
+
+def test_speculative_decode_with_windowed_verification(tiny_model):
+    torch.manual_seed(0)
+    out = list(
+        speculative_decode(
+            [5, 17, 33],
+            tiny_model,
+            tiny_model,
+            max_tokens=6,
+            gamma=3,
+            stop_tokens=[],
+            return_logprobs=True,
+        )
+    )
+    assert len(out) == 6
+    assert all(logprob <= 0 for _, logprob in out)
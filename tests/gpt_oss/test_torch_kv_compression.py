@@ -0,0 +1,99 @@
+import pytest
+import torch
+
+from gpt_oss.torch.model import (
+    Cache,
+    QuantizedCache,
+    SketchedCache,
+    dequantize_int8,
+    new_caches,
+    quantize_int8,
+)
+
+
+def _decode_logits(model, tokens, caches):
+    """Prefill half of ``tokens`` and feed the rest one at a time."""
+    half = len(tokens) // 2
+    x = torch.as_tensor([tokens[:half]], dtype=torch.int32)
+    steps = [model(x, caches=caches)[0, -1]]
+    for token in tokens[half:]:
+        x = torch.as_tensor([[token]], dtype=torch.int32)
+        steps.append(model(x, caches=caches)[0, -1])
+    return torch.stack(steps)
+
+
+def test_int8_round_trip_error_is_bounded():
+    x = torch.randn(2, 5, 3, 16)
+    q, scale = quantize_int8(x)
+    assert q.dtype == torch.int8 and scale.shape == (2, 5, 3)
+    err = (dequantize_int8(q, scale, x.dtype) - x).abs()
+    assert bool((err <= scale[..., None] / 2 + 1e-6).all())
+
+
+def test_int8_cache_tracks_full_precision_and_is_smaller(tiny_model):
+    tokens = torch.randint(0, 97, (24,)).tolist()
+    full = new_caches(tiny_model, 1)
+    int8 = new_caches(tiny_model, 1, kv_mode="int8")
+    assert all(isinstance(c, QuantizedCache) for c in int8)
+    expected = _decode_logits(tiny_model, tokens, full)
+    got = _decode_logits(tiny_model, tokens, int8)
+    torch.testing.assert_close(got, expected, rtol=0.05, atol=0.05)
+    # float32 model: 1 byte per value plus a 4-byte scale per head vector
+    assert sum(c.kv_bytes() for c in int8) * 3 < sum(c.kv_bytes() for c in full)
+
+
+def test_sketch_applies_to_full_attention_layers_only(tiny_model):
+    caches = new_caches(tiny_model, 1, kv_mode="sketch", rank=4, recent=4, chunk=4)
+    windows = [block.attn.sliding_window for block in tiny_model.block]
+    assert [isinstance(c, SketchedCache) for c in caches] == [w == 0 for w in windows]
+    with pytest.raises(ValueError):
+        new_caches(tiny_model, 1, kv_mode="fp4")
+
+
+def test_full_rank_sketch_is_exact_and_survives_truncate_and_fork():
+    torch.manual_seed(0)
+    exact = Cache(2, 2, 4, capacity=4, dtype=torch.float32)
+    sketched = SketchedCache(
+        2, 2, 4, capacity=4, dtype=torch.float32, rank=4, recent=3, chunk=4
+    )
+    k, v = torch.randn(2, 14, 2, 4), torch.randn(2, 14, 2, 4)
+    valid = torch.ones(2, 14, dtype=torch.bool)
+    for start, stop in ((0, 9), (9, 10), (10, 14)):
+        want = exact.extend(k[:, start:stop], v[:, start:stop], valid[:, start:stop])
+        got = sketched.extend(k[:, start:stop], v[:, start:stop], valid[:, start:stop])
+        for g, w in zip(got, want):
+            torch.testing.assert_close(g, w, rtol=1e-4, atol=1e-4)
+    assert len(sketched.segments) == 2 and sketched.sketched == 8
+
+    fork = sketched.fork(2)
+    sketched.truncate(6)  # inside the second sketched chunk
+    assert sketched.sketched == 4 and sketched.offset == 6
+    got_k, _, _ = sketched.extend(k[:, 6:7], v[:, 6:7], valid[:, 6:7])
+    torch.testing.assert_close(got_k, k[:, :7], rtol=1e-4, atol=1e-4)
+    assert fork.batch_size == 4 and fork.offset == 14
+    torch.testing.assert_close(
+        fork._read(14)[0], k.repeat_interleave(2, dim=0), rtol=1e-4, atol=1e-4
+    )
+
+
+def test_low_rank_sketch_saves_memory():
+    sketched = SketchedCache(1, 2, 16, dtype=torch.float32, rank=2, recent=8, chunk=32)
+    exact = Cache(1, 2, 16, dtype=torch.float32)
+    k = torch.randn(1, 200, 2, 16)
+    valid = torch.ones(1, 200, dtype=torch.bool)
+    sketched.extend(k, k, valid)
+    exact.extend(k, k, valid)
+    assert sketched.kv_bytes() * 3 < exact.kv_bytes()
+
+
+def test_fork_copies_only_the_filled_slots():
+    cache = Cache(1, 2, d_head=4, capacity=256)
+    k = torch.randn(1, 5, 2, 4, dtype=torch.bfloat16)
+    cache.extend(k, -k, torch.ones(1, 5, dtype=torch.bool))
+    fork = cache.fork(3)
+    assert fork.k.shape[1] == 5 and fork.kv_bytes() == 3 * cache.kv_bytes()
+    # Writing past the copy grows it again; the parent is untouched.
+    step = torch.ones(3, 1, 2, 4, dtype=torch.bfloat16)
+    got_k, _, valid = fork.extend(step, step, torch.ones(3, 1, dtype=torch.bool))
+    torch.testing.assert_close(got_k[:, :5], k.expand(3, -1, -1, -1))
+    assert bool(valid.all()) and cache.offset == 5 and cache.k.shape[1] == 256
@@ -0,0 +1,49 @@
+import torch
+
+from gpt_oss.torch.model import MXFP4Weight, Transformer
+
+
+def test_mxfp4_resident_experts_match_dense_weights(checkpoint_dir):
+    dense = Transformer.from_checkpoint(str(checkpoint_dir), device="cpu")
+    packed = Transformer.from_checkpoint(
+        str(checkpoint_dir), device="cpu", mxfp4_experts=True
+    )
+    mlp = packed.block[0].mlp
+    assert isinstance(mlp.mlp1_weight, MXFP4Weight)
+    for expert in range(mlp.num_experts):
+        torch.testing.assert_close(
+            mlp.mlp1_weight.dequantize(expert), dense.block[0].mlp.mlp1_weight[expert]
+        )
+
+    def nbytes(model, key):
+        return sum(
+            t.numel() * t.element_size()
+            for n, t in model.state_dict().items()
+            if key in n
+        )
+
+    assert nbytes(packed, "mlp1_weight") * 3 < nbytes(dense, "mlp1_weight")
+
+    x = torch.tensor([3, 14, 15, 92, 65, 35])
+    torch.testing.assert_close(packed(x), dense(x), atol=0.02, rtol=0.02)
+
+
+def test_grouped_experts_decode_each_expert_once(checkpoint_dir):
+    model = Transformer.from_checkpoint(
+        str(checkpoint_dir), device="cpu", mxfp4_experts=True
+    )
+    mlp = model.block[0].mlp
+    calls = []
+    dequantize = mlp.mlp1_weight.dequantize
+    mlp.mlp1_weight.dequantize = lambda e, *a: calls.append(e) or dequantize(e, *a)
+    mlp(torch.randn(32, 64, dtype=torch.bfloat16))
+    assert sorted(calls) == sorted(set(calls))
+
+
+def test_grouped_dispatch_matches_einsum_for_dense_experts(tiny_model):
+    mlp = tiny_model.block[0].mlp
+    x = torch.randn(40, 64)
+    mlp.grouped_dispatch_min_tokens = 10_000
+    einsum = mlp(x)
+    mlp.grouped_dispatch_min_tokens = 1
+    torch.testing.assert_close(mlp(x), einsum, atol=1e-4, rtol=1e-4)
@@ -0,0 +1,42 @@
+import torch
+
+from gpt_oss.torch.model import RotaryEmbedding
+
+from .conftest import tiny_config
+
+
+def _fresh_cos_sin(rope: RotaryEmbedding, start: int, num_tokens: int):
+    concentration, inv_freq = rope._compute_concentration_and_inv_freq()
+    t = torch.arange(start, start + num_tokens, dtype=torch.float32)
+    freqs = torch.einsum("i,j->ij", t, inv_freq)
+    return freqs.cos() * concentration, freqs.sin() * concentration
+
+
+def test_table_slices_match_direct_computation_and_grow_geometrically():
+    rope = RotaryEmbedding.for_config(tiny_config(rope_scaling_factor=1.0))
+    cos, sin = rope._compute_cos_sin(10, 5)
+    expected_cos, expected_sin = _fresh_cos_sin(rope, 10, 5)
+    torch.testing.assert_close(cos, expected_cos)
+    torch.testing.assert_close(sin, expected_sin)
+    assert len(rope.cos) == 256
+
+    table = rope.cos
+    rope._compute_cos_sin(200, 50)
+    assert rope.cos is table  # still fits, no recompute
+    cos, _ = rope._compute_cos_sin(1000, 3)
+    assert len(rope.cos) == 1024
+    torch.testing.assert_close(cos, _fresh_cos_sin(rope, 1000, 3)[0])
+
+
+def test_offset_forward_matches_explicit_positions():
+    rope = RotaryEmbedding.for_config(tiny_config())
+    q = torch.randn(6, 2, 2, 16)
+    k = torch.randn(6, 2, 16)
+    by_start = rope(q, k, start=7)
+    by_positions = rope(q, k, positions=torch.arange(7, 13))
+    torch.testing.assert_close(by_start, by_positions)
+
+
+def test_table_is_shared_by_every_layer(tiny_model):
+    ropes = {id(block.attn.rope) for block in tiny_model.block}
+    assert len(ropes) == 1
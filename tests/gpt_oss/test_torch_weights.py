@@ -0,0 +1,45 @@
+import pytest
+import torch
+
+from gpt_oss.torch.model import Transformer
+from gpt_oss.torch.weights import Checkpoint
+
+
+def test_streamed_mxfp4_matches_full_dequantization(checkpoint_dir):
+    with Checkpoint(str(checkpoint_dir), torch.device("cpu")) as ckpt:
+        blocks, scales = (
+            "block.0.mlp.mlp1_weight.blocks",
+            "block.0.mlp.mlp1_weight.scales",
+        )
+        expected = ckpt._get_mxfp4_tensor_copy(blocks, scales)
+        torch.testing.assert_close(ckpt.get("block.0.mlp.mlp1_weight"), expected)
+
+
+@pytest.mark.parametrize("shard", [(1, 16, 48), (2, 5, 27), (0, 1, 3)])
+def test_shards_are_sliced_before_dequantizing(checkpoint_dir, shard):
+    # A tiny budget forces one row per read step.
+    with Checkpoint(str(checkpoint_dir), torch.device("cpu"), budget_bytes=1) as ckpt:
+        name = "block.1.mlp.mlp2_weight"
+        full = ckpt.get(name)
+        dim, start, stop = shard
+        out = torch.empty(full.narrow(dim, start, stop - start).shape, dtype=full.dtype)
+        ckpt.load_into(name, out, shard)
+        torch.testing.assert_close(out, full.narrow(dim, start, stop - start))
+
+        bias = ckpt.get("block.1.mlp.mlp1_bias")
+        out = torch.empty(4, 10, dtype=bias.dtype)
+        ckpt.load_into("block.1.mlp.mlp1_bias", out, (1, 6, 16))
+        torch.testing.assert_close(out, bias[:, 6:16])
+
+
+def test_from_checkpoint_streams_every_parameter(checkpoint_dir):
+    budget = 4096
+    model = Transformer.from_checkpoint(
+        str(checkpoint_dir), device="cpu", load_budget_bytes=budget
+    )
+    with Checkpoint(str(checkpoint_dir), torch.device("cpu")) as ckpt:
+        for name, param in model.named_parameters():
+            torch.testing.assert_close(param.data, ckpt.get(name).to(param.dtype))
+    stats = model.load_stats
+    assert stats["peak_rss_bytes"] > 0
+    assert 0 < stats["peak_chunk_bytes"] <= budget
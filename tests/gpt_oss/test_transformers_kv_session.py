@@ -0,0 +1,69 @@
+import importlib
+import sys
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+BACKEND = "gpt_oss.responses_api.inference.transformers"
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    # other test modules stub the backend out in sys.modules; load the real one
+    monkeypatch.delitem(sys.modules, BACKEND, raising=False)
+    return importlib.import_module(BACKEND)
+
+
+def tiny_model():
+    torch.manual_seed(0)
+    cfg = transformers.LlamaConfig(
+        vocab_size=64,
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        max_position_embeddings=128,
+    )
+    return transformers.LlamaForCausalLM(cfg).eval()
+
+
+def full_logits(model, tokens):
+    with torch.no_grad():
+        return model(torch.tensor([tokens])).logits[0, -1]
+
+
+def test_session_matches_full_recompute(backend):
+    model = tiny_model()
+    session = backend.KVSession(model)
+    tokens = [1, 5, 9, 3]
+    for _ in range(5):
+        cached = session.next_logits(tokens)
+        torch.testing.assert_close(cached, full_logits(model, tokens))
+        tokens = tokens + [int(cached.argmax())]
+
+
+def test_session_only_forwards_new_tokens(backend):
+    model = tiny_model()
+    session = backend.KVSession(model)
+    prompt = list(range(1, 11))
+    session.next_logits(prompt)
+    assert session.forwarded_tokens == 10
+    # continuation after a tool call: only the appended tokens are run
+    session.next_logits(prompt + [20, 21, 22])
+    assert session.forwarded_tokens == 13
+    # another sample of the same prompt: roll back and refeed the last token
+    logits = session.next_logits(prompt)
+    assert session.forwarded_tokens == 14
+    torch.testing.assert_close(logits, full_logits(model, prompt))
+
+
+def test_infer_next_token_greedy_is_deterministic(backend):
+    model = tiny_model()
+    infer = backend.get_infer_next_token(model)
+    tokens = [2, 4, 6]
+    first = infer(tokens, temperature=0.0, new_request=True)
+    again = infer(tokens, temperature=0.0, new_request=True)
+    assert first == again == int(full_logits(model, tokens).argmax())
@@ -0,0 +1,79 @@
+import contextlib
+import importlib
+import sys
+import types
+
+import pytest
+import torch
+
+from gpt_oss.triton.cache import BlockPool
+
+VOCAB = 16
+
+
+class FakeModel:
+    """Records what the server feeds the model; "samples" last token + 1."""
+
+    def __init__(self):
+        self.block = [None, None]
+        self.prefills = []
+        self.steps = []
+        self.logits = torch.zeros(1, 1, VOCAB)
+
+    def prefill(self, x, caches):
+        self.prefills.append(x[0].tolist())
+        for cache in caches:
+            cache.reserve(x.shape[1])
+            cache.offset.add_(x.shape[1])
+
+    def __call__(self, x, caches):
+        # Called once, while the decode step is captured.
+        self.input_token, self.caches = x, caches
+        return self.logits
+
+
+class FakeGraph:
+    def __init__(self, model):
+        self.model = model
+
+    def replay(self):
+        model = self.model
+        token = int(model.input_token[0, -1])
+        model.steps.append((token, int(model.caches[0].offset)))
+        for cache in model.caches:
+            cache.offset.add_(1)
+        model.logits.zero_()
+        model.logits[0, -1, (token + 1) % VOCAB] = 1.0
+
+
+@pytest.fixture
+def triton_server(monkeypatch):
+    # The served model needs triton_kernels and CUDA graphs; the token
+    # bookkeeping around them does not.
+    if importlib.util.find_spec("triton_kernels") is None:
+        monkeypatch.setitem(
+            sys.modules,
+            "gpt_oss.triton.model",
+            types.SimpleNamespace(Transformer=None),
+        )
+    # A regression should fail the test rather than stop at breakpoint().
+    monkeypatch.setenv("PYTHONBREAKPOINT", "0")
+    monkeypatch.delitem(sys.modules, "gpt_oss.responses_api.inference.triton", False)
+    module = importlib.import_module("gpt_oss.responses_api.inference.triton")
+    model = FakeModel()
+    monkeypatch.setattr(torch.cuda, "CUDAGraph", lambda: FakeGraph(model))
+    monkeypatch.setattr(torch.cuda, "graph", lambda graph: contextlib.nullcontext())
+    pool = BlockPool(16, 4, 1, 4)
+    infer_next_token = module.get_infer_next_token(model, "cpu", pool=pool)
+    return model, infer_next_token
+
+
+def test_resending_the_same_prompt_replays_its_last_token(triton_server):
+    model, infer_next_token = triton_server
+    prompt = [1, 2, 3, 4, 5]
+    assert infer_next_token(prompt, new_request=True) == 6
+    assert infer_next_token(prompt, new_request=True) == 6
+    # Only the first call prefills; the second keeps all but the last token
+    # cached and feeds that one again to get its logits.
+    assert model.prefills[1:] == [[1, 2, 3, 4]]
+    assert model.steps == [(5, 4), (5, 4)]
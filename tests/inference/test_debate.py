@@ -0,0 +1,57 @@
+import threading
+import time
+
+import sciresearch_ai.inference.debate as debate
+
+
+def _tracking_provider(delay: float = 0.05):
+    lock = threading.Lock()
+    state = {"now": 0, "peak": 0, "prompts": []}
+
+    def provider(prompt: str, n: int):
+        with lock:
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+            state["prompts"].append((prompt, n))
+        time.sleep(delay)
+        with lock:
+            state["now"] -= 1
+        if "consensus" in prompt:
+            return [f"agreed after {prompt.count('Debater')} arguments"]
+        return [f"point {i}" for i in range(n)]
+
+    return provider, state
+
+
+def test_debaters_argue_concurrently_and_keep_order():
+    provider, state = _tracking_provider()
+    result = debate.multi_agent_debate(provider, "Q", n_debaters=5, rounds=2)
+    assert state["peak"] == 5
+    assert len(state["prompts"]) == 2 * (5 + 1)
+    assert [u.split(":")[0] for u in result["transcript"][:5]] == [
+        f"Debater {i}" for i in range(1, 6)
+    ]
+    assert result["consensus"] == "agreed after 5 arguments"
+    assert [t["round"] for t in result["timings"]] == [1, 2]
+    # the peak above shows the arguments overlap; timings are only recorded
+    assert all(t["arguments_sec"] >= 0.04 for t in result["timings"])
+    assert all(t["consensus_sec"] >= 0.04 for t in result["timings"])
+
+
+def test_batched_debate_requests_all_arguments_at_once():
+    provider, state = _tracking_provider(delay=0.0)
+    result = debate.multi_agent_debate(
+        provider, "Q", n_debaters=3, rounds=1, batched=True
+    )
+    assert [n for _, n in state["prompts"]] == [3, 1]
+    assert result["transcript"] == [
+        "Debater 1: point 0",
+        "Debater 2: point 1",
+        "Debater 3: point 2",
+    ]
+
+
+def test_sequential_debate_with_one_worker():
+    provider, state = _tracking_provider(delay=0.01)
+    debate.multi_agent_debate(provider, "Q", n_debaters=3, rounds=1, parallel_workers=1)
+    assert state["peak"] == 1
@@ -12,3 +12,41 @@ def test_critique_and_revise_runs_three_passes():
     assert len(result["critiques"]) == 3
     assert "CHECKLIST" in prompts[0]
     assert result["final"] == "reply 6"
+
+
+def test_patch_mode_revises_flagged_spans_and_stops_early():
+    body = "is a sentence of the methods section long enough to be realistic."
+    lines = [f"line {i} {body}" for i in range(1, 41)]
+    draft = "\n".join(lines).replace("line 7 is", "line teh 7 is")
+    prompts = []
+
+    def mock_gen(prompt: str, n: int):
+        prompts.append(prompt)
+        if prompt.startswith(reflection.PATCH_CRITIC_SYS):
+            if "teh" in prompt:
+                return ["L7: typo 'teh'"]
+            return ["NO ISSUES"]
+        return [f"@@\n-line teh 7 {body}\n+line 7 {body}"]
+
+    result = reflection.critique_and_revise(mock_gen, draft=draft, mode="patch")
+    assert result["final"] == "\n".join(lines)
+    assert len(result["critiques"]) == 2 and len(prompts) == 3
+    # the reviser and the second critic only see the flagged neighbourhood
+    assert "line 20 " not in prompts[1] and "line 20 " not in prompts[2]
+    assert "7| line 7 is" in prompts[2]
+    first, second = result["stats"]
+    assert first["issues"] == 1 and first["changed_lines"] == 1
+    assert first["tokens_saved"] > 0 and second["issues"] == 0
+    assert second["input_tokens"] < second["full_input_tokens"]
+
+
+def test_patch_mode_keeps_draft_on_bad_patch():
+    def mock_gen(prompt: str, n: int):
+        if prompt.startswith(reflection.PATCH_CRITIC_SYS):
+            return ["L1-L2: rewrite"]
+        return ["@@\n-not in the draft\n+x"]
+
+    result = reflection.critique_and_revise(mock_gen, "a\nb", passes=2, mode="patch")
+    assert result["final"] == "a\nb"
+    assert "patch_error" in result["stats"][0]
+    assert len(result["critiques"]) == 1  # nothing changed, nothing to re-review
@@ -26,3 +26,95 @@ def test_tree_of_thoughts_selects_best_path():
     result = ttc.tree_of_thoughts(provider, "root", depth=2, breadth=1, scorer=scorer)
     assert result["path"] == ["B", "B2"]
     assert result["best"].endswith("B2")
+
+
+def test_budgeted_deliberation_overlaps_batches():
+    import threading
+    import time
+
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def provider(prompt: str, n: int):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        return ["x"] * n
+
+    out = ttc.budgeted_adaptive_deliberation(
+        provider, "p", total_budget=6, batch_size=2, parallel_workers=3
+    )
+    assert len(out["samples"]) == 6
+    assert active["peak"] == 3
+
+
+def test_budgeted_deliberation_parallel_early_stop_cancels_pending():
+    calls = []
+
+    def provider(prompt: str, n: int):
+        calls.append(n)
+        return ["A" * 50] + ["b"] * (n - 1)
+
+    out = ttc.budgeted_adaptive_deliberation(
+        provider,
+        "p",
+        total_budget=40,
+        batch_size=2,
+        scorer=len,
+        early_stop_margin=1.0,
+        parallel_workers=2,
+    )
+    assert out["best"] == "A" * 50
+    assert sum(calls) < 40
+
+
+def test_tree_of_thoughts_dedupes_states_and_caches_scores():
+    from sciresearch_ai.inference.tot import TreeOfThoughts
+
+    scored = []
+
+    def provider(state: str, n: int):
+        # "Same idea" twice with cosmetic differences, plus a distinct one.
+        return ["Same idea.", "same  IDEA", f"new {state.count(chr(10))}"]
+
+    def scorer(state: str) -> float:
+        scored.append(state)
+        return len(state)
+
+    engine = TreeOfThoughts(provider, scorer, max_workers=2)
+    result = engine.search("root", depth=2, breadth=2)
+    stats = result["stats"]
+    assert stats["duplicates"] == 3  # one per expanded node
+    assert stats["scorer_calls"] == len(scored) == len(set(scored))
+    assert result["path"] == ["Same idea.", "Same idea."]
+    assert result["score"] == len(result["best"])
+
+    # A second search over the same tree is answered from the score cache.
+    engine.search("root", depth=2, breadth=2)
+    assert len(scored) == stats["scorer_calls"]
+    assert engine.stats.score_cache_hits == stats["scorer_calls"]
+
+
+def test_tree_of_thoughts_expands_frontier_concurrently():
+    import threading
+    import time
+
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def provider(state: str, n: int):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        return [f"{state.count(chr(10))}-{i}" for i in range(n)]
+
+    result = ttc.tree_of_thoughts(provider, "p", depth=3, breadth=3, scorer=len)
+    assert active["peak"] == 3
+    assert len(result["path"]) == 3
+    assert result["best"] == "\n".join(["p"] + result["path"])
@@ -0,0 +1,111 @@
+import json
+import os
+
+import pytest
+
+from sciresearch_ai.checkpoint import StageStore
+from sciresearch_ai.config import RunConfig
+from sciresearch_ai.orchestrator import Orchestrator
+from sciresearch_ai.project import Project
+from sciresearch_ai.providers.mock_provider import MockProvider
+
+
+def test_stage_store_dedupes_and_survives_reload(tmp_path):
+    store = StageStore(str(tmp_path))
+    assert store.put("plan:0", "same plan") == store.put("plan:1", "same plan")
+    store.put("ttc:0", {"best": "x", "scores": [1.0]})
+    assert len(os.listdir(store.objects_dir)) == 2
+
+    reloaded = StageStore(str(tmp_path))
+    assert reloaded.get("ttc:0") == {"best": "x", "scores": [1.0]}
+    assert "plan:1" in reloaded and reloaded.get("debate:0") is None
+
+    # a damaged artifact is treated as missing rather than trusted
+    digest = reloaded.stages["ttc:0"]["sha256"]
+    with open(os.path.join(store.objects_dir, f"{digest}.json"), "w") as f:
+        f.write('{"best": "y"}')
+    assert reloaded.get("ttc:0", "missing") == "missing"
+
+    reloaded.reset()
+    assert not os.listdir(store.objects_dir) and "plan:0" not in reloaded
+
+
+class CrashingProvider(MockProvider):
+    """Fails every call once the first iteration has saved its state."""
+
+    def __init__(self, state_path):
+        super().__init__()
+        self.state_path = state_path
+        self.prompts = []
+
+    def generate(self, prompt, n=1, **gen_kwargs):
+        if os.path.exists(self.state_path):
+            raise RuntimeError("spot instance reclaimed")
+        self.prompts.append(prompt)
+        return super().generate(prompt, n, **gen_kwargs)
+
+
+def test_resume_continues_from_first_unfinished_stage(tmp_path):
+    prj = Project.create(str(tmp_path), "resume")
+    cfg = RunConfig(
+        max_iterations=2, samples_per_query=2, interactive=False, stage_workers=1
+    )
+    with pytest.raises(RuntimeError):
+        Orchestrator(prj, CrashingProvider(prj.pm.state_path), cfg).run()
+    assert prj.pm.load_state()["iter"] == 1
+    # validation is checkpointed with the outcome of its PDF build
+    store = StageStore(os.path.join(prj.root, "checkpoints"))
+    assert isinstance(store.get("validate:0"), bool)
+
+    provider = MockProvider()
+    calls = []
+    generate = provider.generate
+    provider.generate = lambda p, n=1: calls.append(p) or generate(p, n)
+    cfg.resume = True
+    orch = Orchestrator(prj, provider, cfg)
+    orch.run()
+    assert orch.resumed == [
+        f"{s}:0" for s in ("plan", "ttc", "debate", "reflect", "write", "validate")
+    ]
+    assert sum(p.startswith("You are an AI researcher") for p in calls) == 1
+    with open(prj.pm.draft_path, encoding="utf-8") as f:
+        assert f.read().count("TBD.") == 2  # each section written exactly once
+    with open(prj.pm.state_path, encoding="utf-8") as f:
+        assert json.load(f) == {"iter": 2, "status": "complete_limit_reached"}
+
+    # a fresh run discards the previous artifacts
+    fresh = Orchestrator(prj, MockProvider(), RunConfig(max_iterations=0))
+    fresh.run()
+    assert "plan:0" not in fresh.store
+
+
+def test_rerun_write_stage_autosaves_without_rewriting(tmp_path, monkeypatch):
+    prj = Project.create(str(tmp_path), "rewrite")
+    orch = Orchestrator(prj, MockProvider(), RunConfig(interactive=False))
+    saved = []
+    autosave = prj.pm.autosave
+    monkeypatch.setattr(
+        prj.pm, "autosave", lambda tex: saved.append(tex) or autosave(tex)
+    )
+    first = orch._write(0, "experiment", "Our methods.")
+    # a run interrupted before checkpointing the stage writes it again
+    assert orch._write(0, "experiment", "Our methods.") == first
+    assert len(saved) == 2 and saved[0] == saved[1]
+    assert saved[1].count("Our methods.") == 1
+
+
+def test_resume_honours_a_checkpointed_stop(tmp_path, monkeypatch):
+    prj = Project.create(str(tmp_path), "stop")
+    cfg = RunConfig(max_iterations=3, samples_per_query=2, interactive=True)
+    monkeypatch.setattr("builtins.input", lambda: "stop")
+    Orchestrator(prj, MockProvider(), cfg).run()
+
+    def no_prompt():
+        raise AssertionError("resumed run prompted the human again")
+
+    monkeypatch.setattr("builtins.input", no_prompt)
+    cfg.resume = True
+    orch = Orchestrator(prj, MockProvider(), cfg)
+    orch.run()
+    assert "hitl:0" in orch.resumed and orch.stop_flag
+    assert {t["iter"] for t in orch.timings} == {0}
@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+from sciresearch_ai.config import RunConfig
+from sciresearch_ai.orchestrator import Orchestrator
+from sciresearch_ai.project import Project
+from sciresearch_ai.stages import StageGraph
+
+
+def test_stage_graph_runs_independent_stages_concurrently():
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def work(value):
+        def fn(results):
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+            time.sleep(0.05)
+            with lock:
+                active["now"] -= 1
+            return value
+
+        return fn
+
+    graph = StageGraph()
+    graph.add("a", work(1))
+    graph.add("b", work(2), ("a",))
+    graph.add("c", work(3), ("a",))
+    graph.add("d", lambda r: r["b"] + r["c"], ("b", "c"))
+    assert graph.run(max_workers=2)["d"] == 5
+    assert active["peak"] == 2
+    start = {t["stage"]: t["start"] for t in graph.timings}
+    assert start["a"] < start["b"] and start["d"] >= start["c"]
+
+
+def test_stage_graph_skips_dependents_and_reraises():
+    graph = StageGraph()
+    graph.add("a", lambda r: 1)
+    graph.add("b", lambda r: 2, ("a",))
+    graph.add("c", lambda r: 3, ("b",))
+    graph.run(should_start=lambda name: name != "b")
+    assert graph.results == {"a": 1} and graph.skipped == {"b", "c"}
+
+    graph = StageGraph()
+    graph.add("a", lambda r: 1 / 0)
+    graph.add("b", lambda r: 2, ("a",))
+    with pytest.raises(ZeroDivisionError):
+        graph.run()
+    assert "b" in graph.skipped
+    with pytest.raises(ValueError):
+        graph.add("c", lambda r: 3, ("missing",))
+
+
+class SlowProvider:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = set()
+        self.overlaps = set()
+        self.calls = 0
+
+    def generate(self, prompt, n=1):
+        kind = "reflect" if "CHECKLIST" in prompt or "Revise" in prompt else "other"
+        if "debat" in prompt:
+            kind = "debate"
+        with self.lock:
+            self.calls += 1
+            self.active.add(kind)
+            if {"debate", "reflect"} <= self.active:
+                self.overlaps.add("debate+reflect")
+        time.sleep(0.02)
+        with self.lock:
+            self.active.discard(kind)
+        return [f"{kind} reply {i}" for i in range(n)]
+
+
+def test_orchestrator_overlaps_debate_and_reflection(tmp_path):
+    prj = Project.create(str(tmp_path), "dag")
+    provider = SlowProvider()
+    cfg = RunConfig(max_iterations=2, samples_per_query=2, interactive=False)
+    orch = Orchestrator(prj, provider, cfg)
+    orch.run()
+    assert "debate+reflect" in provider.overlaps
+    assert {(t["stage"], t["iter"]) for t in orch.timings} == {
+        (s, i)
+        for s in ("plan", "ttc", "debate", "reflect", "write", "validate")
+        for i in range(2)
+    }
+    assert set(orch.stage_seconds()) >= {"debate", "reflect"}
+    with open(prj.pm.draft_path, encoding="utf-8") as f:
+        assert f.read().count("TBD.") == 2  # methods and experiments filled
+
+
+def test_orchestrator_stops_at_human_loop(tmp_path, monkeypatch):
+    prj = Project.create(str(tmp_path), "hitl")
+    provider = SlowProvider()
+    monkeypatch.setattr("builtins.input", lambda: "stop")
+    cfg = RunConfig(max_iterations=3, samples_per_query=2, interactive=True)
+    orch = Orchestrator(prj, provider, cfg)
+    orch.run()
+    assert {t["iter"] for t in orch.timings} == {0}
+    assert orch.stop_flag
+
+
+def test_time_budget_lets_planned_iterations_finish(tmp_path):
+    prj = Project.create(str(tmp_path), "budget")
+    # Iteration 0's TTC overruns the budget before plan:1 may start.
+    cfg = RunConfig(
+        max_iterations=3, samples_per_query=2, interactive=False, time_budget_sec=0.01
+    )
+    orch = Orchestrator(prj, SlowProvider(), cfg)
+    orch.run()
+    assert {(t["stage"], t["iter"]) for t in orch.timings} == {
+        (s, 0) for s in ("plan", "ttc", "debate", "reflect", "write", "validate")
+    }
+    assert prj.pm.load_state() == {"iter": 1, "status": "time_budget_exhausted"}
@@ -0,0 +1,90 @@
+import sys
+import time
+
+from sciresearch_ai.paper.compile_service import CompileService
+from sciresearch_ai.paper.manager import PaperManager
+
+# Stand-in for pdflatex: records each run, fails on drafts containing BROKEN.
+FAKE_COMPILER = """
+import pathlib, sys, time
+src = pathlib.Path(sys.argv[-1])
+with open("runs.txt", "a") as f:
+    f.write(src.read_text() + "\\n---\\n")
+time.sleep(float(pathlib.Path("delay.txt").read_text() or 0))
+src.with_suffix(".pdf").write_text("pdf")
+sys.exit(1 if "BROKEN" in src.read_text() else 0)
+"""
+
+
+def _service(tmp_path, delay=0.0):
+    paper = tmp_path / "paper"
+    figures = tmp_path / "figures"
+    paper.mkdir()
+    figures.mkdir()
+    (paper / "delay.txt").write_text(str(delay))
+    (paper / "draft.tex").write_text("v0")
+    script = tmp_path / "fake_pdflatex.py"
+    script.write_text(FAKE_COMPILER)
+    service = CompileService(
+        str(paper / "draft.tex"),
+        fig_dir=str(figures),
+        log_path=str(tmp_path / "pdflatex.log"),
+        command=[sys.executable, str(script)],
+    )
+    return service, paper, figures
+
+
+def _runs(paper):
+    path = paper / "runs.txt"
+    return path.read_text().split("\n---\n")[:-1] if path.exists() else []
+
+
+def test_unchanged_inputs_are_not_recompiled(tmp_path):
+    service, paper, figures = _service(tmp_path)
+    assert service.compile() and service.compile()
+    assert len(_runs(paper)) == 1 and service.cache_hits == 1
+
+    (figures / "plot.png").write_bytes(b"\x89PNG")
+    assert service.compile()
+    (paper / "refs.bib").write_text("@article{a, title={A}}")
+    assert service.compile()
+    (paper / "draft.tex").write_text("BROKEN")
+    assert not service.compile() and not service.compile()
+    assert len(_runs(paper)) == 4  # figure, bib and draft edits rebuild once
+
+
+def test_pending_requests_coalesce_into_the_latest_draft(tmp_path):
+    service, paper, _ = _service(tmp_path, delay=0.5)
+    first = service.submit()
+    while not _runs(paper):  # wait until the first build has read v0
+        time.sleep(0.01)
+    pending = []
+    for k in range(1, 6):
+        (paper / "draft.tex").write_text(f"v{k}")
+        pending.append(service.submit())
+    assert not first.done()
+    assert all(f.result(timeout=5) for f in [first] + pending)
+    assert _runs(paper) == ["v0", "v5"]
+
+
+def test_missing_toolchain_is_treated_as_success(tmp_path):
+    messages = []
+    service, _, _ = _service(tmp_path)
+    service.command = ("definitely-not-pdflatex",)
+    service.log = messages.append
+    assert service.submit().result(timeout=5)
+    assert messages == ["definitely-not-pdflatex not found; skipping PDF compilation"]
+
+
+def test_manager_validation_future(tmp_path):
+    pm = PaperManager(str(tmp_path))
+    script = tmp_path / "fake_pdflatex.py"
+    script.write_text(FAKE_COMPILER)
+    (tmp_path / "paper" / "delay.txt").write_text("0")
+    pm.compiler.command = (sys.executable, str(script))
+    pm.autosave("A novel result.")
+    assert pm.validate_paper_async().result(timeout=5)
+    assert pm.validate_paper()  # cache hit
+    assert pm.compiler.builds == 1
+    pm.autosave("No claims here.")
+    assert not pm.validate_paper_async().result(timeout=5)
@@ -1,4 +1,3 @@
-import re
 import shutil
 import tempfile
 import unittest
@@ -26,23 +25,21 @@ class TestPaperWriter(unittest.TestCase):
 
     def test_autosave(self):
         new_content = "This is the new content for the draft."
-        snap_path = self.writer.autosave(new_content)
+        rev = self.writer.autosave(new_content)
 
         # Check draft content
         draft_content = self.writer.draft_path.read_text(encoding="utf-8")
         self.assertEqual(draft_content, new_content)
 
-        # Check checkpoint file
-        self.assertTrue(snap_path.exists())
-        self.assertEqual(snap_path.parent, self.fs.rev_dir)
-
         # Check checkpoint content
-        snap_content = snap_path.read_text(encoding="utf-8")
-        self.assertEqual(snap_content, new_content)
-
-        # Check checkpoint naming
-        match = re.match(r"draft-\d{8}-\d{6}-\d{3}\.tex", snap_path.name)
-        self.assertIsNotNone(match)
+        self.assertEqual(self.writer.revisions.read(rev), new_content)
+        self.assertEqual(self.writer.revisions.latest(), rev)
+
+        # Repeated saves of the same text add no files to the revisions dir
+        files = sorted(p.name for p in self.fs.rev_dir.iterdir())
+        self.writer.autosave(new_content)
+        self.assertEqual(sorted(p.name for p in self.fs.rev_dir.iterdir()), files)
+        self.assertEqual(len(self.writer.revisions), 2)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+import os
+
+from sciresearch_core.revisions import RevisionStore
+
+BASE = "".join(
+    f"\\paragraph{{{i}}} sentence number {i} of the draft.\n" for i in range(300)
+)
+
+
+def _draft(k):
+    return BASE.replace(f"number {k} ", f"number {k} (revised) ")
+
+
+def test_store_dedupes_compresses_and_reloads(tmp_path):
+    store = RevisionStore(str(tmp_path), keyframe_interval=8)
+    revs = []
+    for k in range(40):
+        revs.append(store.save(_draft(k), ts=100.0 + k))
+        store.save(_draft(k), ts=100.5 + k)  # e.g. a HITL note-free resave
+    assert len(store) == 80 and len(store._objects) == 40
+    assert sorted(os.listdir(tmp_path)) == ["index.jsonl", "pack-0.bin"]
+    # far below 40 full copies; deltas only hold the changed line
+    assert store.disk_usage() * 20 < 40 * len(BASE)
+    keyframes = sum(o.base is None for o in store._objects.values())
+    assert keyframes == 5
+
+    reloaded = RevisionStore(str(tmp_path), keyframe_interval=8)
+    assert reloaded.list() == store.list()
+    assert all(reloaded.read(r) == _draft(k) for k, r in enumerate(revs))
+
+
+def test_lookup_by_timestamp(tmp_path):
+    store = RevisionStore(str(tmp_path))
+    for k in range(10):
+        store.save(_draft(k), ts=10.0 * k)
+    assert store.at(-1) is None
+    assert store.read(store.at(35.0)) == _draft(3)
+    assert store.read(store.at(40.0)) == _draft(4)
+    assert store.at(1e9) == store.latest()
+
+
+def test_gc_compacts_into_a_new_pack(tmp_path):
+    store = RevisionStore(str(tmp_path), keyframe_interval=4)
+    for k in range(12):
+        store.save(_draft(k), ts=float(k))
+    before = store.disk_usage()
+    assert store.gc(keep_last=3) == 9
+    assert sorted(os.listdir(tmp_path)) == ["index.jsonl", "pack-1.bin"]
+    assert store.disk_usage() < before
+    assert [store.read(r) for r in store.list()] == [_draft(k) for k in (9, 10, 11)]
+    assert store.gc(before=100.0) == 2  # the newest revision always stays
+
+    reloaded = RevisionStore(str(tmp_path))
+    assert reloaded.read(reloaded.latest()) == _draft(11)
+
+
+def test_interrupted_save_is_dropped_on_reload(tmp_path):
+    store = RevisionStore(str(tmp_path))
+    store.save(_draft(0), ts=1.0)
+    with open(store.index_path, "a", encoding="utf-8") as f:
+        f.write('{"obj": "deadbeef", "off": 999999')  # torn line
+    reloaded = RevisionStore(str(tmp_path))
+    assert len(reloaded) == 1
+    reloaded.save(_draft(1), ts=2.0)
+    assert RevisionStore(str(tmp_path)).read(reloaded.latest()) == _draft(1)
+
+
+def test_saves_collect_garbage_beyond_keep_last(tmp_path):
+    store = RevisionStore(str(tmp_path), keep_last=3)
+    for k in range(5):
+        store.save(_draft(k), ts=float(k))
+    assert len(store) == 5
+    store.save(_draft(5), ts=5.0)  # twice keep_last: compact to the newest 3
+    assert sorted(os.listdir(tmp_path)) == ["index.jsonl", "pack-1.bin"]
+    assert [store.read(r) for r in store.list()] == [_draft(k) for k in (3, 4, 5)]
+    for k in range(6, 9):
+        store.save(_draft(k), ts=float(k))
+    assert len(RevisionStore(str(tmp_path))) == 3
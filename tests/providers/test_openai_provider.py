@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+
+# Stub heavy optional deps before importing the provider
+class _APIError(Exception):
+    def __init__(self, *args, request=None, **kwargs):
+        super().__init__(*args)
+
+
+class _APITimeoutError(_APIError):
+    pass
+
+
+class _APIConnectionError(_APIError):
+    pass
+
+
+class _RateLimitError(_APIError):
+    pass
+
+
+class _InternalServerError(_APIError):
+    pass
+
+
+_STUBS = {
+    "openai": types.SimpleNamespace(
+        APIError=_APIError,
+        APITimeoutError=_APITimeoutError,
+        APIConnectionError=_APIConnectionError,
+        DefaultHttpxClient=lambda **k: None,
+        RateLimitError=_RateLimitError,
+        InternalServerError=_InternalServerError,
+        OpenAI=object,
+    ),
+    "httpx": types.SimpleNamespace(
+        Limits=lambda **k: None,
+        HTTPTransport=lambda **k: None,
+        Client=lambda **k: None,
+        Timeout=lambda *a, **k: None,
+    ),
+    "sympy": types.SimpleNamespace(simplify=lambda e: e, sympify=lambda e: e),
+}
+
+
+# The in-tree provider and its copy in the sciresearch-providers-openai package.
+_PROVIDERS = {
+    "sciresearch_ai.providers.openai_provider": "sciresearch_ai.tools.sympy_tools",
+    "sciresearch_providers_openai.provider": (
+        "sciresearch_providers_openai.tools.sympy_tools"
+    ),
+}
+
+
+@pytest.fixture(params=sorted(_PROVIDERS))
+def op(request, monkeypatch):
+    # Only stub what is missing, and only for the duration of the test, so
+    # other test modules still see the real (or absent) packages.
+    for name, stub in _STUBS.items():
+        if importlib.util.find_spec(name) is None:
+            monkeypatch.setitem(sys.modules, name, stub)
+    for mod in [request.param, _PROVIDERS[request.param]]:
+        monkeypatch.delitem(sys.modules, mod, raising=False)
+    return importlib.import_module(request.param)
+
+
+class FakeResponses:
+    def __init__(self, fail_first: int = 0):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+        self.fail_first = fail_first
+
+    def create(self, **req):
+        with self.lock:
+            self.calls += 1
+            if self.calls <= self.fail_first:
+                raise sys.modules["openai"].APITimeoutError(request=None)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            idx = self.calls
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return types.SimpleNamespace(
+            id=f"r{idx}",
+            output=[types.SimpleNamespace(type="output_text", text=f"sample {idx}")],
+        )
+
+
+def make_provider(op, monkeypatch, responses, **kwargs):
+    monkeypatch.setattr(
+        op,
+        "_build_client",
+        lambda max_connections=8, timeout=None: types.SimpleNamespace(
+            responses=responses
+        ),
+    )
+    return op.OpenAIProvider(
+        model="gpt-test",
+        temperature=0.2,
+        top_p=1.0,
+        max_output_tokens=10,
+        **kwargs,
+    )
+
+
+def test_generate_n_runs_samples_concurrently(op, monkeypatch):
+    responses = FakeResponses()
+    prov = make_provider(op, monkeypatch, responses, max_concurrency=3)
+    out = prov.generate("hi", n=5)
+    assert len(out) == 5
+    assert all(o.startswith("sample ") for o in out)
+    assert responses.peak == 3
+
+
+def test_generate_retries_transient_errors(op, monkeypatch):
+    responses = FakeResponses(fail_first=2)
+    prov = make_provider(op, monkeypatch, responses, retry_backoff=0.0)
+    assert prov.generate("hi") == ["sample 3"]
+
+
+def test_generate_reports_error_after_retries(op, monkeypatch):
+    responses = FakeResponses(fail_first=10)
+    prov = make_provider(op, monkeypatch, responses, max_retries=1, retry_backoff=0.0)
+    out = prov.generate("hi")
+    assert out[0].startswith("API error")
+    assert responses.calls == 2
+
+
+def test_generate_reports_tool_setup_errors(op, monkeypatch):
+    prov = make_provider(op, monkeypatch, FakeResponses())
+
+    def broken_tools():
+        raise ValueError("bad schema")
+
+    monkeypatch.setattr(prov, "_function_tools", broken_tools)
+    assert prov.generate("hi", n=2) == ["Provider exception: bad schema"] * 2
+
+
+@pytest.mark.parametrize("timeout", [None, 30.0])
+def test_client_keeps_the_sdk_default_timeout(op, monkeypatch, timeout):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    for var in ("HTTPS_PROXY", "HTTP_PROXY"):
+        monkeypatch.delenv(var, raising=False)
+    seen = {}
+    monkeypatch.setattr(op, "DefaultHttpxClient", lambda **k: seen.update(k))
+    monkeypatch.setattr(op, "OpenAI", lambda **k: k)
+    op._build_client(timeout=timeout)
+    assert seen.get("timeout") == timeout